@@ -1,6 +1,16 @@
 from rest_framework import serializers
 
+from django.conf import settings
+
 
 class LoginSerializer(serializers.Serializer):
     name = serializers.CharField(min_length=4, max_length=64)
     password = serializers.CharField(min_length=4)
+
+
+class IntrospectSerializer(serializers.Serializer):
+    tokens = serializers.ListField(
+        child=serializers.CharField(allow_blank=True),
+        allow_empty=False,
+        max_length=settings.AUTH_INTROSPECT_MAX_TOKENS
+    )
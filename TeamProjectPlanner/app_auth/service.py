@@ -1,24 +1,27 @@
-import json
-from datetime import datetime
-
 from django.conf import settings
 
 from app_auth.custom_serializers import auth_serializer as app_auth_serializer
 
 from common_utils import auth_utils as common_auth_utils
-from common_utils import base_utils as generic_utils
+from common_utils import codec_utils
+from common_utils import storage_utils
+from common_utils import token_store_utils
+from common_utils import token_utils
 
 
 class LoginManager:
+    def __init__(self):
+        self.storage = storage_utils.get_storage()
+        self.token_store = token_store_utils.get_token_store()
+
     def login(self, request):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_auth_serializer.LoginSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         validated = serializer.validated_data
 
-        users = generic_utils.load_json(settings.USER_FILE)
         matched_user = None
-        for user in users:
+        for user in self.storage.find("users", name=validated["name"]):
             if user["name"] == validated["name"]:
                 if user["password"] == common_auth_utils.hash_password(
                     validated["password"]
@@ -31,27 +34,53 @@ class LoginManager:
                 settings.RESPONSE_MSG_CONSTANTS_DICT['INVALID_CRED']
             )
 
-        # Generate and store token
-        generated_token = common_auth_utils.generate_token(
-            matched_user["user_id"]
-        )
-        tokens_info = generic_utils.load_json(settings.TOKEN_FILE)
-
-        # delete old token for user establishing single-token system
-        cleaned_tokens_info = [
-            token_record for token_record in tokens_info
-            if token_record["user_id"] != matched_user["user_id"]
-        ]
-
-        cleaned_tokens_info.append({
-            "user_id": matched_user["user_id"],
-            "token": generated_token,
-            "created_at": datetime.now().isoformat()
-        })
-        generic_utils.save_json(settings.TOKEN_FILE, cleaned_tokens_info)
+        user_id = matched_user["user_id"]
+        # NOTE: the token store keeps one record per user, issuing a token
+        # replaces the old one establishing single-token system. Signed
+        # tokens are not stored, the record's cutoff revokes older ones
+        if settings.AUTH_TOKEN_FORMAT == "signed":
+            issued_at = self.token_store.issue(user_id)
+            generated_token = token_utils.issue_signed_token(
+                matched_user, issued_at
+            )
+        else:
+            generated_token = common_auth_utils.generate_token(user_id)
+            issued_at = self.token_store.issue(user_id, generated_token)
+        self._revoke_cached(user_id, issued_at)
 
-        return json.dumps({
+        return codec_utils.dumps({
             "token": generated_token,
             "user_id": matched_user["user_id"],
             "is_admin": matched_user["is_admin"]
         })
+
+    def logout(self, user_id):
+        # Revokes every token of the user issued so far, opaque or signed
+        not_before = self.token_store.revoke(user_id)
+        self._revoke_cached(user_id, not_before)
+        return codec_utils.dumps({"message": "Logged out successfully"})
+
+    def introspect(self, request):
+        data = codec_utils.loads(request)
+        serializer = app_auth_serializer.IntrospectSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        tokens = serializer.validated_data["tokens"]
+
+        users = common_auth_utils.get_users_from_tokens(tokens)
+        results = []
+        for token in tokens:
+            user = users[token]
+            if user:
+                results.append({
+                    "token": token,
+                    "active": True,
+                    "user_id": user["user_id"],
+                    "is_admin": user["is_admin"]
+                })
+            else:
+                results.append({"token": token, "active": False})
+        return codec_utils.dumps({"results": results})
+
+    def _revoke_cached(self, user_id, not_before):
+        common_auth_utils.invalidate_user_tokens(user_id)
+        token_utils.note_revocation(user_id, not_before)
@@ -0,0 +1,386 @@
+from unittest import mock
+
+from rest_framework import serializers
+
+from django.conf import settings
+from django.test import override_settings
+from django.urls import reverse
+
+from app_auth import service as auth_service
+from app_teams import service as teams_service
+from app_users import service as user_service
+
+from common_utils import auth_utils
+from common_utils import codec_utils
+from common_utils import storage_test_utils
+from common_utils import token_store_utils
+from common_utils import token_utils
+
+
+@override_settings(AUTH_TOKEN_SWEEP_INTERVAL_SECONDS=0)
+class AuthTestCase(storage_test_utils.JsonStoreTestCase):
+    """
+    One user, "planner", with fresh token store, token cache and
+    revocation cutoffs.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self._reset_token_state()
+        self.user_manager = user_service.UserManager()
+        self.user_id = codec_utils.loads(
+            self.user_manager.create_user(codec_utils.dumps({
+                "name": "planner", "display_name": "Planner",
+                "password": "pass"
+            }))
+        )["id"]
+        self.login_manager = auth_service.LoginManager()
+
+    def tearDown(self):
+        self._reset_token_state()
+        super().tearDown()
+
+    def _reset_token_state(self):
+        token_store_utils._token_store = None
+        token_utils._cutoffs = {}
+        token_utils._cutoffs_loaded_at = None
+        auth_utils._token_cache.clear()
+        auth_utils._user_tokens.clear()
+
+    def _login(self):
+        return codec_utils.loads(self.login_manager.login(
+            codec_utils.dumps({"name": "planner", "password": "pass"})
+        ))
+
+
+class TokenCacheTests(AuthTestCase):
+    def test_repeated_lookups_are_served_from_the_cache(self):
+        token = self._login()["token"]
+        with mock.patch.object(
+            token_store_utils.TokenStore, "lookup",
+            wraps=token_store_utils.get_token_store().lookup
+        ) as lookup:
+            for _ in range(3):
+                user = auth_utils.get_user_from_token(token)
+                self.assertEqual(user["user_id"], self.user_id)
+        self.assertEqual(lookup.call_count, 1)
+
+    def test_login_drops_the_cached_previous_token(self):
+        first = self._login()["token"]
+        self.assertIsNotNone(auth_utils.get_user_from_token(first))
+        second = self._login()["token"]
+        self.assertIsNone(auth_utils.get_user_from_token(first))
+        self.assertIsNotNone(auth_utils.get_user_from_token(second))
+
+    def test_user_update_refreshes_the_cached_user(self):
+        token = self._login()["token"]
+        auth_utils.get_user_from_token(token)
+        self.user_manager.update_user(
+            codec_utils.dumps({
+                "id": self.user_id, "name": "planner",
+                "display_name": "Renamed"
+            }),
+            self.user_id, False
+        )
+        self.assertEqual(
+            auth_utils.get_user_from_token(token)["display_name"], "Renamed"
+        )
+
+    def test_unknown_tokens_are_not_cached(self):
+        self.assertIsNone(auth_utils.get_user_from_token("unknown"))
+        self.assertEqual(auth_utils._token_cache, {})
+
+    def test_cached_user_cannot_be_changed_by_callers(self):
+        token = self._login()["token"]
+        auth_utils.get_user_from_token(token)["display_name"] = "Changed"
+        self.assertEqual(
+            auth_utils.get_user_from_token(token)["display_name"], "Planner"
+        )
+
+
+@override_settings(AUTH_TOKEN_FORMAT="signed")
+class SignedTokenRevocationTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        # Every login and logout below happens within one millisecond
+        now_ms = mock.patch.object(
+            token_store_utils, "now_ms", return_value=1700000000000
+        )
+        now_ms.start()
+        self.addCleanup(now_ms.stop)
+
+    def test_logout_revokes_token_of_the_same_millisecond(self):
+        login = self._login()
+        self.assertIsNotNone(token_utils.verify_signed_token(login["token"]))
+        self.login_manager.logout(login["user_id"])
+        self.assertIsNone(token_utils.verify_signed_token(login["token"]))
+
+    def test_login_revokes_token_of_the_same_millisecond(self):
+        first = self._login()
+        second = self._login()
+        self.assertIsNone(token_utils.verify_signed_token(first["token"]))
+        self.assertIsNotNone(token_utils.verify_signed_token(second["token"]))
+
+    def test_login_after_logout_of_the_same_millisecond(self):
+        first = self._login()
+        self.login_manager.logout(first["user_id"])
+        second = self._login()
+        self.assertIsNone(token_utils.verify_signed_token(first["token"]))
+        self.assertIsNotNone(token_utils.verify_signed_token(second["token"]))
+
+    def test_logout_revokes_token_when_the_clock_steps_back(self):
+        login = self._login()
+        token_store_utils.now_ms.return_value -= 5
+        self.login_manager.logout(login["user_id"])
+        self.assertIsNone(token_utils.verify_signed_token(login["token"]))
+
+
+@override_settings(AUTH_TOKEN_FORMAT="signed")
+class SignedTokenTests(AuthTestCase):
+    def test_valid_token_carries_the_user(self):
+        login = self._login()
+        self.assertEqual(
+            auth_utils.get_user_from_token(login["token"]),
+            {"user_id": self.user_id, "is_admin": False}
+        )
+
+    def test_tampered_token_is_rejected(self):
+        token = self._login()["token"]
+        payload, _, signature = token.partition(".")
+        claims = codec_utils.loads(token_utils._b64decode(payload))
+        claims["adm"] = True
+        forged = token_utils._b64encode(codec_utils.dumps_bytes(claims))
+
+        self.assertIsNone(
+            token_utils.verify_signed_token(forged + "." + signature)
+        )
+        self.assertIsNone(
+            token_utils.verify_signed_token(payload + "." + signature[:-2])
+        )
+
+    def test_token_signed_with_another_key_is_rejected(self):
+        token = self._login()["token"]
+        with self.settings(SECRET_KEY="another-secret"):
+            self.assertIsNone(token_utils.verify_signed_token(token))
+
+    def test_signed_payload_that_is_not_json_is_rejected(self):
+        payload = token_utils._b64encode(b"not json")
+        token = payload + "." + token_utils._signature(payload)
+        self.assertIsNone(token_utils.verify_signed_token(token))
+
+    def test_expired_token_is_rejected(self):
+        token = self._login()["token"]
+        with mock.patch.object(
+            token_store_utils, "now_ms",
+            return_value=token_store_utils.now_ms()
+            + settings.AUTH_TOKEN_TTL_SECONDS * 1000 + 1
+        ):
+            self.assertIsNone(token_utils.verify_signed_token(token))
+
+    def test_other_workers_see_a_logout_after_their_refresh(self):
+        token = self._login()["token"]
+        self.assertIsNotNone(token_utils.verify_signed_token(token))
+        # Logout handled by another worker: only the token store changes
+        token_store_utils.get_token_store().revoke(self.user_id)
+        self.assertIsNotNone(token_utils.verify_signed_token(token))
+
+        token_utils._cutoffs_loaded_at -= (
+            settings.AUTH_REVOCATION_REFRESH_SECONDS
+        )
+        self.assertIsNone(token_utils.verify_signed_token(token))
+
+
+class TokenStoreTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.token_store = token_store_utils.get_token_store()
+
+    def _later(self, seconds):
+        return mock.patch.object(
+            token_store_utils, "now_ms",
+            return_value=token_store_utils.now_ms() + seconds * 1000
+        )
+
+    def test_token_expires_after_its_ttl(self):
+        token = self._login()["token"]
+        self.assertIsNotNone(self.token_store.lookup(token))
+        with self._later(settings.AUTH_TOKEN_TTL_SECONDS + 1):
+            self.assertIsNone(self.token_store.lookup(token))
+            auth_utils._token_cache.clear()
+            self.assertIsNone(auth_utils.get_user_from_token(token))
+
+    @override_settings(AUTH_TOKEN_SWEEP_BATCH_SIZE=1)
+    def test_sweep_deletes_only_expired_records(self):
+        self._login()
+        other_id = codec_utils.loads(
+            self.user_manager.create_user(codec_utils.dumps({
+                "name": "other", "display_name": "Other", "password": "pass"
+            }))
+        )["id"]
+        with self._later(settings.AUTH_TOKEN_TTL_SECONDS + 1):
+            # Logged in after the planner's token expired
+            self.token_store.issue(other_id, "other-token")
+            self.assertEqual(self.token_store.sweep(), 1)
+        self.assertIsNone(self.token_store.storage.get("tokens", self.user_id))
+        self.assertIsNotNone(self.token_store.storage.get("tokens", other_id))
+
+    def test_sweep_keeps_a_record_renewed_since_the_scan(self):
+        self._login()
+        stale_record = dict(
+            self.token_store.storage.get("tokens", self.user_id),
+            not_before=0
+        )
+        with mock.patch.object(
+            self.token_store.storage, "all", return_value=[stale_record]
+        ):
+            self.assertEqual(self.token_store.sweep(), 0)
+        self.assertIsNotNone(
+            self.token_store.storage.get("tokens", self.user_id)
+        )
+
+    def test_record_without_not_before_uses_its_creation_time(self):
+        record = {"user_id": self.user_id, "created_at": "2020-01-01T00:00:00"}
+        self.assertTrue(token_store_utils.is_expired(record))
+
+    def test_sweeper_starts_only_when_enabled(self):
+        token_store_utils._token_store = None
+        with mock.patch.object(
+            token_store_utils.threading, "Thread"
+        ) as thread:
+            token_store_utils.get_token_store()
+            self.assertFalse(thread.called)
+            token_store_utils._token_store = None
+            with self.settings(AUTH_TOKEN_SWEEP_INTERVAL_SECONDS=60):
+                token_store_utils.get_token_store()
+        thread.return_value.start.assert_called_once_with()
+
+
+class ApiAuthenticationTests(AuthTestCase):
+    def _get(self, name, token=None, **params):
+        headers = {"HTTP_AUTHORIZATION": f"Token {token}"} if token else {}
+        return self.client.get(reverse(name), params, **headers)
+
+    def _assert_denied(self, response, message_key):
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(
+            response.json(),
+            {"error": settings.RESPONSE_MSG_CONSTANTS_DICT[message_key]}
+        )
+
+    def test_request_without_a_token_is_rejected(self):
+        self._assert_denied(
+            self._get("describe-user", id=self.user_id), 'UNAUTH'
+        )
+
+    def test_request_with_an_unknown_token_is_rejected(self):
+        self._assert_denied(
+            self._get("describe-user", token="unknown", id=self.user_id),
+            'UNAUTH'
+        )
+
+    def test_token_authenticates_the_caller(self):
+        token = self._login()["token"]
+        response = self._get("describe-user", token=token, id=self.user_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user_id"], self.user_id)
+
+    @override_settings(AUTH_TOKEN_FORMAT="signed")
+    def test_signed_token_authenticates_the_caller(self):
+        token = self._login()["token"]
+        response = self._get("describe-user", token=token, id=self.user_id)
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_endpoint_reports_the_view_message(self):
+        token = self._login()["token"]
+        response = self.client.post(
+            reverse("create-team"),
+            {"name": "team", "description": "team", "admin": self.user_id},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Token {token}"
+        )
+        self._assert_denied(response, 'ONLY_ADMIN_RESTRICT_TEAM')
+
+    def test_team_endpoint_is_limited_to_members(self):
+        admin_id = codec_utils.loads(
+            self.user_manager.create_user(codec_utils.dumps({
+                "name": "admin_user", "display_name": "Admin",
+                "password": "pass", "is_admin": True
+            }))
+        )["id"]
+        team_id = codec_utils.loads(
+            teams_service.TeamsManager().create_team(codec_utils.dumps({
+                "name": "team", "description": "team", "admin": admin_id
+            }))
+        )["id"]
+        token = self._login()["token"]
+        self._assert_denied(
+            self._get("describe-team", token=token, id=team_id), 'DENY'
+        )
+
+
+class IntrospectTests(AuthTestCase):
+    def _introspect(self, tokens):
+        return codec_utils.loads(self.login_manager.introspect(
+            codec_utils.dumps({"tokens": tokens})
+        ))["results"]
+
+    def test_results_follow_the_requested_tokens(self):
+        token = self._login()["token"]
+        self.assertEqual(self._introspect([token, "unknown", "", token]), [
+            {
+                "token": token, "active": True, "user_id": self.user_id,
+                "is_admin": False
+            },
+            {"token": "unknown", "active": False},
+            {"token": "", "active": False},
+            {
+                "token": token, "active": True, "user_id": self.user_id,
+                "is_admin": False
+            }
+        ])
+
+    def test_uncached_tokens_are_looked_up_together(self):
+        token = self._login()["token"]
+        auth_utils._token_cache.clear()
+        with mock.patch.object(
+            token_store_utils.TokenStore, "lookup_many",
+            wraps=token_store_utils.get_token_store().lookup_many
+        ) as lookup_many:
+            results = self._introspect([token, "unknown", token])
+            self._introspect([token])
+        lookup_many.assert_called_once_with([token, "unknown"])
+        self.assertEqual(
+            [result["active"] for result in results], [True, False, True]
+        )
+
+    def test_signed_and_opaque_tokens_in_one_call(self):
+        opaque_token = self._login()["token"]
+        other_id = codec_utils.loads(
+            self.user_manager.create_user(codec_utils.dumps({
+                "name": "reviewer", "display_name": "Reviewer",
+                "password": "pass"
+            }))
+        )["id"]
+        with self.settings(AUTH_TOKEN_FORMAT="signed"):
+            signed_token = codec_utils.loads(self.login_manager.login(
+                codec_utils.dumps({"name": "reviewer", "password": "pass"})
+            ))["token"]
+        self.assertTrue(token_utils.is_signed_token(signed_token))
+
+        results = self._introspect([signed_token, opaque_token])
+        self.assertEqual(
+            [(result["active"], result["user_id"]) for result in results],
+            [(True, other_id), (True, self.user_id)]
+        )
+
+        self.login_manager.logout(other_id)
+        self.assertEqual(
+            [result["active"] for result in self._introspect(
+                [signed_token, opaque_token]
+            )],
+            [False, True]
+        )
+
+    def test_empty_token_list_is_rejected(self):
+        with self.assertRaises(serializers.ValidationError):
+            self._introspect([])
@@ -3,5 +3,15 @@ from django.urls import path
 from app_auth import views as app_auth_views
 
 urlpatterns = [
-    path("login/", app_auth_views.LoginAPIView.as_view(), name="login")
+    path("login/", app_auth_views.LoginAPIView.as_view(), name="login"),
+    path(
+        "logout/",
+        app_auth_views.LogoutAPIView.as_view(),
+        name="logout"
+    ),
+    path(
+        "introspect/",
+        app_auth_views.IntrospectAPIView.as_view(),
+        name="introspect"
+    )
 ]
@@ -1,22 +1,68 @@
-import json
-
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework import permissions
 from rest_framework import status
 
 from app_auth import service as app_auth_service
 
+from common_utils import api_auth_utils
+from common_utils import codec_utils
+from common_utils import response_utils
+
 
 class LoginAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.login_manager = app_auth_service.LoginManager()
 
     def post(self, request):
         try:
-            result = self.login_manager.login(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            result = self.login_manager.login(codec_utils.dumps(request.data))
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_401_UNAUTHORIZED
             )
+
+
+class LogoutAPIView(APIView):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.login_manager = app_auth_service.LoginManager()
+
+    def post(self, request):
+        try:
+            result = self.login_manager.logout(request.user.user_id)
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class IntrospectAPIView(APIView):
+    permission_classes = [api_auth_utils.IsPlannerAdmin]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.login_manager = app_auth_service.LoginManager()
+
+    def post(self, request):
+        try:
+            result = self.login_manager.introspect(
+                codec_utils.dumps(request.data)
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
@@ -2,6 +2,8 @@ from rest_framework import serializers
 
 from django.conf import settings
 
+from common_utils import pagination_utils
+
 
 class AddTaskSerializer(serializers.Serializer):
     title = serializers.CharField(max_length=64)
@@ -22,6 +24,33 @@ class AddTaskSerializer(serializers.Serializer):
         return value
 
 
+class BulkAddTaskSerializer(serializers.Serializer):
+    board_id = serializers.CharField(max_length=8)
+    # Each item is validated by AddTaskSerializer in the service
+    tasks = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.TASK_BULK_CREATE_MAX_TASKS
+    )
+
+
 class TaskStatusUpdateSerializer(serializers.Serializer):
     id = serializers.CharField(max_length=11)
     status = serializers.ChoiceField(choices=settings.TASK_STATUS_CHOICES)
+
+
+class ListTasksSerializer(pagination_utils.PageSerializer):
+    board_id = serializers.CharField(max_length=8)
+    status = serializers.ChoiceField(
+        choices=settings.TASK_STATUS_CHOICES, required=False
+    )
+    user_id = serializers.CharField(max_length=8, required=False)
+    # Bounds on creation_time, both included and compared as stored, so
+    # ISO 8601 times compare in time order
+    created_from = serializers.CharField(required=False)
+    created_to = serializers.CharField(required=False)
+    order = serializers.ChoiceField(
+        choices=["creation_time", "-creation_time"],
+        required=False,
+        default="creation_time"
+    )
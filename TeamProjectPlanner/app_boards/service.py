@@ -1,8 +1,9 @@
-import json
 import os
 from datetime import datetime
 from uuid import uuid4
 
+from rest_framework import serializers
+
 from django.conf import settings
 
 from app_boards.custom_serializers import boards_serializer as \
@@ -13,77 +14,69 @@ from app_boards.custom_serializers import tasks_serializer as \
 from project_planner_tool.base_interface import project_board_base as \
     board_nd_task_base_interface
 
-from common_utils import base_utils as generic_utils
+from common_utils import codec_utils
+from common_utils import pagination_utils
+from common_utils import stats_utils
+from common_utils import storage_utils
 
 
 class BoardsManager(board_nd_task_base_interface.ProjectBoardBase):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.storage = storage_utils.get_storage()
 
     def create_board(self, request):
-        data = json.loads(request)
-        boards_info = generic_utils.load_json(settings.BOARD_FILE)
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-
-        # Build team_id -> set(board_name) map
-        team_board_map = {}
-        for board in boards_info:
-            team_board_map.setdefault(
-                board["team_id"], set()
-            ).add(board["name"])
-
-        serializer = app_boards_serializer.BoardCreateSerializer(
-            data=data,
-            context={"team_board_map": team_board_map}
-        )
+        data = codec_utils.loads(request)
+        serializer = app_boards_serializer.BoardCreateSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         validated = serializer.validated_data
 
-        team_record = next(
-            (
-                team for team in teams_info
-                if team["team_id"] == validated["team_id"]
-            ),
-            None
-        )
-        if not team_record:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
-            )
-
-        board_id = "b_" + uuid4().hex[:6]
-        new_board = {
-            "board_id": board_id,
-            "name": validated["name"],
-            "description": validated["description"],
-            "team_id": validated["team_id"],
-            "creation_time": validated["creation_time"],
-            # NOTE: Initializing with OPEN
-            "status": settings.TASK_STATUS_CHOICES[0]
-        }
+        with self.storage.transaction("boards", "stats") as txn:
+            # Board names are unique per team; look them up with the team id
+            # as validation stores it (e.g. stripped of whitespace)
+            if txn.exists(
+                "boards", team_id=validated["team_id"], name=validated["name"]
+            ):
+                raise serializers.ValidationError({"name": [
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['UNIQUE_BOARD']
+                ]})
+
+            team_record = self.storage.get("teams", validated["team_id"])
+            if not team_record:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
+                )
+
+            board_id = "b_" + uuid4().hex[:6]
+            new_board = {
+                "board_id": board_id,
+                "name": validated["name"],
+                "description": validated["description"],
+                "team_id": validated["team_id"],
+                "creation_time": validated["creation_time"],
+                # NOTE: Initializing with OPEN
+                "status": settings.TASK_STATUS_CHOICES[0]
+            }
 
-        boards_info.append(new_board)
-        generic_utils.save_json(settings.BOARD_FILE, boards_info)
+            stats_utils.count_board_changes(
+                txn, new_board["team_id"], [(None, new_board["status"])]
+            )
+            txn.put("boards", new_board)
 
-        return json.dumps({"id": board_id})
+        return codec_utils.dumps({"id": board_id})
 
     def list_boards(self, request, acting_user_id, is_admin):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         team_id = data.get("id")
-        boards_info = generic_utils.load_json(settings.BOARD_FILE)
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-        team_record = next(
-            (team for team in teams_info if team["team_id"] == team_id),
-            None
-        )
+        team_record = self.storage.get("teams", team_id)
         if not team_record:
             raise Exception(
                 settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
             )
 
-        if not is_admin and acting_user_id not in team_record['members']:
+        if not is_admin and not self.storage.exists(
+            "teams", team_id=team_id, members=acting_user_id
+        ):
             raise Exception(
                 settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
             )
@@ -94,111 +87,94 @@ class BoardsManager(board_nd_task_base_interface.ProjectBoardBase):
                 "name": board["name"],
                 "status": board["status"]
             }
-            for board in boards_info
-            if board["team_id"] == team_id and board["status"]
+            for board in self.storage.find("boards", team_id=team_id)
+            if board["status"]
         ]
-        return json.dumps(filtered)
+        return codec_utils.dumps(filtered)
 
     def close_board(self, request, acting_user_id, is_admin):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_boards_serializer.BoardIdSerializer(data=data)
         serializer.is_valid(raise_exception=True)
 
         board_id = serializer.validated_data["id"]
-        boards_info = generic_utils.load_json(settings.BOARD_FILE)
-        tasks_info = generic_utils.load_json(settings.TASK_FILE)
-
-        board_record = next(
-            (
-                board for board in boards_info
-                if board["board_id"] == board_id
-            ),
-            None
-        )
-        if not board_record:
+        if not self.storage.get("boards", board_id):
             raise Exception(
                 settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_NOT_FOUND']
             )
 
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-        team_record = next(
-            (
-                team for team in teams_info
-                if team["team_id"] == board_record['team_id']
-            ),
-            None
-        )
-
-        if not is_admin and acting_user_id not in team_record['members']:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
-            )
-
-        # BOARD_STATUS_CHOICES[-1] -> Closed
-        if board_record["status"] == settings.BOARD_STATUS_CHOICES[-1]:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_CLOSED']
-            )
-
-        incomplete_tasks = [
-            task for task in tasks_info
-            if task["board_id"] == board_id and task["status"] != "COMPLETE"
-        ]
-        if incomplete_tasks:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_NOT_CLOSED']
+        # Only this board's tasks are locked, so closing a board does not
+        # hold up task writes on any other board. They are not read: the
+        # board's task counters are kept under that same lock
+        with self.storage.transaction(
+            "boards", "tasks", "stats", board_id=board_id
+        ) as txn:
+            board_record = txn.get("boards", board_id)
+
+            if not is_admin and not txn.exists(
+                "teams", team_id=board_record['team_id'],
+                members=acting_user_id
+            ):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+                )
+
+            # BOARD_STATUS_CHOICES[-1] -> Closed
+            if board_record["status"] == settings.BOARD_STATUS_CHOICES[-1]:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_CLOSED']
+                )
+
+            # TASK_STATUS_CHOICES[2] -> COMPLETE
+            task_counts = stats_utils.board_task_counts(txn, board_id)
+            if any(
+                count for task_status, count in task_counts["tasks"].items()
+                if task_status != settings.TASK_STATUS_CHOICES[2]
+            ):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_NOT_CLOSED']
+                )
+
+            stats_utils.count_board_changes(
+                txn, board_record["team_id"],
+                [(board_record["status"], "CLOSED")]
             )
+            board_record["status"] = "CLOSED"
+            board_record["end_time"] = datetime.now().isoformat()
+            txn.put("boards", board_record)
 
-        board_record["status"] = "CLOSED"
-        board_record["end_time"] = datetime.now().isoformat()
-        generic_utils.save_json(settings.BOARD_FILE, boards_info)
-
-        return json.dumps({"message": "Board closed successfully"})
+        return codec_utils.dumps({"message": "Board closed successfully"})
 
     def export_board(self, request, acting_user_id, is_admin):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_boards_serializer.BoardIdSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         board_id = serializer.validated_data["id"]
 
-        boards_info = generic_utils.load_json(settings.BOARD_FILE)
-        tasks_info = generic_utils.load_json(settings.TASK_FILE)
-        users_info = generic_utils.load_json(settings.USER_FILE)
-
-        board_record = next(
-            (
-                board for board in boards_info
-                if board["board_id"] == board_id
-            ),
-            None
-        )
-        if not board_record:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_NOT_FOUND']
-            )
-
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-        team_record = next(
-            (
-                team for team in teams_info
-                if team["team_id"] == board_record['team_id']
-            ),
-            None
-        )
-
-        if not is_admin and acting_user_id not in team_record['members']:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
-            )
-
-        board_tasks = [
-            task for task in tasks_info
-            if task["board_id"] == board_id
-        ]
-        user_map = {
-            user["user_id"]: user["display_name"]
-            for user in users_info
-        }
+        # Read everything the summary needs as of one point in time
+        with self.storage.snapshot(
+            "boards", "teams", "users", "tasks", board_id=board_id
+        ) as storage:
+            board_record = storage.get("boards", board_id)
+            if not board_record:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_NOT_FOUND']
+                )
+
+            if not is_admin and not storage.exists(
+                "teams", team_id=board_record['team_id'],
+                members=acting_user_id
+            ):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+                )
+
+            board_tasks = storage.find("tasks", board_id=board_id)
+            user_map = {}
+            for user_id in {task["user_id"] for task in board_tasks}:
+                user_record = storage.get("users", user_id)
+                if user_record:
+                    user_map[user_id] = user_record["display_name"]
 
         lines = [
             f"Board: {board_record['name']}",
@@ -227,139 +203,283 @@ class BoardsManager(board_nd_task_base_interface.ProjectBoardBase):
         with open(filename, "w") as f:
             f.write("\n".join(lines))
 
-        return json.dumps({"out_file": filename})
+        return codec_utils.dumps({"out_file": filename})
 
 
 class TaskManager(board_nd_task_base_interface.ProjectBoardBase):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.storage = storage_utils.get_storage()
 
     def add_task(self, request, acting_user_id, is_admin):
-        data = json.loads(request)
-
-        tasks_info = generic_utils.load_json(settings.TASK_FILE)
-        boards_info = generic_utils.load_json(settings.BOARD_FILE)
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-
-        # Build: board_id → set(task_title)
-        task_title_map = {}
-        for task in tasks_info:
-            task_title_map.setdefault(
-                task["board_id"], set()
-            ).add(task["title"])
-
-        serializer = app_tasks_serializer.AddTaskSerializer(
-            data=data,
-            context={"task_title_map": task_title_map}
-        )
+        data = codec_utils.loads(request)
+
+        # Field checks first: the board id picks the tasks to lock
+        serializer = app_tasks_serializer.AddTaskSerializer(data=data)
         serializer.is_valid(raise_exception=True)
-        validated = serializer.validated_data
+        board_id = serializer.validated_data["board_id"]
 
-        # Validate board existence
-        board_record = next(
-            (
-                board for board in boards_info
-                if board["board_id"] == validated["board_id"]
-            ),
-            None
-        )
-        if not board_record:
+        if not self.storage.get("boards", board_id):
             raise Exception(
                 settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_NOT_FOUND']
             )
 
-        # TASK_STATUS_CHOICES[0] -> OPEN
-        if board_record["status"] != settings.TASK_STATUS_CHOICES[0]:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['TASK_CANT_ADD']
-            )
+        with self.storage.transaction(
+            "tasks", "stats", board_id=board_id
+        ) as txn:
+            # Build: board_id → set(task_title)
+            task_title_map = {
+                board_id: {
+                    task["title"]
+                    for task in txn.find("tasks", board_id=board_id)
+                }
+            }
 
-        # Check acting user (from token) is a member of board's team
-        team_record = next(
-            (
-                team for team in teams_info
-                if team["team_id"] == board_record["team_id"]
-            ),
-            None
-        )
-        if not team_record:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND_IN_BOARD']
+            serializer = app_tasks_serializer.AddTaskSerializer(
+                data=data,
+                context={"task_title_map": task_title_map}
             )
-
-        # Validate assigned user is also in the team
-        if validated["user_id"] not in team_record["members"]:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT[
-                    'ASSIGNED_USER_NOT_IN_TEAM'
-                ]
+            serializer.is_valid(raise_exception=True)
+            validated = serializer.validated_data
+
+            # NOTE: Re-read under the tasks lock, close_board holds it while
+            # it flips the board status
+            board_record = txn.get("boards", board_id)
+
+            # TASK_STATUS_CHOICES[0] -> OPEN
+            if board_record["status"] != settings.TASK_STATUS_CHOICES[0]:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['TASK_CANT_ADD']
+                )
+
+            # Check acting user (from token) is a member of board's team
+            team_id = board_record["team_id"]
+            if not txn.exists("teams", team_id=team_id):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT[
+                        'TEAM_NOT_FOUND_IN_BOARD'
+                    ]
+                )
+
+            # Validate assigned user is also in the team
+            if not txn.exists(
+                "teams", team_id=team_id, members=validated["user_id"]
+            ):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT[
+                        'ASSIGNED_USER_NOT_IN_TEAM'
+                    ]
+                )
+
+            # Admin can assign/create tasks even if they are not on this board
+            if not is_admin and not txn.exists(
+                "teams", team_id=team_id, members=acting_user_id
+            ):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['USER_NOT_IN_TEAM']
+                )
+
+            new_task = self._new_task(validated)
+
+            stats_utils.count_task_changes(
+                txn, board_id, [(validated["user_id"], None, "OPEN")]
             )
+            txn.put("tasks", new_task)
+
+        return codec_utils.dumps({"id": new_task["task_id"]})
 
-        # Admin can assign/create tasks even if they are not on this board
-        if not is_admin and acting_user_id not in team_record["members"]:
+    def bulk_add_tasks(self, request, acting_user_id, is_admin):
+        data = codec_utils.loads(request)
+        serializer = app_tasks_serializer.BulkAddTaskSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        board_id = serializer.validated_data["board_id"]
+        items = serializer.validated_data["tasks"]
+
+        if not self.storage.get("boards", board_id):
             raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['USER_NOT_IN_TEAM']
+                settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_NOT_FOUND']
             )
 
+        with self.storage.transaction(
+            "tasks", "stats", board_id=board_id
+        ) as txn:
+            # NOTE: Read under the tasks lock, as in add_task
+            board_record = txn.get("boards", board_id)
+
+            # TASK_STATUS_CHOICES[0] -> OPEN
+            if board_record["status"] != settings.TASK_STATUS_CHOICES[0]:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['TASK_CANT_ADD']
+                )
+
+            team_record = txn.get("teams", board_record["team_id"])
+            if not team_record:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT[
+                        'TEAM_NOT_FOUND_IN_BOARD'
+                    ]
+                )
+            members = set(team_record["members"])
+
+            if not is_admin and acting_user_id not in members:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['USER_NOT_IN_TEAM']
+                )
+
+            # The board's titles are read once; the batch's own titles join
+            # them as the items are validated
+            titles = {
+                task["title"] for task in txn.find("tasks", board_id=board_id)
+            }
+
+            new_tasks = []
+            task_ids = set()
+            item_errors = []
+            for item in items:
+                item_serializer = app_tasks_serializer.AddTaskSerializer(
+                    data=dict(item, board_id=board_id),
+                    context={"task_title_map": {board_id: titles}}
+                )
+                if not item_serializer.is_valid():
+                    item_errors.append(item_serializer.errors)
+                    continue
+                validated = item_serializer.validated_data
+                if validated["user_id"] not in members:
+                    item_errors.append({"user_id": [
+                        settings.RESPONSE_MSG_CONSTANTS_DICT[
+                            'ASSIGNED_USER_NOT_IN_TEAM'
+                        ]
+                    ]})
+                    continue
+                item_errors.append({})
+                new_task = self._new_task(validated, taken_ids=task_ids)
+                titles.add(new_task["title"])
+                task_ids.add(new_task["task_id"])
+                new_tasks.append(new_task)
+
+            # All or nothing: leaving the transaction by an exception
+            # discards it
+            if any(item_errors):
+                raise serializers.ValidationError({"tasks": item_errors})
+
+            stats_utils.count_task_changes(txn, board_id, [
+                (new_task["user_id"], None, "OPEN") for new_task in new_tasks
+            ])
+            for new_task in new_tasks:
+                txn.put("tasks", new_task)
+
+        return codec_utils.dumps({
+            "ids": [new_task["task_id"] for new_task in new_tasks]
+        })
+
+    def _new_task(self, validated, taken_ids=()):
+        # Task ids are unique across boards: the lookup goes through the
+        # task manifest, not only this board's tasks
         task_id = "task_" + uuid4().hex[:6]
-        new_task = {
+        while task_id in taken_ids or self.storage.get("tasks", task_id):
+            task_id = "task_" + uuid4().hex[:6]
+
+        return {
             "task_id": task_id,
             "board_id": validated["board_id"],
             "title": validated["title"],
             "description": validated["description"],
             "user_id": validated["user_id"],
             "creation_time": validated["creation_time"],
-            "status": "OPEN"
+            "status": settings.TASK_STATUS_CHOICES[0]
         }
 
-        tasks_info.append(new_task)
-        generic_utils.save_json(settings.TASK_FILE, tasks_info)
-
-        return json.dumps({"id": task_id})
-
     def update_task_status(self, request, acting_user_id, is_admin):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_tasks_serializer.TaskStatusUpdateSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         validated = serializer.validated_data
 
-        tasks_info = generic_utils.load_json(settings.TASK_FILE)
-        task_record = next(
-            (
-                task for task in tasks_info
-                if task["task_id"] == validated["id"]
-            ),
-            None
-        )
+        task_record = self.storage.get("tasks", validated["id"])
         if not task_record:
             raise Exception(
                 settings.RESPONSE_MSG_CONSTANTS_DICT['TASK_NOT_FOUND']
             )
-        
-        boards_info = generic_utils.load_json(settings.BOARD_FILE)
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-
-        board_record = next(
-            (
-                board for board in boards_info
-                if board["board_id"] == task_record["board_id"]
-            ),
-            None
-        )
-        team_record = next(
-            (
-                team for team in teams_info
-                if team["team_id"] == board_record["team_id"]
-            ),
-            None
-        )
 
-        if not is_admin and acting_user_id not in team_record['members']:
+        board_id = task_record["board_id"]
+        with self.storage.transaction(
+            "tasks", "stats", board_id=board_id
+        ) as txn:
+            task_record = txn.get("tasks", validated["id"])
+            if not task_record:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['TASK_NOT_FOUND']
+                )
+
+            board_record = txn.get("boards", board_id)
+
+            if not is_admin and not txn.exists(
+                "teams", team_id=board_record["team_id"],
+                members=acting_user_id
+            ):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+                )
+
+            if task_record["status"] != validated["status"]:
+                stats_utils.count_task_changes(txn, board_id, [(
+                    task_record["user_id"], task_record["status"],
+                    validated["status"]
+                )])
+            task_record["status"] = validated["status"]
+            txn.put("tasks", task_record)
+
+        return codec_utils.dumps({"message": "Task status updated"})
+
+    def list_tasks(self, request, acting_user_id, is_admin):
+        data = codec_utils.loads(request)
+        serializer = app_tasks_serializer.ListTasksSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        validated = serializer.validated_data
+        board_id = validated["board_id"]
+
+        board_record = self.storage.get("boards", board_id)
+        if not board_record:
             raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+                settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_NOT_FOUND']
             )
 
-        task_record["status"] = validated["status"]
-        generic_utils.save_json(settings.TASK_FILE, tasks_info)
+        if not is_admin and not self.storage.exists(
+            "teams", team_id=board_record["team_id"], members=acting_user_id
+        ):
+            raise Exception(
+                settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+            )
 
-        return json.dumps({"message": "Task status updated"})
+        filters = {
+            field: validated[field]
+            for field in ("status", "user_id") if field in validated
+        }
+        # Walks the board's tasks in creation time order from the cursor on
+        tasks, next_after = self.storage.page_sorted(
+            "tasks",
+            "creation_time",
+            after=pagination_utils.decode_sorted_cursor(
+                validated.get("cursor")
+            ),
+            limit=validated["limit"],
+            board_id=board_id,
+            start=validated.get("created_from"),
+            end=validated.get("created_to"),
+            descending=validated["order"].startswith("-"),
+            **filters
+        )
+        return codec_utils.dumps({
+            "results": [
+                {
+                    "id": task["task_id"],
+                    "title": task["title"],
+                    "description": task["description"],
+                    "user_id": task["user_id"],
+                    "status": task["status"],
+                    "creation_time": task["creation_time"]
+                }
+                for task in tasks
+            ],
+            "next_cursor": pagination_utils.encode_cursor(next_after)
+        })
@@ -0,0 +1,329 @@
+from unittest import mock
+from uuid import UUID
+
+from rest_framework import serializers
+
+from django.conf import settings
+
+from app_boards import service as boards_service
+from app_teams import service as teams_service
+from app_users import service as user_service
+
+from common_utils import codec_utils
+from common_utils import pagination_utils
+from common_utils import stats_utils
+from common_utils import storage_test_utils
+
+
+class BoardsTestCase(storage_test_utils.JsonStoreTestCase):
+    """
+    An admin and a member in one team with an open board.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.boards_manager = boards_service.BoardsManager()
+        self.task_manager = boards_service.TaskManager()
+        self.admin_id = self._create_user("admin_user", is_admin=True)
+        self.member_id = self._create_user("member_user")
+        self.team_id = codec_utils.loads(
+            teams_service.TeamsManager().create_team(codec_utils.dumps({
+                "name": "team", "description": "team",
+                "admin": self.admin_id
+            }))
+        )["id"]
+        teams_service.TeamsManager().add_users_to_team(codec_utils.dumps({
+            "id": self.team_id, "users": [self.member_id]
+        }))
+        self.board_id = self._create_board("board one")
+
+    def _create_user(self, name, is_admin=False):
+        return codec_utils.loads(
+            user_service.UserManager().create_user(codec_utils.dumps({
+                "name": name, "display_name": name, "password": "secret",
+                "is_admin": is_admin
+            }))
+        )["id"]
+
+    def _create_board(self, name):
+        return codec_utils.loads(
+            self.boards_manager.create_board(codec_utils.dumps({
+                "name": name, "description": "board",
+                "team_id": self.team_id,
+                "creation_time": "2025-01-01T00:00:00"
+            }))
+        )["id"]
+
+    def _task(self, title, board_id=None, creation_time=None):
+        return {
+            "title": title, "description": "task",
+            "user_id": self.member_id,
+            "board_id": board_id or self.board_id,
+            "creation_time": creation_time or "2025-01-02T00:00:00"
+        }
+
+    def _add_task(self, title, board_id=None, creation_time=None):
+        return codec_utils.loads(self.task_manager.add_task(
+            codec_utils.dumps(self._task(title, board_id, creation_time)),
+            self.member_id, False
+        ))["id"]
+
+    def _set_status(self, task_id, status):
+        self.task_manager.update_task_status(
+            codec_utils.dumps({"id": task_id, "status": status}),
+            self.member_id, False
+        )
+
+
+class CreateBoardTests(BoardsTestCase):
+    def test_duplicate_name_is_rejected_for_unstripped_team_id(self):
+        with self.assertRaises(serializers.ValidationError):
+            self.boards_manager.create_board(codec_utils.dumps({
+                "name": "board one", "description": "board",
+                "team_id": f" {self.team_id} ",
+                "creation_time": "2025-01-01T00:00:00"
+            }))
+        self.assertEqual(
+            len(self.boards_manager.storage.find(
+                "boards", team_id=self.team_id
+            )),
+            1
+        )
+
+
+class TaskIdTests(BoardsTestCase):
+    def test_task_ids_are_unique_across_boards(self):
+        other_board_id = self._create_board("board two")
+        ids = [UUID(hex_id.ljust(32, "0")) for hex_id in (
+            "abcdef", "abcdef", "123456"
+        )]
+        with mock.patch.object(boards_service, "uuid4", side_effect=ids):
+            first_id = self._add_task("first")
+            second_id = self._add_task("second", board_id=other_board_id)
+        self.assertNotEqual(first_id, second_id)
+
+        self._set_status(first_id, "COMPLETE")
+        storage = self.task_manager.storage
+        self.assertEqual(storage.get("tasks", first_id)["title"], "first")
+        self.assertEqual(storage.get("tasks", first_id)["status"], "COMPLETE")
+        self.assertEqual(storage.get("tasks", second_id)["status"], "OPEN")
+        self.boards_manager.close_board(
+            codec_utils.dumps({"id": self.board_id}), self.admin_id, True
+        )
+
+
+class CloseBoardTests(BoardsTestCase):
+    def _close_board(self, acting_user_id=None, is_admin=False):
+        return self.boards_manager.close_board(
+            codec_utils.dumps({"id": self.board_id}),
+            acting_user_id or self.member_id, is_admin
+        )
+
+    def test_board_with_unfinished_tasks_stays_open(self):
+        first_id = self._add_task("first")
+        second_id = self._add_task("second")
+        self._set_status(first_id, "COMPLETE")
+        self._set_status(second_id, "IN_PROGRESS")
+        with self.assertRaisesMessage(
+            Exception,
+            settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_NOT_CLOSED']
+        ):
+            self._close_board()
+
+        self._set_status(second_id, "COMPLETE")
+        self._close_board()
+        board = self.boards_manager.storage.get("boards", self.board_id)
+        self.assertEqual(board["status"], "CLOSED")
+        self.assertIn("end_time", board)
+
+    def test_close_reads_the_counters_not_the_tasks(self):
+        self._set_status(self._add_task("first"), "COMPLETE")
+        with mock.patch.object(
+            stats_utils, "_new_board_stats"
+        ) as new_board_stats:
+            self._close_board()
+        new_board_stats.assert_not_called()
+
+    def test_closed_board_cannot_be_closed_again(self):
+        self._close_board()
+        with self.assertRaisesMessage(
+            Exception, settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_CLOSED']
+        ):
+            self._close_board()
+
+    def test_only_members_and_admins_close_the_board(self):
+        outsider_id = self._create_user("outsider_user")
+        with self.assertRaisesMessage(
+            Exception, settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+        ):
+            self._close_board(outsider_id)
+        self._close_board(outsider_id, is_admin=True)
+
+
+class ListTasksTests(BoardsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task_ids = {
+            title: self._add_task(title, creation_time=creation_time)
+            for title, creation_time in (
+                ("fifth", "2025-01-05T00:00:00"),
+                ("second", "2025-01-02T00:00:00"),
+                ("fourth", "2025-01-04T00:00:00"),
+                ("third", "2025-01-03T00:00:00"),
+                ("also fourth", "2025-01-04T00:00:00")
+            )
+        }
+        self._add_task("elsewhere", board_id=self._create_board("board two"))
+
+    def _list_tasks(self, acting_user_id=None, is_admin=False, **data):
+        return codec_utils.loads(self.task_manager.list_tasks(
+            codec_utils.dumps({"board_id": self.board_id, **data}),
+            acting_user_id or self.member_id, is_admin
+        ))
+
+    def _titles(self, **data):
+        return [task["title"] for task in self._list_tasks(**data)["results"]]
+
+    def _in_creation_order(self, *titles):
+        # Tasks created at the same time come in task id order
+        return sorted(titles, key=lambda title: (
+            self.task_manager.storage.get(
+                "tasks", self.task_ids[title]
+            )["creation_time"],
+            self.task_ids[title]
+        ))
+
+    def test_tasks_come_in_creation_time_order(self):
+        expected = self._in_creation_order(*self.task_ids)
+        self.assertEqual(self._titles(), expected)
+        self.assertEqual(
+            self._titles(order="-creation_time"), expected[::-1]
+        )
+
+    def test_creation_time_bounds_are_included(self):
+        self.assertEqual(
+            self._titles(
+                created_from="2025-01-03T00:00:00",
+                created_to="2025-01-04T00:00:00"
+            ),
+            self._in_creation_order("third", "fourth", "also fourth")
+        )
+
+    def test_status_and_assignee_filters(self):
+        self._set_status(self.task_ids["third"], "COMPLETE")
+        self.assertEqual(self._titles(status="COMPLETE"), ["third"])
+        self.assertEqual(self._titles(user_id=self.admin_id), [])
+        self.assertEqual(len(self._titles(user_id=self.member_id)), 5)
+
+    def test_pages_cover_every_task_once(self):
+        for order in ("creation_time", "-creation_time"):
+            listed = []
+            page = self._list_tasks(limit=2, order=order)
+            while True:
+                self.assertLessEqual(len(page["results"]), 2)
+                listed.extend(task["title"] for task in page["results"])
+                if page["next_cursor"] is None:
+                    break
+                page = self._list_tasks(
+                    limit=2, order=order, cursor=page["next_cursor"]
+                )
+            self.assertEqual(listed, self._titles(order=order))
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in (
+            "not a cursor",
+            pagination_utils.encode_cursor("task"),
+            pagination_utils.encode_cursor(["2025-01-01", 1])
+        ):
+            with self.assertRaisesMessage(
+                Exception,
+                settings.RESPONSE_MSG_CONSTANTS_DICT['INVALID_CURSOR']
+            ):
+                self._list_tasks(cursor=cursor)
+
+    def test_only_members_and_admins_list_the_tasks(self):
+        outsider_id = self._create_user("outsider_user")
+        with self.assertRaisesMessage(
+            Exception, settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+        ):
+            self._list_tasks(outsider_id)
+        self.assertEqual(
+            len(self._list_tasks(outsider_id, is_admin=True)["results"]), 5
+        )
+
+
+class BulkAddTasksTests(BoardsTestCase):
+    def _bulk_add(self, items, board_id=None):
+        return codec_utils.loads(self.task_manager.bulk_add_tasks(
+            codec_utils.dumps({
+                "board_id": board_id or self.board_id, "tasks": items
+            }),
+            self.member_id, False
+        ))
+
+    def _board_titles(self):
+        return sorted(
+            task["title"] for task in
+            self.task_manager.storage.find("tasks", board_id=self.board_id)
+        )
+
+    def test_ids_are_returned_in_request_order(self):
+        task_ids = self._bulk_add(
+            [self._task(title) for title in ("first", "second", "third")]
+        )["ids"]
+        storage = self.task_manager.storage
+        self.assertEqual(
+            [storage.get("tasks", task_id)["title"] for task_id in task_ids],
+            ["first", "second", "third"]
+        )
+        self.assertEqual(
+            stats_utils.board_task_counts(storage, self.board_id)["tasks"],
+            {"OPEN": 3, "IN_PROGRESS": 0, "COMPLETE": 0}
+        )
+
+    def test_duplicate_titles_reject_the_whole_batch(self):
+        self._add_task("existing")
+        with self.assertRaises(serializers.ValidationError) as raised:
+            self._bulk_add([
+                self._task("first"), self._task("first"),
+                self._task("existing"), self._task("second")
+            ])
+        errors = raised.exception.detail["tasks"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("title", errors[1])
+        self.assertIn("title", errors[2])
+        self.assertEqual(errors[3], {})
+        self.assertEqual(self._board_titles(), ["existing"])
+
+    def test_assignee_outside_the_team_is_rejected(self):
+        outsider_id = self._create_user("outsider_user")
+        item = dict(self._task("second"), user_id=outsider_id)
+        with self.assertRaises(serializers.ValidationError) as raised:
+            self._bulk_add([self._task("first"), item])
+        self.assertEqual(raised.exception.detail["tasks"][1], {
+            "user_id": [
+                settings.RESPONSE_MSG_CONSTANTS_DICT[
+                    'ASSIGNED_USER_NOT_IN_TEAM'
+                ]
+            ]
+        })
+        self.assertEqual(self._board_titles(), [])
+
+    def test_task_ids_are_unique_within_the_batch(self):
+        ids = [UUID(hex_id.ljust(32, "0")) for hex_id in (
+            "abcdef", "abcdef", "123456"
+        )]
+        with mock.patch.object(boards_service, "uuid4", side_effect=ids):
+            task_ids = self._bulk_add(
+                [self._task("first"), self._task("second")]
+            )["ids"]
+        self.assertEqual(task_ids, ["task_abcdef", "task_123456"])
+
+    def test_closed_board_takes_no_tasks(self):
+        self.boards_manager.close_board(
+            codec_utils.dumps({"id": self.board_id}), self.admin_id, True
+        )
+        with self.assertRaisesMessage(
+            Exception, settings.RESPONSE_MSG_CONSTANTS_DICT['TASK_CANT_ADD']
+        ):
+            self._bulk_add([self._task("first")])
@@ -31,9 +31,19 @@ urlpatterns += [
         app_board_views.AddTaskAPIView.as_view(),
         name='create-task'
     ),
+    path(
+        "tasks/bulk-create/",
+        app_board_views.BulkAddTasksAPIView.as_view(),
+        name='bulk-create-tasks'
+    ),
     path(
         "tasks/update-status/",
         app_board_views.UpdateTaskStatusAPIView.as_view(),
         name='update-task-status'
     ),
+    path(
+        "tasks/list/",
+        app_board_views.ListTasksAPIView.as_view(),
+        name='list-tasks'
+    ),
 ]
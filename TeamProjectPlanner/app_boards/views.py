@@ -1,47 +1,33 @@
-import json
-
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework import serializers
 from rest_framework import status
 
 from django.conf import settings
 
 from app_boards import service as boards_service
 
-from common_utils import auth_utils as common_auth_utils
+from common_utils import api_auth_utils
+from common_utils import codec_utils
+from common_utils import response_utils
 
 
 class CreateBoardAPIView(APIView):
+    permission_classes = [api_auth_utils.IsPlannerAdmin]
+    admin_denied_msg_key = 'ONLY_ADMIN_RESTRICT_BOARDS'
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.boards_manager = boards_service.BoardsManager()
 
     def post(self, request):
         try:
-            auth_header = request.headers.get("Authorization", "")
-            token = auth_header.replace("Token ", "").strip()
-            user = common_auth_utils.get_user_from_token(token)
-
-            if not user:
-                return Response(
-                    {
-                        "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                    },
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
-            if not user.get("is_admin"):
-                return Response(
-                    {
-                        "error": settings.RESPONSE_MSG_CONSTANTS_DICT[
-                            'ONLY_ADMIN_RESTRICT_BOARDS'
-                        ]
-                    },
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
-            result = self.boards_manager.create_board(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_201_CREATED)
+            result = self.boards_manager.create_board(
+                codec_utils.dumps(request.data)
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_201_CREATED
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -49,25 +35,14 @@ class CreateBoardAPIView(APIView):
 
 
 class ListBoardsAPIView(APIView):
+    permission_classes = [api_auth_utils.IsTeamMember]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.boards_manager = boards_service.BoardsManager()
 
     def get(self, request):
         try:
-            token = request.headers.get(
-                "Authorization", ""
-            ).replace("Token ", "").strip()
-            user = common_auth_utils.get_user_from_token(token)
-
-            if not user:
-                return Response(
-                    {
-                        "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                    },
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
             team_id = request.query_params.get("id")
 
             if not team_id:
@@ -81,11 +56,13 @@ class ListBoardsAPIView(APIView):
                 )
 
             result = self.boards_manager.list_boards(
-                json.dumps({'id': team_id}),
-                acting_user_id=user['user_id'],
-                is_admin=user.get('is_admin', False)
+                codec_utils.dumps({'id': team_id}),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -99,25 +76,14 @@ class CloseBoardAPIView(APIView):
 
     def post(self, request):
         try:
-            token = request.headers.get(
-                "Authorization", ""
-            ).replace("Token ", "").strip()
-            user = common_auth_utils.get_user_from_token(token)
-
-            if not user:
-                return Response(
-                    {
-                        "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                    },
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
             result = self.boards_manager.close_board(
-                json.dumps(request.data),
-                acting_user_id=user['user_id'],
-                is_admin=user.get('is_admin', False)
+                codec_utils.dumps(request.data),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -131,25 +97,14 @@ class ExportBoardAPIView(APIView):
 
     def post(self, request):
         try:
-            token = request.headers.get(
-                "Authorization", ""
-            ).replace("Token ", "").strip()
-            user = common_auth_utils.get_user_from_token(token)
-
-            if not user:
-                return Response(
-                    {
-                        "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                    },
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
             result = self.boards_manager.export_board(
-                json.dumps(request.data),
-                acting_user_id=user['user_id'],
-                is_admin=user.get('is_admin', False)
+                codec_utils.dumps(request.data),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -162,26 +117,41 @@ class AddTaskAPIView(APIView):
         self.task_manager = boards_service.TaskManager()
 
     def post(self, request):
-        token = request.headers.get(
-            "Authorization", ""
-        ).replace("Token ", "").strip()
-        user = common_auth_utils.get_user_from_token(token)
-
-        if not user:
+        try:
+            result = self.task_manager.add_task(
+                codec_utils.dumps(request.data),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_201_CREATED
+            )
+        except Exception as e:
             return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                },
-                status=status.HTTP_403_FORBIDDEN
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
             )
 
+
+class BulkAddTasksAPIView(APIView):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.task_manager = boards_service.TaskManager()
+
+    def post(self, request):
         try:
-            result = self.task_manager.add_task(
-                json.dumps(request.data),
-                acting_user_id=user["user_id"],
-                is_admin=user.get('is_admin', False)
+            result = self.task_manager.bulk_add_tasks(
+                codec_utils.dumps(request.data),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_201_CREATED
+            )
+        except serializers.ValidationError as e:
+            # Keeps the errors of every item structured
+            return Response(
+                {"error": e.detail}, status=status.HTTP_400_BAD_REQUEST
             )
-            return Response(json.loads(result), status=status.HTTP_201_CREATED)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -195,25 +165,35 @@ class UpdateTaskStatusAPIView(APIView):
 
     def put(self, request):
         try:
-            token = request.headers.get(
-                "Authorization", ""
-            ).replace("Token ", "").strip()
-            user = common_auth_utils.get_user_from_token(token)
+            result = self.task_manager.update_task_status(
+                codec_utils.dumps(request.data),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
 
-            if not user:
-                return Response(
-                    {
-                        "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                    },
-                    status=status.HTTP_403_FORBIDDEN
-                )
 
-            result = self.task_manager.update_task_status(
-                json.dumps(request.data),
-                acting_user_id=user['user_id'],
-                is_admin=user.get('is_admin', False)
+class ListTasksAPIView(APIView):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.task_manager = boards_service.TaskManager()
+
+    def get(self, request):
+        try:
+            result = self.task_manager.list_tasks(
+                codec_utils.dumps(request.query_params.dict()),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -2,8 +2,12 @@ from rest_framework import serializers
 
 from django.conf import settings
 
+from common_utils import serializer_utils
 
-class TeamCreateSerializer(serializers.Serializer):
+
+class TeamCreateSerializer(
+    serializer_utils.CleanNameMixin, serializers.Serializer
+):
     name = serializers.CharField(min_length=4, max_length=64)
     description = serializers.CharField(max_length=128)
     admin = serializers.CharField(max_length=8)
@@ -57,3 +61,21 @@ class RemoveUsersFromTeamSerializer(serializers.Serializer):
         child=serializers.CharField(max_length=8),
         max_length=50
     )
+
+
+class MembershipOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=["add", "remove"])
+    id = serializers.CharField(max_length=8)
+    users = serializers.ListField(
+        child=serializers.CharField(max_length=8),
+        allow_empty=False,
+        max_length=settings.TEAM_MEMBERSHIP_BATCH_MAX_USERS
+    )
+
+
+class MembershipBatchSerializer(serializers.Serializer):
+    operations = MembershipOperationSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.TEAM_MEMBERSHIP_BATCH_MAX_OPERATIONS
+    )
@@ -1,7 +1,8 @@
-import json
 from datetime import datetime
 from uuid import uuid4
 
+from rest_framework import serializers
+
 from django.conf import settings
 
 from app_teams.custom_serializers import teams_serializer as \
@@ -10,56 +11,72 @@ from app_teams.custom_serializers import teams_serializer as \
 from project_planner_tool.base_interface import team_base as \
     team_base_interface
 
-from common_utils import base_utils as generic_utils
+from common_utils import codec_utils
+from common_utils import pagination_utils
+from common_utils import stats_utils
+from common_utils import storage_utils
 
 
 class TeamsManager(team_base_interface.TeamBase):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.storage = storage_utils.get_storage()
 
     def create_team(self, request):
-        data = json.loads(request)
-
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-        users_info = generic_utils.load_json(settings.USER_FILE)
-
-        existing_team_names = {team["team_name"] for team in teams_info}
-        existing_user_ids = {user["user_id"] for user in users_info}
+        data = codec_utils.loads(request)
 
-        serializer = app_teams_serializer.TeamCreateSerializer(
-            data=data,
-            context={
-                "existing_team_names": existing_team_names,
-                "existing_user_ids": existing_user_ids
+        with self.storage.transaction("teams") as txn:
+            name = app_teams_serializer.TeamCreateSerializer.clean_name(
+                data.get("name")
+            )
+            existing_team_names = {
+                team["team_name"]
+                for team in txn.find("teams", team_name=name)
+            } if name is not None else set()
+            existing_user_ids = {
+                user["user_id"]
+                for user in self.storage.find(
+                    "users", user_id=data.get("admin")
+                )
             }
-        )
-        serializer.is_valid(raise_exception=True)
-        validated = serializer.validated_data
-
-        team_id = "t_" + uuid4().hex[:6]
-        creation_time = datetime.now().isoformat()
 
-        new_team = {
-            "team_id": team_id,
-            "team_name": validated["name"],
-            "description": validated["description"],
-            "creation_time": creation_time,
-            "admin": validated["admin"],
-            "created_by": validated["admin"],
-            "members": [validated["admin"]]
-        }
+            serializer = app_teams_serializer.TeamCreateSerializer(
+                data=data,
+                context={
+                    "existing_team_names": existing_team_names,
+                    "existing_user_ids": existing_user_ids
+                }
+            )
+            serializer.is_valid(raise_exception=True)
+            validated = serializer.validated_data
+
+            team_id = "t_" + uuid4().hex[:6]
+            creation_time = datetime.now().isoformat()
+
+            new_team = {
+                "team_id": team_id,
+                "team_name": validated["name"],
+                "description": validated["description"],
+                "creation_time": creation_time,
+                "admin": validated["admin"],
+                "created_by": validated["admin"],
+                "members": [validated["admin"]]
+            }
 
-        teams_info.append(new_team)
-        generic_utils.save_json(settings.TEAM_FILE, teams_info)
+            txn.put("teams", new_team)
 
-        return json.dumps({"id": team_id})
+        return codec_utils.dumps({"id": team_id})
 
-    def list_teams(self):
-        teams = generic_utils.load_json(settings.TEAM_FILE)
-        return json.dumps(teams)
+    def list_teams(self, request):
+        teams, next_cursor = pagination_utils.load_page(
+            self.storage, "teams", request
+        )
+        return codec_utils.dumps({
+            "results": teams, "next_cursor": next_cursor
+        })
 
     def add_users_to_team(self, request):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_teams_serializer.AddUsersToTeamSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         validated = serializer.validated_data
@@ -67,60 +84,56 @@ class TeamsManager(team_base_interface.TeamBase):
         team_id = validated["id"]
         users_to_add = validated["users"]
 
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-        users_info = generic_utils.load_json(settings.USER_FILE)
-
-        team_record = next(
-            (team for team in teams_info if team["team_id"] == team_id),
-            None
-        )
-        if not team_record:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
-            )
-
-        # Validate all user_ids
-        user_ids = {user["user_id"] for user in users_info}
-        for uid in users_to_add:
-            if uid not in user_ids:
+        with self.storage.transaction("teams") as txn:
+            team_record = txn.get("teams", team_id)
+            if not team_record:
                 raise Exception(
-                    settings.RESPONSE_MSG_CONSTANTS_DICT[
-                        'USER_NOT_EXIST'
-                    ].format(uid)
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
                 )
 
-        team_record["members"] = list(
-            set(team_record["members"]) | set(users_to_add)
-        )
-
-        generic_utils.save_json(settings.TEAM_FILE, teams_info)
-        return json.dumps({"message": "Users added successfully"})
+            # Validate all user_ids
+            for uid in users_to_add:
+                if not self.storage.get("users", uid):
+                    raise Exception(
+                        settings.RESPONSE_MSG_CONSTANTS_DICT[
+                            'USER_NOT_EXIST'
+                        ].format(uid)
+                    )
+
+            # Keep the existing order, new members are appended once each
+            members = set(team_record["members"])
+            team_record["members"] = team_record["members"] + [
+                uid for uid in dict.fromkeys(users_to_add)
+                if uid not in members
+            ]
+
+            txn.put("teams", team_record)
+        return codec_utils.dumps({"message": "Users added successfully"})
 
     def list_team_users(self, request, acting_user_id, is_admin):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_teams_serializer.TeamIdSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         team_id = serializer.validated_data["id"]
 
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-        users_info = generic_utils.load_json(settings.USER_FILE)
-
-        team_record = next(
-            (team for team in teams_info if team["team_id"] == team_id),
-            None
-        )
+        team_record = self.storage.get("teams", team_id)
         if not team_record:
             raise Exception(
                 settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
             )
-        if not is_admin and acting_user_id not in team_record['members']:
+        if not is_admin and not self.storage.exists(
+            "teams", team_id=team_id, members=acting_user_id
+        ):
             raise Exception(
                 settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
             )
 
         team_members = [
-            user for user in users_info
-            if user["user_id"] in team_record["members"]
+            user for user in (
+                self.storage.get("users", user_id)
+                for user_id in team_record["members"]
+            )
+            if user
         ]
         result = [
             {
@@ -130,75 +143,118 @@ class TeamsManager(team_base_interface.TeamBase):
             }
             for user in team_members
         ]
-        return json.dumps(result)
+        return codec_utils.dumps(result)
 
     def describe_team(self, request, acting_user_id, is_admin):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_teams_serializer.DescribeOrUpdateTeamSerializer(
             data=data
         )
         serializer.is_valid(raise_exception=True)
 
         team_id = serializer.validated_data["id"]
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-        team_record = next(
-            (team for team in teams_info if team["team_id"] == team_id),
-            None
-        )
+        team_record = self.storage.get("teams", team_id)
         if not team_record:
             raise Exception(
                 settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
             )
-        if not is_admin and acting_user_id not in team_record['members']:
+        if not is_admin and not self.storage.exists(
+            "teams", team_id=team_id, members=acting_user_id
+        ):
             raise Exception(
                 settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
             )
-        return json.dumps(team_record)
+        return codec_utils.dumps(team_record)
+
+    def team_stats(self, request, acting_user_id, is_admin):
+        data = codec_utils.loads(request)
+        serializer = app_teams_serializer.TeamIdSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        team_id = serializer.validated_data["id"]
+
+        # Counters of the team and its boards as of one point in time
+        with self.storage.snapshot("teams", "boards", "stats") as storage:
+            if not storage.exists("teams", team_id=team_id):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
+                )
+            if not is_admin and not storage.exists(
+                "teams", team_id=team_id, members=acting_user_id
+            ):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+                )
+
+            task_counts = dict.fromkeys(settings.TASK_STATUS_CHOICES, 0)
+            assignee_counts = {}
+            board_stats = []
+            for board in storage.find("boards", team_id=team_id):
+                counts = stats_utils.board_task_counts(
+                    storage, board["board_id"]
+                )
+                for task_status, count in counts["tasks"].items():
+                    task_counts[task_status] += count
+                for user_id, user_counts in counts["assignees"].items():
+                    totals = assignee_counts.setdefault(user_id, {})
+                    for task_status, count in user_counts.items():
+                        totals[task_status] = (
+                            totals.get(task_status, 0) + count
+                        )
+                board_stats.append({
+                    "board_id": board["board_id"],
+                    "name": board["name"],
+                    "status": board["status"],
+                    "tasks": counts["tasks"],
+                    "assignees": counts["assignees"]
+                })
+
+            return codec_utils.dumps({
+                "team_id": team_id,
+                "boards": stats_utils.team_board_counts(storage, team_id),
+                "tasks": task_counts,
+                "assignees": assignee_counts,
+                "board_stats": board_stats
+            })
 
     def update_team(self, request):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_teams_serializer.UpdateTeamSerializer(data=data)
         serializer.is_valid(raise_exception=True)
 
         team_id = serializer.validated_data["id"]
         updated_data = serializer.validated_data["team"]
 
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-        users_info = generic_utils.load_json(settings.USER_FILE)
-
-        team_record = next(
-            (team for team in teams_info if team["team_id"] == team_id),
-            None
-        )
-        if not team_record:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
-            )
+        with self.storage.transaction("teams") as txn:
+            team_record = txn.get("teams", team_id)
+            if not team_record:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
+                )
 
-        existing_names = {
-            team["team_name"]
-            for team in teams_info if team["team_id"] != team_id
-        }
-        user_ids = {user["user_id"] for user in users_info}
+            existing_names = {
+                team["team_name"]
+                for team in txn.find("teams", team_name=updated_data["name"])
+                if team["team_id"] != team_id
+            }
 
-        if updated_data["name"] in existing_names:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['UNIQUE_TEAM_NAME']
-            )
+            if updated_data["name"] in existing_names:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['UNIQUE_TEAM_NAME']
+                )
 
-        if updated_data["admin"] not in user_ids:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['ADMIN_NOT_EXIST']
-            )
+            if not self.storage.get("users", updated_data["admin"]):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['ADMIN_NOT_EXIST']
+                )
 
-        team_record["team_name"] = updated_data["name"]
-        team_record["description"] = updated_data["description"]
-        team_record["admin"] = updated_data["admin"]
-        generic_utils.save_json(settings.TEAM_FILE, teams_info)
-        return json.dumps({"message": "Team updated successfully"})
+            team_record["team_name"] = updated_data["name"]
+            team_record["description"] = updated_data["description"]
+            team_record["admin"] = updated_data["admin"]
+            txn.put("teams", team_record)
+        return codec_utils.dumps({"message": "Team updated successfully"})
 
     def remove_users_from_team(self, request):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_teams_serializer.RemoveUsersFromTeamSerializer(
             data=data
         )
@@ -207,32 +263,116 @@ class TeamsManager(team_base_interface.TeamBase):
         team_id = serializer.validated_data["id"]
         remove_ids = set(serializer.validated_data["users"])
 
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-        users_info = generic_utils.load_json(settings.USER_FILE)
-
-        team_record = next(
-            (team for team in teams_info if team["team_id"] == team_id),
-            None
-        )
-        if not team_record:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
-            )
-
-        user_ids = {user["user_id"] for user in users_info}
-        for user_to_remove_id in remove_ids:
-            if user_to_remove_id not in user_ids:
+        with self.storage.transaction("teams") as txn:
+            team_record = txn.get("teams", team_id)
+            if not team_record:
                 raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['TEAM_NOT_FOUND']
+                )
+
+            members = set(team_record["members"])
+            for user_to_remove_id in remove_ids:
+                if not self.storage.get("users", user_to_remove_id):
+                    raise Exception(
+                        settings.RESPONSE_MSG_CONSTANTS_DICT[
+                            'USER_NOT_EXIST'
+                        ].format(user_to_remove_id)
+                    )
+                if user_to_remove_id not in members:
+                    raise Exception(
+                        settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
+                    )
+
+            team_record["members"] = [
+                user_id for user_id in team_record["members"]
+                if user_id not in remove_ids
+            ]
+            txn.put("teams", team_record)
+        return codec_utils.dumps({"message": "Users removed from team"})
+
+    def update_memberships(self, request):
+        data = codec_utils.loads(request)
+        serializer = app_teams_serializer.MembershipBatchSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data["operations"]
+
+        with self.storage.transaction("teams") as txn:
+            # Every user id is checked once, against one version of users
+            with self.storage.snapshot("users"):
+                unknown_user_ids = {
+                    uid
+                    for uid in {
+                        uid for operation in operations
+                        for uid in operation["users"]
+                    }
+                    if not self.storage.exists("users", user_id=uid)
+                }
+
+            # Operations apply in order to a working copy of each team, so
+            # a user can be removed from one team and added to another
+            teams = {}
+            members = {}
+            item_errors = []
+            for operation in operations:
+                team_id = operation["id"]
+                if team_id not in teams:
+                    teams[team_id] = txn.get("teams", team_id)
+                    if teams[team_id]:
+                        members[team_id] = dict.fromkeys(
+                            teams[team_id]["members"]
+                        )
+                if not teams[team_id]:
+                    item_errors.append({
+                        "id": [
+                            settings.RESPONSE_MSG_CONSTANTS_DICT[
+                                'TEAM_NOT_FOUND'
+                            ]
+                        ]
+                    })
+                    continue
+
+                team_members = members[team_id]
+                user_errors = [
                     settings.RESPONSE_MSG_CONSTANTS_DICT[
                         'USER_NOT_EXIST'
-                    ].format(user_to_remove_id)
+                    ].format(uid)
+                    for uid in operation["users"] if uid in unknown_user_ids
+                ]
+                if operation["op"] == "remove":
+                    user_errors.extend(
+                        settings.RESPONSE_MSG_CONSTANTS_DICT[
+                            'NOT_TEAM_MEMBER'
+                        ].format(uid)
+                        for uid in operation["users"]
+                        if uid not in team_members
+                        and uid not in unknown_user_ids
+                    )
+                if user_errors:
+                    item_errors.append({"users": user_errors})
+                    continue
+                item_errors.append({})
+
+                for uid in operation["users"]:
+                    if operation["op"] == "add":
+                        team_members.setdefault(uid, None)
+                    else:
+                        team_members.pop(uid, None)
+
+            # All or nothing: leaving the transaction by an exception
+            # discards it
+            if any(item_errors):
+                raise serializers.ValidationError(
+                    {"operations": item_errors}
                 )
-            if user_to_remove_id not in team_record['members']:
-                raise Exception(settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH'])
 
-        team_record["members"] = [
-            user_id
-            for user_id in team_record["members"] if user_id not in remove_ids
-        ]
-        generic_utils.save_json(settings.TEAM_FILE, teams_info)
-        return json.dumps({"message": "Users removed from team"})
+            updated_team_ids = []
+            for team_id, team_record in teams.items():
+                if list(members[team_id]) != team_record["members"]:
+                    team_record["members"] = list(members[team_id])
+                    txn.put("teams", team_record)
+                    updated_team_ids.append(team_id)
+
+        return codec_utils.dumps({
+            "message": "Team memberships updated",
+            "updated_teams": updated_team_ids
+        })
@@ -0,0 +1,359 @@
+from rest_framework import serializers
+
+from django.conf import settings
+
+from app_boards import service as boards_service
+from app_teams import service as teams_service
+from app_users import service as user_service
+
+from common_utils import codec_utils
+from common_utils import storage_test_utils
+
+
+class TeamsTestCase(storage_test_utils.JsonStoreTestCase):
+    """
+    An admin user and the teams manager.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.teams_manager = teams_service.TeamsManager()
+        self.admin_id = self._create_user("admin_user", is_admin=True)
+
+    def _create_user(self, name, is_admin=False):
+        return codec_utils.loads(
+            user_service.UserManager().create_user(codec_utils.dumps({
+                "name": name, "display_name": name, "password": "secret",
+                "is_admin": is_admin
+            }))
+        )["id"]
+
+    def _create_team(self, name):
+        return codec_utils.loads(self.teams_manager.create_team(
+            codec_utils.dumps({
+                "name": name, "description": "team", "admin": self.admin_id
+            })
+        ))["id"]
+
+
+class TeamNameTests(TeamsTestCase):
+    def test_numeric_duplicate_name_is_rejected(self):
+        self._create_team("55555")
+        with self.assertRaises(serializers.ValidationError):
+            self._create_team(55555)
+        self.assertEqual(
+            len(self.teams_manager.storage.find("teams", team_name="55555")),
+            1
+        )
+
+    def test_numeric_duplicate_rename_is_rejected(self):
+        self._create_team("55555")
+        team_id = self._create_team("other")
+        with self.assertRaises(Exception):
+            self.teams_manager.update_team(codec_utils.dumps({
+                "id": team_id,
+                "team": {
+                    "name": 55555, "description": "team",
+                    "admin": self.admin_id
+                }
+            }))
+        self.assertEqual(
+            self.teams_manager.storage.get("teams", team_id)["team_name"],
+            "other"
+        )
+
+
+class ListTeamsTests(TeamsTestCase):
+    def _list_teams(self, **page):
+        return codec_utils.loads(
+            self.teams_manager.list_teams(codec_utils.dumps(page))
+        )
+
+    def test_pages_cover_every_team_once_in_id_order(self):
+        team_ids = [self._create_team(f"team {number}") for number in range(5)]
+        listed = []
+        page = self._list_teams(limit=2)
+        while True:
+            self.assertLessEqual(len(page["results"]), 2)
+            listed.extend(team["team_id"] for team in page["results"])
+            if page["next_cursor"] is None:
+                break
+            page = self._list_teams(limit=2, cursor=page["next_cursor"])
+        self.assertEqual(listed, sorted(team_ids))
+
+    def test_invalid_cursor_is_rejected(self):
+        self._create_team("team")
+        with self.assertRaisesMessage(
+            Exception, settings.RESPONSE_MSG_CONSTANTS_DICT['INVALID_CURSOR']
+        ):
+            self._list_teams(cursor="not a cursor")
+
+
+class MembershipTests(TeamsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.team_id = self._create_team("team")
+        self.first_id = self._create_user("first_user")
+        self.second_id = self._create_user("second_user")
+
+    def _add_users(self, users):
+        self.teams_manager.add_users_to_team(
+            codec_utils.dumps({"id": self.team_id, "users": users})
+        )
+
+    def _remove_users(self, users):
+        self.teams_manager.remove_users_from_team(
+            codec_utils.dumps({"id": self.team_id, "users": users})
+        )
+
+    def _list_team_users(self, acting_user_id, is_admin=False):
+        return [
+            user["user_id"] for user in codec_utils.loads(
+                self.teams_manager.list_team_users(
+                    codec_utils.dumps({"id": self.team_id}),
+                    acting_user_id, is_admin
+                )
+            )
+        ]
+
+    def _user_team_ids(self, user_id):
+        return [
+            team["id"] for team in codec_utils.loads(
+                user_service.UserManager().get_user_teams(
+                    codec_utils.dumps({"id": user_id}), user_id, False
+                )
+            )
+        ]
+
+    def test_added_members_are_appended_once_in_order(self):
+        self._add_users([self.second_id, self.admin_id, self.second_id])
+        self._add_users([self.first_id, self.second_id])
+        self.assertEqual(
+            self._list_team_users(self.first_id),
+            [self.admin_id, self.second_id, self.first_id]
+        )
+
+    def test_membership_checks_follow_additions_and_removals(self):
+        storage = self.teams_manager.storage
+        self._add_users([self.first_id])
+        self.assertTrue(storage.exists(
+            "teams", team_id=self.team_id, members=self.first_id
+        ))
+        self.assertEqual(self._user_team_ids(self.first_id), [self.team_id])
+
+        self._remove_users([self.first_id])
+        self.assertFalse(storage.exists(
+            "teams", team_id=self.team_id, members=self.first_id
+        ))
+        self.assertEqual(self._user_team_ids(self.first_id), [])
+        with self.assertRaisesMessage(
+            Exception, settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+        ):
+            self._list_team_users(self.first_id)
+
+    def test_non_members_need_admin_to_list_the_team(self):
+        with self.assertRaisesMessage(
+            Exception, settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+        ):
+            self._list_team_users(self.first_id)
+        self.assertEqual(
+            self._list_team_users(self.first_id, is_admin=True),
+            [self.admin_id]
+        )
+
+    def test_removing_a_non_member_changes_nothing(self):
+        self._add_users([self.first_id])
+        with self.assertRaisesMessage(
+            Exception, settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
+        ):
+            self._remove_users([self.first_id, self.second_id])
+        self.assertEqual(
+            self._list_team_users(self.first_id),
+            [self.admin_id, self.first_id]
+        )
+
+
+class MembershipBatchTests(TeamsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first_team_id = self._create_team("first team")
+        self.second_team_id = self._create_team("second team")
+        self.user_id = self._create_user("member_user")
+        self.teams_manager.add_users_to_team(codec_utils.dumps({
+            "id": self.first_team_id, "users": [self.user_id]
+        }))
+
+    def _update_memberships(self, *operations):
+        return codec_utils.loads(self.teams_manager.update_memberships(
+            codec_utils.dumps({"operations": [
+                {"op": op, "id": team_id, "users": users}
+                for op, team_id, users in operations
+            ]})
+        ))
+
+    def _members(self, team_id):
+        return self.teams_manager.storage.get("teams", team_id)["members"]
+
+    def test_user_moves_between_teams_in_one_batch(self):
+        result = self._update_memberships(
+            ("remove", self.first_team_id, [self.user_id]),
+            ("add", self.second_team_id, [self.user_id])
+        )
+        self.assertEqual(
+            result["updated_teams"], [self.first_team_id, self.second_team_id]
+        )
+        self.assertEqual(self._members(self.first_team_id), [self.admin_id])
+        self.assertEqual(
+            self._members(self.second_team_id), [self.admin_id, self.user_id]
+        )
+
+    def test_operations_apply_in_order_within_a_team(self):
+        result = self._update_memberships(
+            ("add", self.second_team_id, [self.user_id]),
+            ("remove", self.second_team_id, [self.user_id])
+        )
+        self.assertEqual(result["updated_teams"], [])
+        self.assertEqual(self._members(self.second_team_id), [self.admin_id])
+
+    def test_one_failing_operation_rolls_back_the_batch(self):
+        with self.assertRaises(serializers.ValidationError) as raised:
+            self._update_memberships(
+                ("add", self.second_team_id, [self.user_id]),
+                ("add", self.second_team_id, ["u_none"]),
+                ("remove", self.second_team_id, [self.admin_id, self.user_id]),
+                ("remove", "t_none", [self.user_id])
+            )
+        messages = settings.RESPONSE_MSG_CONSTANTS_DICT
+        self.assertEqual(raised.exception.detail["operations"], [
+            {},
+            {"users": [messages['USER_NOT_EXIST'].format("u_none")]},
+            {},
+            {"id": [messages['TEAM_NOT_FOUND']]}
+        ])
+        self.assertEqual(
+            self._members(self.first_team_id), [self.admin_id, self.user_id]
+        )
+        self.assertEqual(self._members(self.second_team_id), [self.admin_id])
+
+    def test_removing_a_non_member_is_reported(self):
+        with self.assertRaises(serializers.ValidationError) as raised:
+            self._update_memberships(
+                ("remove", self.second_team_id, [self.user_id])
+            )
+        self.assertEqual(raised.exception.detail["operations"], [{
+            "users": [
+                settings.RESPONSE_MSG_CONSTANTS_DICT[
+                    'NOT_TEAM_MEMBER'
+                ].format(self.user_id)
+            ]
+        }])
+
+
+class TeamStatsTests(TeamsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.boards_manager = boards_service.BoardsManager()
+        self.task_manager = boards_service.TaskManager()
+        self.team_id = self._create_team("team")
+        self.member_id = self._create_user("member_user")
+        self.outsider_id = self._create_user("outsider_user")
+        self.teams_manager.add_users_to_team(codec_utils.dumps({
+            "id": self.team_id, "users": [self.member_id]
+        }))
+        self.open_board_id = self._create_board("open board")
+        self.closed_board_id = self._create_board("closed board")
+
+        self._add_task("first", self.open_board_id, self.member_id)
+        self._add_task("second", self.open_board_id, self.admin_id)
+        self._set_status(
+            self._add_task("third", self.open_board_id, self.member_id),
+            "IN_PROGRESS"
+        )
+        self._set_status(
+            self._add_task("fourth", self.closed_board_id, self.member_id),
+            "COMPLETE"
+        )
+        self.boards_manager.close_board(
+            codec_utils.dumps({"id": self.closed_board_id}),
+            self.admin_id, True
+        )
+
+    def _create_board(self, name):
+        return codec_utils.loads(
+            self.boards_manager.create_board(codec_utils.dumps({
+                "name": name, "description": "board",
+                "team_id": self.team_id,
+                "creation_time": "2025-01-01T00:00:00"
+            }))
+        )["id"]
+
+    def _add_task(self, title, board_id, user_id):
+        return codec_utils.loads(self.task_manager.add_task(
+            codec_utils.dumps({
+                "title": title, "description": "task", "user_id": user_id,
+                "board_id": board_id, "creation_time": "2025-01-02T00:00:00"
+            }),
+            user_id, False
+        ))["id"]
+
+    def _set_status(self, task_id, task_status):
+        self.task_manager.update_task_status(
+            codec_utils.dumps({"id": task_id, "status": task_status}),
+            self.admin_id, True
+        )
+
+    def _team_stats(self, acting_user_id=None, is_admin=False):
+        return codec_utils.loads(self.teams_manager.team_stats(
+            codec_utils.dumps({"id": self.team_id}),
+            acting_user_id or self.member_id, is_admin
+        ))
+
+    def test_counters_follow_board_and_task_changes(self):
+        stats = self._team_stats()
+        self.assertEqual(stats["boards"], {"OPEN": 1, "CLOSED": 1})
+        self.assertEqual(
+            stats["tasks"], {"OPEN": 2, "IN_PROGRESS": 1, "COMPLETE": 1}
+        )
+        self.assertEqual(stats["assignees"], {
+            self.member_id: {"OPEN": 1, "IN_PROGRESS": 1, "COMPLETE": 1},
+            self.admin_id: {"OPEN": 1}
+        })
+        board_stats = {
+            board["board_id"]: board for board in stats["board_stats"]
+        }
+        self.assertEqual(
+            board_stats[self.closed_board_id]["status"], "CLOSED"
+        )
+        self.assertEqual(
+            board_stats[self.closed_board_id]["tasks"],
+            {"OPEN": 0, "IN_PROGRESS": 0, "COMPLETE": 1}
+        )
+
+    def test_counters_missing_for_older_records_are_computed(self):
+        expected = self._team_stats()
+        storage = self.teams_manager.storage
+        with storage.transaction("stats") as txn:
+            for stats in txn.all("stats"):
+                txn.delete("stats", stats["stat_id"])
+        self.assertEqual(self._team_stats(), expected)
+
+        # and are stored, from the records, on the next change
+        self._set_status(
+            self.task_manager.storage.find(
+                "tasks", board_id=self.open_board_id, user_id=self.admin_id
+            )[0]["task_id"],
+            "COMPLETE"
+        )
+        self.assertEqual(
+            self._team_stats()["assignees"][self.admin_id], {"COMPLETE": 1}
+        )
+
+    def test_only_members_and_admins_see_the_counters(self):
+        with self.assertRaisesMessage(
+            Exception, settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+        ):
+            self._team_stats(self.outsider_id)
+        self.assertEqual(
+            self._team_stats(self.outsider_id, is_admin=True)["team_id"],
+            self.team_id
+        )
@@ -28,6 +28,11 @@ urlpatterns = [
         app_teams_view.DescribeTeamAPIView.as_view(),
         name='describe-team'
     ),
+    path(
+        "stats/",
+        app_teams_view.TeamStatsAPIView.as_view(),
+        name='team-stats'
+    ),
     path(
         "update/",
         app_teams_view.UpdateTeamAPIView.as_view(),
@@ -37,5 +42,10 @@ urlpatterns = [
         "remove-users/",
         app_teams_view.RemoveUsersFromTeamAPIView.as_view(),
         name='remove-user-from-team'
+    ),
+    path(
+        "membership/batch/",
+        app_teams_view.TeamMembershipBatchAPIView.as_view(),
+        name='team-membership-batch'
     )
 ]
\ No newline at end of file
@@ -1,40 +1,34 @@
-import json
-
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework import serializers
 from rest_framework import status
 
 from django.conf import settings
 
 from app_teams import service as teams_service
 
-from common_utils import auth_utils as common_auth_utils
+from common_utils import api_auth_utils
 from common_utils import base_utils as generic_utils
+from common_utils import codec_utils
+from common_utils import response_utils
 
 
 class CreateTeamAPIView(APIView):
+    permission_classes = [api_auth_utils.IsPlannerAdmin]
+    admin_denied_msg_key = 'ONLY_ADMIN_RESTRICT_TEAM'
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.teams_manager = teams_service.TeamsManager()
 
     def post(self, request):
-        auth_header = request.headers.get("Authorization", "")
-        token = auth_header.replace("Token ", "").strip()
-        user = common_auth_utils.get_user_from_token(token)
-
-        if not user or not user.get("is_admin"):
-            return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT[
-                        'ONLY_ADMIN_RESTRICT_TEAM'
-                    ]
-                },
-                status=status.HTTP_403_FORBIDDEN
-            )
-
         try:
-            result = self.teams_manager.create_team(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_201_CREATED)
+            result = self.teams_manager.create_team(
+                codec_utils.dumps(request.data)
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_201_CREATED
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -42,68 +36,41 @@ class CreateTeamAPIView(APIView):
 
 
 class ListTeamsAPIView(APIView):
+    permission_classes = [api_auth_utils.IsPlannerAdmin]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.teams_manager = teams_service.TeamsManager()
 
     def get(self, request):
-        token = request.headers.get(
-            "Authorization", ""
-        ).replace("Token ", "").strip()
-        user = common_auth_utils.get_user_from_token(token)
-
-        if not user:
-            return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                },
-                status=status.HTTP_403_FORBIDDEN
+        try:
+            result = self.teams_manager.list_teams(
+                codec_utils.dumps(request.query_params.dict())
             )
-
-        if not user["is_admin"]:
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
+        except Exception as e:
             return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
-                },
-                status=status.HTTP_403_FORBIDDEN
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        result = self.teams_manager.list_teams()
-        return Response(json.loads(result), status=status.HTTP_200_OK)
-
 
 class AddUsersToTeamAPIView(APIView):
+    permission_classes = [api_auth_utils.IsPlannerAdmin]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.teams_manager = teams_service.TeamsManager()
 
     def put(self, request):
-        token = request.headers.get(
-            "Authorization", ""
-        ).replace("Token ", "").strip()
-        user = common_auth_utils.get_user_from_token(token)
-
-        if not user:
-            return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                },
-                status=status.HTTP_403_FORBIDDEN
-            )
-
-        if not user["is_admin"]:
-            return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
-                },
-                status=status.HTTP_403_FORBIDDEN
-            )
-
         try:
             result = self.teams_manager.add_users_to_team(
-                json.dumps(request.data)
+                codec_utils.dumps(request.data)
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -111,25 +78,14 @@ class AddUsersToTeamAPIView(APIView):
 
 
 class ListTeamUsersAPIView(APIView):
+    permission_classes = [api_auth_utils.IsTeamMember]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.teams_manager = teams_service.TeamsManager()
 
     def get(self, request):
         try:
-            token = request.headers.get(
-                "Authorization", ""
-            ).replace("Token ", "").strip()
-            user = common_auth_utils.get_user_from_token(token)
-
-            if not user:
-                return Response(
-                    {
-                        "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                    },
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
             team_id = request.query_params.get("id")
 
             if not team_id:
@@ -143,11 +99,13 @@ class ListTeamUsersAPIView(APIView):
                 )
 
             result = self.teams_manager.list_team_users(
-                json.dumps({"id": team_id}),
-                acting_user_id=user['user_id'],
-                is_admin=user.get('is_admin', False)
+                codec_utils.dumps({"id": team_id}),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -155,25 +113,49 @@ class ListTeamUsersAPIView(APIView):
 
 
 class DescribeTeamAPIView(APIView):
+    permission_classes = [api_auth_utils.IsTeamMember]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.teams_manager = teams_service.TeamsManager()
 
     def get(self, request):
         try:
-            token = request.headers.get(
-                "Authorization", ""
-            ).replace("Token ", "").strip()
-            user = common_auth_utils.get_user_from_token(token)
+            team_id = request.query_params.get("id")
 
-            if not user:
+            if not team_id:
                 return Response(
                     {
-                        "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
+                        "error": settings.RESPONSE_MSG_CONSTANTS_DICT[
+                            'ID_PARAM_MISSING'
+                        ]
                     },
-                    status=status.HTTP_403_FORBIDDEN
+                    status=status.HTTP_400_BAD_REQUEST
                 )
 
+            result = self.teams_manager.describe_team(
+                codec_utils.dumps({"id": team_id}),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class TeamStatsAPIView(APIView):
+    permission_classes = [api_auth_utils.IsTeamMember]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.teams_manager = teams_service.TeamsManager()
+
+    def get(self, request):
+        try:
             team_id = request.query_params.get("id")
 
             if not team_id:
@@ -186,12 +168,14 @@ class DescribeTeamAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            result = self.teams_manager.describe_team(
-                json.dumps({"id": team_id}),
-                acting_user_id=user['user_id'],
-                is_admin=user.get('is_admin', False)
+            result = self.teams_manager.team_stats(
+                codec_utils.dumps({"id": team_id}),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -199,34 +183,20 @@ class DescribeTeamAPIView(APIView):
 
 
 class UpdateTeamAPIView(APIView):
+    permission_classes = [api_auth_utils.IsPlannerAdmin]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.teams_manager = teams_service.TeamsManager()
 
     def put(self, request):
-        token = request.headers.get(
-            "Authorization", ""
-        ).replace("Token ", "").strip()
-        user = common_auth_utils.get_user_from_token(token)
-
-        if not user:
-            return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                },
-                status=status.HTTP_403_FORBIDDEN
+        try:
+            result = self.teams_manager.update_team(
+                codec_utils.dumps(request.data)
             )
-        if not user['is_admin']:
-            return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
-                },
-                status=status.HTTP_403_FORBIDDEN
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-
-        try:
-            result = self.teams_manager.update_team(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -234,6 +204,8 @@ class UpdateTeamAPIView(APIView):
 
 
 class RemoveUsersFromTeamAPIView(APIView):
+    permission_classes = [api_auth_utils.IsPlannerAdmin]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.teams_manager = teams_service.TeamsManager()
@@ -266,32 +238,39 @@ class RemoveUsersFromTeamAPIView(APIView):
             user_to_remove_ids.split(",") if user_to_remove_ids else []
         )
 
-        token = request.headers.get(
-            "Authorization", ""
-        ).replace("Token ", "").strip()
-
-        user = common_auth_utils.get_user_from_token(token)
-
-        if not user:
-            return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                },
-                status=status.HTTP_403_FORBIDDEN
+        try:
+            result = self.teams_manager.remove_users_from_team(
+                codec_utils.dumps({'id': team_id, 'users': user_to_remove_ids})
             )
-        if not user['is_admin']:
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
+        except Exception as e:
             return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
-                },
-                status=status.HTTP_403_FORBIDDEN
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
             )
 
+
+class TeamMembershipBatchAPIView(APIView):
+    permission_classes = [api_auth_utils.IsPlannerAdmin]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.teams_manager = teams_service.TeamsManager()
+
+    def post(self, request):
         try:
-            result = self.teams_manager.remove_users_from_team(
-                json.dumps({'id': team_id, 'users': user_to_remove_ids})
+            result = self.teams_manager.update_memberships(
+                codec_utils.dumps(request.data)
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
+        except serializers.ValidationError as e:
+            # Keeps the errors of every operation structured
+            return Response(
+                {"error": e.detail}, status=status.HTTP_400_BAD_REQUEST
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -3,9 +3,12 @@ from rest_framework import serializers
 from django.conf import settings
 
 from common_utils import auth_utils as common_auth_utils
+from common_utils import serializer_utils
 
 
-class UserCreateSerializer(serializers.Serializer):
+class UserCreateSerializer(
+    serializer_utils.CleanNameMixin, serializers.Serializer
+):
     name = serializers.CharField(min_length=4, max_length=64)
     display_name = serializers.CharField(min_length=4, max_length=64)
     password = serializers.CharField(min_length=4, write_only=True)
@@ -37,6 +40,15 @@ class UserCreateSerializer(serializers.Serializer):
         return validated_data
 
 
+class BulkUserCreateSerializer(serializers.Serializer):
+    # Each item is validated by UserCreateSerializer in the service
+    users = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.USER_BULK_CREATE_MAX_USERS
+    )
+
+
 class UserIdSerializer(serializers.Serializer):
     id = serializers.CharField(max_length=8)
 
@@ -45,3 +57,20 @@ class UpdateUserSerializer(serializers.Serializer):
     id = serializers.CharField()
     name = serializers.CharField(min_length=4, max_length=64)
     display_name = serializers.CharField(min_length=4, max_length=128)
+
+
+class SearchUsersSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=64)
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=settings.USER_SEARCH_MAX_RESULTS,
+        default=settings.USER_SEARCH_DEFAULT_RESULTS
+    )
+
+
+class UserTasksSerializer(serializers.Serializer):
+    id = serializers.CharField(max_length=8)
+    status = serializers.ChoiceField(
+        choices=settings.TASK_STATUS_CHOICES, required=False
+    )
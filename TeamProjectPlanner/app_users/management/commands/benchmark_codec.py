@@ -0,0 +1,96 @@
+import gc
+import json
+import time
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+
+from common_utils import codec_utils
+
+
+def _sample_tasks(count):
+    return [
+        {
+            "task_id": "task_" + uuid4().hex[:6],
+            "board_id": f"b_{index % 200:06d}",
+            "title": f"Task number {index}",
+            "description": "Write the quarterly report for the team " * 2,
+            "user_id": f"u_{index % 1000:06d}",
+            "creation_time": "2024-01-01T10:00:00",
+            "status": "IN_PROGRESS"
+        }
+        for index in range(count)
+    ]
+
+
+def _sample_users(count):
+    return [
+        {
+            "user_id": f"u_{index:06d}",
+            "name": f"user_{index}",
+            "display_name": f"User {index}",
+            "description": "",
+            "creation_time": "2024-01-01T10:00:00",
+            "is_admin": False,
+            "password": uuid4().hex * 2
+        }
+        for index in range(count)
+    ]
+
+
+def _best_of(repeat, work):
+    # Like timeit: no garbage collection pauses inside the timed runs
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            work()
+            timings.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the old indented stdlib encoding of the collection files "
+        "with the compact codec (codec_utils)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=50000)
+        parser.add_argument("--users", type=int, default=20000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        self.stdout.write(f"codec: {codec_utils.CODEC_NAME}")
+        for name, records in (
+            ("tasks.json", _sample_tasks(options["tasks"])),
+            ("users.json", _sample_users(options["users"])),
+        ):
+            indented = json.dumps(records, indent=2)
+            compact = codec_utils.dumps_bytes(records)
+            results = {
+                "indented (before)": (
+                    len(indented.encode()),
+                    _best_of(repeat, lambda: json.dumps(records, indent=2)),
+                    _best_of(repeat, lambda: json.loads(indented)),
+                ),
+                "compact codec": (
+                    len(compact),
+                    _best_of(
+                        repeat, lambda: codec_utils.dumps_bytes(records)
+                    ),
+                    _best_of(repeat, lambda: codec_utils.loads(compact)),
+                ),
+            }
+            self.stdout.write(f"\n{name} ({len(records)} records)")
+            for label, (size, encode, decode) in results.items():
+                self.stdout.write(
+                    f"  {label:<18} {size / 1024:>9.0f} KiB  "
+                    f"encode {encode * 1000:>7.1f} ms  "
+                    f"parse {decode * 1000:>7.1f} ms"
+                )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from common_utils import storage_utils
+
+
+class Command(BaseCommand):
+    help = "Copy every collection from one storage backend to another"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default="json")
+        parser.add_argument("--target", default="sqlite")
+
+    def handle(self, *args, **options):
+        copied = storage_utils.copy_storage(
+            storage_utils.build_storage(options["source"]),
+            storage_utils.build_storage(options["target"])
+        )
+        for collection, count in copied.items():
+            self.stdout.write(f"{collection}: {count} records copied")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from common_utils import base_utils as generic_utils
+from common_utils import codec_utils
+
+
+class Command(BaseCommand):
+    help = (
+        "Pretty-print the current records of a JSON collection file, "
+        "including writes still in its log"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="e.g. db/users.json")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            codec_utils.pretty(generic_utils.load_json(options["path"]))
+        )
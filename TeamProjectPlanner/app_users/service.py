@@ -1,7 +1,8 @@
-import json
 from datetime import datetime
 from uuid import uuid4
 
+from rest_framework import serializers
+
 from django.conf import settings
 
 from app_users.custom_serializers import user_serializers as \
@@ -10,36 +11,112 @@ from app_users.custom_serializers import user_serializers as \
 from project_planner_tool.base_interface import \
     user_base as user_base_interface
 
-from common_utils import base_utils as generic_utils
+from common_utils import auth_utils as common_auth_utils
+from common_utils import codec_utils
+from common_utils import pagination_utils
+from common_utils import storage_utils
+from common_utils import user_search_utils
 
 
 class UserManager(user_base_interface.UserBase):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.storage = storage_utils.get_storage()
 
     def create_user(self, request):
-        data = json.loads(request)
-        users_info = generic_utils.load_json(settings.USER_FILE)
-        existing_names = {
-            user["name"] for user in users_info
-        }
-        existing_admins = [
-            user for user in users_info if user.get("is_admin")
-        ]
+        data = codec_utils.loads(request)
+        with self.storage.transaction("users") as txn:
+            name = app_user_serializers.UserCreateSerializer.clean_name(
+                data.get("name")
+            )
+            existing_names = {
+                user["name"] for user in txn.find("users", name=name)
+            } if name is not None else set()
+            existing_admins = txn.find("users", is_admin=True)
 
-        serializer = app_user_serializers.UserCreateSerializer(
-            data=data,
-            context={
-                "existing_names": existing_names,
-                "existing_admins": existing_admins
-            }
-        )
+            serializer = app_user_serializers.UserCreateSerializer(
+                data=data,
+                context={
+                    "existing_names": existing_names,
+                    "existing_admins": existing_admins
+                }
+            )
+            serializer.is_valid(raise_exception=True)
+            new_user = self._new_user(txn, serializer.save())
+
+            txn.put("users", new_user)
+
+        user_search_utils.index_user(new_user)
+        return codec_utils.dumps({"id": new_user["user_id"]})
+
+    def bulk_create_users(self, request):
+        data = codec_utils.loads(request)
+        serializer = app_user_serializers.BulkUserCreateSerializer(data=data)
         serializer.is_valid(raise_exception=True)
-        validated = serializer.save()
+        items = serializer.validated_data["users"]
+
+        with self.storage.transaction("users") as txn:
+            # Names are checked through the name index, once per item and
+            # as validation will store them, and the batch's own names and
+            # admin join the existing ones as the items are validated
+            names = {
+                app_user_serializers.UserCreateSerializer.clean_name(
+                    item.get("name")
+                )
+                for item in items
+            }
+            names.discard(None)
+            existing_names = {
+                user["name"]
+                for name in names
+                for user in txn.find("users", name=name)
+            }
+            existing_admins = txn.find("users", is_admin=True)
 
+            new_users = []
+            item_errors = []
+            for item in items:
+                item_serializer = app_user_serializers.UserCreateSerializer(
+                    data=item,
+                    context={
+                        "existing_names": existing_names,
+                        "existing_admins": existing_admins
+                    }
+                )
+                if not item_serializer.is_valid():
+                    item_errors.append(item_serializer.errors)
+                    continue
+                item_errors.append({})
+                new_user = self._new_user(
+                    txn, item_serializer.save(),
+                    taken_ids={user["user_id"] for user in new_users}
+                )
+                existing_names.add(new_user["name"])
+                if new_user["is_admin"]:
+                    existing_admins.append(new_user)
+                new_users.append(new_user)
+
+            # All or nothing: leaving the transaction by an exception
+            # discards it
+            if any(item_errors):
+                raise serializers.ValidationError({"users": item_errors})
+
+            for new_user in new_users:
+                txn.put("users", new_user)
+
+        for new_user in new_users:
+            user_search_utils.index_user(new_user)
+
+        return codec_utils.dumps({
+            "ids": [new_user["user_id"] for new_user in new_users]
+        })
+
+    def _new_user(self, txn, validated, taken_ids=()):
         user_id = "u_" + uuid4().hex[:6]
+        while user_id in taken_ids or txn.get("users", user_id):
+            user_id = "u_" + uuid4().hex[:6]
 
-        new_user = {
+        return {
             "user_id": user_id,
             "name": validated["name"],
             "display_name": validated["display_name"],
@@ -49,28 +126,24 @@ class UserManager(user_base_interface.UserBase):
             "password": validated["password"]
         }
 
-        users_info.append(new_user)
-        generic_utils.save_json(settings.USER_FILE, users_info)
-
-        return json.dumps({"id": user_id})
-
-    def list_users(self):
-        users_info = generic_utils.load_json(settings.USER_FILE)
-        return json.dumps(users_info)
+    def list_users(self, request):
+        users, next_cursor = pagination_utils.load_page(
+            self.storage, "users", request
+        )
+        # Password hashes never leave the service
+        for user in users:
+            user.pop("password", None)
+        return codec_utils.dumps({
+            "results": users, "next_cursor": next_cursor
+        })
 
     def describe_user(self, request, acting_user_id, is_admin):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_user_serializers.UserIdSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         user_id = serializer.validated_data["id"]
 
-        users_info = generic_utils.load_json(settings.USER_FILE)
-        user_record = next(
-            (
-                user for user in users_info if user["user_id"] == user_id
-            ),
-            None
-        )
+        user_record = self.storage.get("users", user_id)
         if not user_record:
             raise Exception(
                 settings.RESPONSE_MSG_CONSTANTS_DICT['USER_NOT_FOUND']
@@ -81,46 +154,69 @@ class UserManager(user_base_interface.UserBase):
                 settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
             )
 
-        return json.dumps(user_record)
+        return codec_utils.dumps(user_record)
 
     def update_user(self, request, acting_user_id, is_admin):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_user_serializers.UpdateUserSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         validated = serializer.validated_data
 
-        users_info = generic_utils.load_json(settings.USER_FILE)
-        user_record = next(
-            (
-                user for user in users_info
-                if user["user_id"] == validated["id"]
-            ),
-            None
-        )
-        if not user_record:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['USER_NOT_FOUND']
-            )
+        def apply_update(txn):
+            user_record = txn.get("users", validated["id"])
+            if not user_record:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['USER_NOT_FOUND']
+                )
 
-        # Only admin or the user themself can update
-        if not (is_admin or validated["id"] == acting_user_id):
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
-            )
+            # Only admin or the user themself can update
+            if not (is_admin or validated["id"] == acting_user_id):
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+                )
 
-        if user_record["name"] != validated["name"]:
-            raise Exception(
-                settings.RESPONSE_MSG_CONSTANTS_DICT['USER_NAME_RESTRICT']
-            )
+            if user_record["name"] != validated["name"]:
+                raise Exception(
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['USER_NAME_RESTRICT']
+                )
 
-        if "display_name" in validated:
-            user_record["display_name"] = validated["display_name"]
+            if "display_name" in validated:
+                user_record["display_name"] = validated["display_name"]
 
-        generic_utils.save_json(settings.USER_FILE, users_info)
-        return json.dumps({"message": "User updated"})
+            txn.put("users", user_record)
+            return user_record
+
+        # Profile edits rarely race each other, so read without holding the
+        # users lock and only retry if another write landed in between
+        user_record = self.storage.run_in_transaction(
+            apply_update, "users", optimistic=True
+        )
+        common_auth_utils.invalidate_user_tokens(validated["id"])
+        user_search_utils.index_user(user_record)
+        return codec_utils.dumps({"message": "User updated"})
+
+    def search_users(self, request):
+        data = codec_utils.loads(request)
+        serializer = app_user_serializers.SearchUsersSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        validated = serializer.validated_data
+
+        user_ids = user_search_utils.get_user_index().search(
+            validated["q"], validated["limit"]
+        )
+        results = []
+        for user_id in user_ids:
+            user = self.storage.get("users", user_id)
+            if user:
+                results.append({
+                    "user_id": user["user_id"],
+                    "name": user["name"],
+                    "display_name": user["display_name"]
+                })
+        return codec_utils.dumps({"results": results})
 
     def get_user_teams(self, request, acting_user_id, is_admin):
-        data = json.loads(request)
+        data = codec_utils.loads(request)
         serializer = app_user_serializers.UserIdSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         user_id = serializer.validated_data["id"]
@@ -129,13 +225,52 @@ class UserManager(user_base_interface.UserBase):
         if not (is_admin or acting_user_id == user_id):
             raise Exception(settings.RESPONSE_MSG_CONSTANTS_DICT['DENY'])
 
-        teams_info = generic_utils.load_json(settings.TEAM_FILE)
-
         user_teams = [
             {
                 "id": team["team_id"],
                 "name": team["team_name"]
             }
-            for team in teams_info if user_id in team["members"]
+            for team in self.storage.find("teams", members=user_id)
         ]
-        return json.dumps(user_teams)
+        return codec_utils.dumps(user_teams)
+
+    def list_user_tasks(self, request, acting_user_id, is_admin):
+        data = codec_utils.loads(request)
+        serializer = app_user_serializers.UserTasksSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        validated = serializer.validated_data
+        user_id = validated["id"]
+
+        # Only self or admin
+        if not (is_admin or acting_user_id == user_id):
+            raise Exception(settings.RESPONSE_MSG_CONSTANTS_DICT['DENY'])
+
+        filters = {"user_id": user_id}
+        if "status" in validated:
+            filters["status"] = validated["status"]
+        tasks, next_cursor = pagination_utils.load_page(
+            self.storage, "tasks", request, **filters
+        )
+
+        # board_id -> {"board_id", "board_name", "tasks": {status: [...]}}
+        boards = {}
+        for task in tasks:
+            board = boards.get(task["board_id"])
+            if board is None:
+                board_record = self.storage.get(
+                    "boards", task["board_id"]
+                ) or {}
+                board = boards[task["board_id"]] = {
+                    "board_id": task["board_id"],
+                    "board_name": board_record.get("name"),
+                    "tasks": {}
+                }
+            board["tasks"].setdefault(task["status"], []).append({
+                "id": task["task_id"],
+                "title": task["title"],
+                "description": task["description"],
+                "creation_time": task["creation_time"]
+            })
+        return codec_utils.dumps({
+            "results": list(boards.values()), "next_cursor": next_cursor
+        })
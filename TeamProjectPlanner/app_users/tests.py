@@ -0,0 +1,392 @@
+import threading
+import time
+from unittest import mock
+
+from rest_framework import serializers
+
+from django.conf import settings
+from django.test import override_settings
+
+from app_boards import service as boards_service
+from app_teams import service as teams_service
+from app_users import service as user_service
+
+from common_utils import codec_utils
+from common_utils import storage_test_utils
+from common_utils import user_search_utils
+
+
+class CreateUserTests(storage_test_utils.JsonStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_manager = user_service.UserManager()
+
+    def _create_user(self, name):
+        return self.user_manager.create_user(codec_utils.dumps({
+            "name": name, "display_name": "Display", "password": "secret"
+        }))
+
+    def test_numeric_duplicate_name_is_rejected(self):
+        self._create_user("12345")
+        with self.assertRaises(serializers.ValidationError):
+            self._create_user(12345)
+        self.assertEqual(
+            len(self.user_manager.storage.find("users", name="12345")), 1
+        )
+
+
+class BulkCreateUsersTests(storage_test_utils.JsonStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_manager = user_service.UserManager()
+
+    def _bulk_create(self, *names):
+        return self._bulk_create_users([
+            {"name": name, "display_name": "Display", "password": "pass"}
+            for name in names
+        ])
+
+    def _bulk_create_users(self, users):
+        return self.user_manager.bulk_create_users(
+            codec_utils.dumps({"users": users})
+        )
+
+    def test_ids_are_returned_in_request_order(self):
+        user_ids = codec_utils.loads(
+            self._bulk_create("first", "second", "third")
+        )["ids"]
+        storage = self.user_manager.storage
+        self.assertEqual(
+            [storage.get("users", user_id)["name"] for user_id in user_ids],
+            ["first", "second", "third"]
+        )
+        self.assertNotEqual(
+            storage.get("users", user_ids[0])["password"], "pass"
+        )
+
+    def test_invalid_item_rejects_the_whole_batch(self):
+        with self.assertRaises(serializers.ValidationError) as raised:
+            self._bulk_create_users([
+                {"name": "first", "display_name": "Display",
+                 "password": "pass"},
+                {"name": "second", "display_name": "Display",
+                 "password": "abc"},
+                {"name": "third", "display_name": "Display",
+                 "password": "pass"}
+            ])
+        errors = raised.exception.detail["users"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("password", errors[1])
+        self.assertEqual(errors[2], {})
+        self.assertEqual(self.user_manager.storage.all("users"), [])
+
+    def test_batch_holds_at_most_one_admin(self):
+        with self.assertRaises(serializers.ValidationError) as raised:
+            self._bulk_create_users([
+                {"name": name, "display_name": "Display", "password": "pass",
+                 "is_admin": True}
+                for name in ("first", "second")
+            ])
+        errors = raised.exception.detail["users"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("is_admin", errors[1])
+
+    def test_empty_batch_is_rejected(self):
+        with self.assertRaises(serializers.ValidationError):
+            self._bulk_create_users([])
+
+    def test_numeric_duplicate_of_existing_name_is_rejected(self):
+        self._bulk_create("12345")
+        with self.assertRaises(serializers.ValidationError) as raised:
+            self._bulk_create("67890", 12345)
+        self.assertEqual(raised.exception.detail["users"][0], {})
+        self.assertIn("name", raised.exception.detail["users"][1])
+        self.assertEqual(len(self.user_manager.storage.all("users")), 1)
+
+    def test_numeric_duplicate_within_batch_is_rejected(self):
+        with self.assertRaises(serializers.ValidationError):
+            self._bulk_create("12345", 12345)
+        self.assertEqual(self.user_manager.storage.all("users"), [])
+
+
+class ListUsersTests(storage_test_utils.JsonStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_manager = user_service.UserManager()
+        self.user_ids = [
+            codec_utils.loads(self.user_manager.create_user(codec_utils.dumps({
+                "name": f"user_{number}", "display_name": "Display",
+                "password": "secret"
+            })))["id"]
+            for number in range(5)
+        ]
+
+    def _list_users(self, **page):
+        return codec_utils.loads(
+            self.user_manager.list_users(codec_utils.dumps(page))
+        )
+
+    def test_pages_cover_every_user_once_in_id_order(self):
+        listed = []
+        page = self._list_users(limit=2)
+        while True:
+            self.assertLessEqual(len(page["results"]), 2)
+            listed.extend(user["user_id"] for user in page["results"])
+            if page["next_cursor"] is None:
+                break
+            page = self._list_users(limit=2, cursor=page["next_cursor"])
+        self.assertEqual(listed, sorted(self.user_ids))
+
+    def test_cursor_stays_valid_after_a_new_user(self):
+        page = self._list_users(limit=2)
+        self.user_manager.create_user(codec_utils.dumps({
+            "name": "late_user", "display_name": "Display",
+            "password": "secret"
+        }))
+        rest = self._list_users(cursor=page["next_cursor"])
+        self.assertGreater(
+            rest["results"][0]["user_id"], page["results"][-1]["user_id"]
+        )
+        self.assertIsNone(rest["next_cursor"])
+
+    def test_passwords_are_not_listed(self):
+        for user in self._list_users()["results"]:
+            self.assertNotIn("password", user)
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ("not a cursor", "bm90IGpzb24", "eyJhIjogMX0"):
+            with self.assertRaisesMessage(
+                Exception,
+                settings.RESPONSE_MSG_CONSTANTS_DICT['INVALID_CURSOR']
+            ):
+                self._list_users(cursor=cursor)
+
+    def test_limit_above_the_maximum_is_rejected(self):
+        with self.assertRaises(serializers.ValidationError):
+            self._list_users(limit=settings.LIST_PAGE_MAX_SIZE + 1)
+
+
+class SearchUsersTests(storage_test_utils.JsonStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_manager = user_service.UserManager()
+        # A fresh, not yet built index for this process
+        self.patches = [
+            mock.patch.object(user_search_utils, "_index", None),
+            mock.patch.object(
+                user_search_utils, "_index_synced", threading.Event()
+            ),
+            mock.patch.object(
+                user_search_utils, "_index_ready", threading.Event()
+            ),
+        ]
+        for patch in self.patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.alice_id = self._create_user("alice")
+
+    def _create_user(self, name, display_name="Display"):
+        response = self.user_manager.create_user(codec_utils.dumps({
+            "name": name, "display_name": display_name, "password": "secret"
+        }))
+        return codec_utils.loads(response)["id"]
+
+    def _search(self, query, **params):
+        response = codec_utils.loads(self.user_manager.search_users(
+            codec_utils.dumps({"q": query, **params})
+        ))
+        return [user["user_id"] for user in response["results"]]
+
+    def test_exact_then_prefix_then_substring_matches(self):
+        malice_id = self._create_user("malice")
+        smith_id = self._create_user("alice_smith")
+        brown_id = self._create_user("alice_b")
+        self._create_user("alicia")
+        self.assertEqual(
+            self._search("Alice"),
+            [self.alice_id, brown_id, smith_id, malice_id]
+        )
+
+    def test_display_name_words_are_matched(self):
+        bob_id = self._create_user("bob_jones", display_name="Robert Cooper")
+        self.assertEqual(self._search("coop"), [bob_id])
+        self.assertEqual(self._search("bert"), [bob_id])
+
+    def test_results_stop_at_the_limit(self):
+        for name in ("alice_a", "alice_b", "alice_c"):
+            self._create_user(name)
+        self.assertEqual(len(self._search("ali", limit=2)), 2)
+        with self.assertRaises(serializers.ValidationError):
+            self._search("ali", limit=settings.USER_SEARCH_MAX_RESULTS + 1)
+
+    def test_index_is_built_in_the_background(self):
+        user_search_utils.start_indexer()
+        self.assertTrue(user_search_utils._index_ready.wait(5))
+        self.assertEqual(self._search("ali"), [self.alice_id])
+
+    def test_search_waits_for_the_first_build(self):
+        self.assertEqual(self._search("alice"), [self.alice_id])
+
+    def test_users_created_during_the_build_are_kept(self):
+        user_search_utils.start_indexer()
+        albert_id = self._create_user("albert")
+        self.assertEqual(
+            sorted(self._search("al")), sorted([self.alice_id, albert_id])
+        )
+
+    def test_search_fails_when_the_first_build_fails(self):
+        storage = mock.Mock()
+        storage.all.side_effect = OSError("storage unavailable")
+        with mock.patch.object(
+            user_search_utils.storage_utils, "get_storage",
+            return_value=storage
+        ):
+            with self.assertLogs(user_search_utils.logger, "ERROR"):
+                with self.assertRaisesMessage(
+                    Exception,
+                    settings.RESPONSE_MSG_CONSTANTS_DICT['SEARCH_UNAVAILABLE']
+                ):
+                    self._search("alice")
+
+    @override_settings(USER_SEARCH_BUILD_WAIT_SECONDS=0)
+    def test_search_does_not_wait_for_a_slow_build(self):
+        with mock.patch.object(
+            user_search_utils.UserSearchIndex, "sync",
+            side_effect=lambda users: time.sleep(1)
+        ):
+            with self.assertRaises(Exception):
+                self._search("alice")
+
+
+class UserTasksTests(storage_test_utils.JsonStoreTestCase):
+    """
+    Two members of one team with two boards.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user_manager = user_service.UserManager()
+        self.task_manager = boards_service.TaskManager()
+        self.admin_id = self._create_user("admin_user", is_admin=True)
+        self.member_id = self._create_user("member_user")
+        self.other_id = self._create_user("other_user")
+        teams_manager = teams_service.TeamsManager()
+        team_id = codec_utils.loads(teams_manager.create_team(
+            codec_utils.dumps({
+                "name": "team", "description": "team", "admin": self.admin_id
+            })
+        ))["id"]
+        teams_manager.add_users_to_team(codec_utils.dumps({
+            "id": team_id, "users": [self.member_id, self.other_id]
+        }))
+        self.board_ids = [
+            codec_utils.loads(
+                boards_service.BoardsManager().create_board(
+                    codec_utils.dumps({
+                        "name": name, "description": "board",
+                        "team_id": team_id,
+                        "creation_time": "2025-01-01T00:00:00"
+                    })
+                )
+            )["id"]
+            for name in ("board one", "board two")
+        ]
+
+    def _create_user(self, name, is_admin=False):
+        return codec_utils.loads(
+            self.user_manager.create_user(codec_utils.dumps({
+                "name": name, "display_name": name, "password": "secret",
+                "is_admin": is_admin
+            }))
+        )["id"]
+
+    def _add_task(self, title, board_id, user_id):
+        return codec_utils.loads(self.task_manager.add_task(
+            codec_utils.dumps({
+                "title": title, "description": "task", "user_id": user_id,
+                "board_id": board_id, "creation_time": "2025-01-02T00:00:00"
+            }),
+            user_id, False
+        ))["id"]
+
+    def _list_user_tasks(self, acting_user_id=None, is_admin=False, **data):
+        acting_user_id = acting_user_id or self.member_id
+        return codec_utils.loads(self.user_manager.list_user_tasks(
+            codec_utils.dumps({"id": self.member_id, **data}),
+            acting_user_id, is_admin
+        ))
+
+    def _grouped_ids(self, result):
+        return {
+            board["board_id"]: {
+                task_status: sorted(task["id"] for task in tasks)
+                for task_status, tasks in board["tasks"].items()
+            }
+            for board in result["results"]
+        }
+
+    def test_tasks_are_grouped_by_board_and_status(self):
+        first_id = self._add_task("first", self.board_ids[0], self.member_id)
+        second_id = self._add_task("second", self.board_ids[0], self.member_id)
+        third_id = self._add_task("third", self.board_ids[1], self.member_id)
+        self._add_task("other", self.board_ids[0], self.other_id)
+        self.task_manager.update_task_status(
+            codec_utils.dumps({"id": second_id, "status": "IN_PROGRESS"}),
+            self.member_id, False
+        )
+
+        result = self._list_user_tasks()
+        self.assertEqual(self._grouped_ids(result), {
+            self.board_ids[0]: {
+                "OPEN": [first_id], "IN_PROGRESS": [second_id]
+            },
+            self.board_ids[1]: {"OPEN": [third_id]}
+        })
+        self.assertEqual(
+            {board["board_name"] for board in result["results"]},
+            {"board one", "board two"}
+        )
+        self.assertIsNone(result["next_cursor"])
+
+    def test_status_filter(self):
+        self._add_task("first", self.board_ids[0], self.member_id)
+        second_id = self._add_task("second", self.board_ids[1], self.member_id)
+        self.task_manager.update_task_status(
+            codec_utils.dumps({"id": second_id, "status": "COMPLETE"}),
+            self.member_id, False
+        )
+        self.assertEqual(
+            self._grouped_ids(self._list_user_tasks(status="COMPLETE")),
+            {self.board_ids[1]: {"COMPLETE": [second_id]}}
+        )
+
+    def test_pages_cover_every_task_once(self):
+        task_ids = [
+            self._add_task(f"task {number}", self.board_ids[0], self.member_id)
+            for number in range(5)
+        ]
+        listed = []
+        result = self._list_user_tasks(limit=2)
+        while True:
+            for board in result["results"]:
+                for tasks in board["tasks"].values():
+                    listed.extend(task["id"] for task in tasks)
+            if result["next_cursor"] is None:
+                break
+            result = self._list_user_tasks(
+                limit=2, cursor=result["next_cursor"]
+            )
+        self.assertEqual(sorted(listed), sorted(task_ids))
+
+    def test_only_the_user_and_admins_see_the_tasks(self):
+        self._add_task("first", self.board_ids[0], self.member_id)
+        with self.assertRaisesMessage(
+            Exception, settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+        ):
+            self._list_user_tasks(acting_user_id=self.other_id)
+        self.assertEqual(
+            len(self._list_user_tasks(
+                acting_user_id=self.admin_id, is_admin=True
+            )["results"]),
+            1
+        )
@@ -8,11 +8,21 @@ urlpatterns = [
         app_users_view.CreateUserAPIView.as_view(),
         name="create-user"
     ),
+    path(
+        "bulk-create/",
+        app_users_view.BulkCreateUsersAPIView.as_view(),
+        name="bulk-create-users"
+    ),
     path(
         "list/",
         app_users_view.ListUsersAPIView.as_view(),
         name='list-user'
     ),
+    path(
+        "search/",
+        app_users_view.SearchUsersAPIView.as_view(),
+        name='search-users'
+    ),
     path(
         "describe/",
         app_users_view.DescribeUserAPIView.as_view(),
@@ -28,4 +38,9 @@ urlpatterns = [
         app_users_view.GetUserTeamsAPIView.as_view(),
         name='list-user-teams'
     ),
+    path(
+        "tasks/",
+        app_users_view.UserTasksAPIView.as_view(),
+        name='list-user-tasks'
+    ),
 ]
@@ -1,26 +1,61 @@
-import json
-
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework import permissions
+from rest_framework import serializers
 from rest_framework import status
 
 from django.conf import settings
 
 from app_users import service as user_service
 
-from common_utils import auth_utils as common_auth_utils
+from common_utils import api_auth_utils
 from common_utils import base_utils as generic_utils
+from common_utils import codec_utils
+from common_utils import response_utils
 
 
 class CreateUserAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.user_manager = user_service.UserManager()
+
+    def post(self, request):
+        try:
+            result = self.user_manager.create_user(
+                codec_utils.dumps(request.data)
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_201_CREATED
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class BulkCreateUsersAPIView(APIView):
+    permission_classes = [api_auth_utils.IsPlannerAdmin]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.user_manager = user_service.UserManager()
 
     def post(self, request):
         try:
-            result = self.user_manager.create_user(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_201_CREATED)
+            result = self.user_manager.bulk_create_users(
+                codec_utils.dumps(request.data)
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_201_CREATED
+            )
+        except serializers.ValidationError as e:
+            # Keeps the errors of every item structured
+            return Response(
+                {"error": e.detail}, status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -28,27 +63,40 @@ class CreateUserAPIView(APIView):
 
 
 class ListUsersAPIView(APIView):
+    permission_classes = [api_auth_utils.IsPlannerAdmin]
+    admin_denied_msg_key = 'UNAUTH'
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.user_manager = user_service.UserManager()
 
     def get(self, request):
-        token = request.headers.get(
-            "Authorization", ""
-        ).replace("Token ", "").strip()
-        user = common_auth_utils.get_user_from_token(token)
-
-        if not user or not user.get("is_admin"):
+        try:
+            result = self.user_manager.list_users(
+                codec_utils.dumps(request.query_params.dict())
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
+        except Exception as e:
             return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                },
-                status=status.HTTP_403_FORBIDDEN
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
             )
 
+
+class SearchUsersAPIView(APIView):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.user_manager = user_service.UserManager()
+
+    def get(self, request):
         try:
-            result = self.user_manager.list_users()
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            result = self.user_manager.search_users(
+                codec_utils.dumps(request.query_params.dict())
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -74,25 +122,14 @@ class DescribeUserAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            token = request.headers.get(
-                "Authorization", ""
-            ).replace("Token ", "").strip()
-            user = common_auth_utils.get_user_from_token(token)
-
-            if not user:
-                return Response(
-                    {
-                        "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                    },
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
             result = self.user_manager.describe_user(
-                json.dumps({"id": user_id}),
-                acting_user_id=user['user_id'],
-                is_admin=user.get('is_admin', False)
+                codec_utils.dumps({"id": user_id}),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -105,24 +142,15 @@ class UpdateUserAPIView(APIView):
         self.user_manager = user_service.UserManager()
 
     def put(self, request):
-        token = request.headers.get("Authorization", "").replace("Token ", "")
-        user = common_auth_utils.get_user_from_token(token)
-
-        if not user:
-            return Response(
-                {
-                    "error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
-                },
-                status=status.HTTP_403_FORBIDDEN
-            )
-
         try:
             result = self.user_manager.update_user(
-                json.dumps(request.data),
-                acting_user_id=user["user_id"],
-                is_admin=user.get("is_admin", False)
+                codec_utils.dumps(request.data),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -135,14 +163,6 @@ class GetUserTeamsAPIView(APIView):
         self.user_manager = user_service.UserManager()
 
     def get(self, request):
-        token = request.headers.get("Authorization", "").replace("Token ", "")
-        user = common_auth_utils.get_user_from_token(token)
-
-        if not user:
-            return Response(
-                {"error": "Unauthorized"}, status=status.HTTP_403_FORBIDDEN
-            )
-
         user_id = request.query_params.get("id")
 
         if not user_id:
@@ -157,11 +177,37 @@ class GetUserTeamsAPIView(APIView):
 
         try:
             result = self.user_manager.get_user_teams(
-                json.dumps({"id": user_id}),
-                acting_user_id=user["user_id"],
-                is_admin=user.get("is_admin", False)
+                codec_utils.dumps({"id": user_id}),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class UserTasksAPIView(APIView):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.user_manager = user_service.UserManager()
+
+    def get(self, request):
+        try:
+            params = request.query_params.dict()
+            # Without an id the caller gets their own tasks
+            params.setdefault("id", request.user.user_id)
+            result = self.user_manager.list_user_tasks(
+                codec_utils.dumps(params),
+                acting_user_id=request.user.user_id,
+                is_admin=request.user.is_admin
+            )
+            return response_utils.json_response(
+                result, status=status.HTTP_200_OK
             )
-            return Response(json.loads(result), status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,101 @@
+from rest_framework import authentication
+from rest_framework import permissions
+
+from django.conf import settings
+
+from common_utils import auth_utils as common_auth_utils
+from common_utils import storage_utils
+
+
+# NOTE: wired in through REST_FRAMEWORK in settings. DRF authenticates once
+# per request and caches the result on request.user, so views read the
+# caller from there instead of parsing the Authorization header themselves
+
+
+class PlannerUser(dict):
+    """
+    The authenticated caller: the {"user_id", "is_admin", ...} dict resolved
+    from the token, with the attributes DRF expects of request.user.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    @property
+    def user_id(self):
+        return self["user_id"]
+
+    @property
+    def is_admin(self):
+        return self.get("is_admin", False)
+
+
+def get_request_token(request):
+    return request.headers.get(
+        "Authorization", ""
+    ).replace("Token ", "").strip()
+
+
+class PlannerTokenAuthentication(authentication.BaseAuthentication):
+    """
+    "Authorization: Token <token>" with an opaque or signed planner token.
+    Unknown tokens leave the request anonymous, the permission classes then
+    turn it away.
+    """
+
+    def authenticate(self, request):
+        token = get_request_token(request)
+        if not token:
+            return None
+        user = common_auth_utils.get_user_from_token(token)
+        if not user:
+            return None
+        return PlannerUser(user), token
+
+
+class IsPlannerUser(permissions.BasePermission):
+    message = settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']
+
+    def has_permission(self, request, view):
+        return isinstance(request.user, PlannerUser)
+
+
+class IsPlannerAdmin(IsPlannerUser):
+    """
+    Admins only. A view can name the RESPONSE_MSG_CONSTANTS_DICT entry
+    returned to other users in `admin_denied_msg_key`.
+    """
+
+    def has_permission(self, request, view):
+        if not super().has_permission(request, view):
+            return False
+        if request.user.is_admin:
+            return True
+        self.message = settings.RESPONSE_MSG_CONSTANTS_DICT[
+            getattr(view, "admin_denied_msg_key", 'DENY')
+        ]
+        return False
+
+
+class IsTeamMember(IsPlannerUser):
+    """
+    Admins, or members of the team whose id is in the "id" query parameter.
+    A missing id or unknown team is left to the view to report.
+    """
+
+    def has_permission(self, request, view):
+        if not super().has_permission(request, view):
+            return False
+        team_id = request.query_params.get("id")
+        if request.user.is_admin or not team_id:
+            return True
+        storage = storage_utils.get_storage()
+        if storage.exists(
+            "teams", team_id=team_id, members=request.user.user_id
+        ):
+            return True
+        if not storage.exists("teams", team_id=team_id):
+            return True
+        self.message = settings.RESPONSE_MSG_CONSTANTS_DICT['DENY']
+        return False
+
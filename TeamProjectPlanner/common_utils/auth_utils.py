@@ -1,11 +1,15 @@
-import os
-import json
+import time
 import hashlib
+import threading
 import uuid
 from datetime import datetime
 
 from django.conf import settings
 
+from common_utils import storage_utils
+from common_utils import token_store_utils
+from common_utils import token_utils
+
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -16,26 +20,130 @@ def generate_token(user_id):
     return hashlib.sha256(seed.encode()).hexdigest()
 
 
+# token -> (user record, expiry on the monotonic clock), with the tokens
+# cached per user so a login or profile change drops them in O(1). Other
+# worker processes only see such changes once their entries expire, which
+# bounds staleness to AUTH_TOKEN_CACHE_TTL_SECONDS.
+_token_cache = {}
+_user_tokens = {}
+_token_cache_lock = threading.Lock()
+# Bumped by every invalidation; a lookup that overlapped one is not cached
+# since it may have read the user or token from before the change
+_invalidations = 0
+
+
+def _token_expires_in(token_record):
+    """
+    :return: Seconds until the token expires, None if tokens never expire
+    """
+    if settings.AUTH_TOKEN_TTL_SECONDS <= 0:
+        return None
+    return (
+        token_store_utils.issued_at_ms(token_record)
+        + settings.AUTH_TOKEN_TTL_SECONDS * 1000
+        - token_store_utils.now_ms()
+    ) / 1000
+
+
+def _cached_user(current_token, now):
+    cached = _token_cache.get(current_token)
+    if cached and cached[1] > now:
+        return dict(cached[0])
+    return None
+
+
+def _cache_user(current_token, user, expires_in, invalidations, now):
+    """
+    :param invalidations: _invalidations as read before the lookup
+    :return: A copy of `user` safe to hand out
+    """
+    if settings.AUTH_TOKEN_CACHE_TTL_SECONDS <= 0:
+        return user
+    with _token_cache_lock:
+        if invalidations != _invalidations:
+            return user
+        if len(_token_cache) >= settings.AUTH_TOKEN_CACHE_MAX_ENTRIES:
+            _token_cache.clear()
+            _user_tokens.clear()
+        # Never keep a token cached past its own expiry
+        cache_ttl = settings.AUTH_TOKEN_CACHE_TTL_SECONDS
+        if expires_in is not None:
+            cache_ttl = min(cache_ttl, expires_in)
+        _token_cache[current_token] = (user, now + cache_ttl)
+        _user_tokens.setdefault(user["user_id"], set()).add(current_token)
+    return dict(user)
+
+
 def get_user_from_token(current_token):
-    if not os.path.exists(settings.TOKEN_FILE):
+    # Signed tokens carry the user and verify without any lookup
+    if token_utils.is_signed_token(current_token):
+        return token_utils.verify_signed_token(current_token)
+
+    now = time.monotonic()
+    user = _cached_user(current_token, now)
+    if user:
+        return user
+
+    invalidations = _invalidations
+    token_record = token_store_utils.get_token_store().lookup(current_token)
+    if not token_record:
         return None
-    with open(settings.TOKEN_FILE) as t_file:
-        tokens_info = json.load(t_file)
-    token_entry = next(
-        (
-            token_record for token_record in tokens_info
-            if token_record["token"] == current_token
-        ),
-        None
-    )
-    if not token_entry:
+    user = storage_utils.get_storage().get("users", token_record["user_id"])
+    # Unknown tokens are not cached, so bad tokens cannot fill the cache
+    if not user:
         return None
-    with open(settings.USER_FILE) as u_file:
-        users_info = json.load(u_file)
-    return next(
-        (
-            user_record for user_record in users_info
-            if user_record["user_id"] == token_entry["user_id"]
-        ),
-        None
+    return _cache_user(
+        current_token, user, _token_expires_in(token_record), invalidations,
+        now
     )
+
+
+def get_users_from_tokens(tokens):
+    """
+    Batch form of get_user_from_token(). Tokens missing from the cache are
+    all resolved from one snapshot of the token store and users.
+
+    :return: {token: user or None} for every distinct token
+    """
+    now = time.monotonic()
+    users = {}
+    uncached_tokens = []
+    for current_token in tokens:
+        if current_token in users:
+            continue
+        if token_utils.is_signed_token(current_token):
+            users[current_token] = token_utils.verify_signed_token(
+                current_token
+            )
+            continue
+        users[current_token] = _cached_user(current_token, now)
+        if users[current_token] is None:
+            uncached_tokens.append(current_token)
+
+    if uncached_tokens:
+        invalidations = _invalidations
+        storage = storage_utils.get_storage()
+        with storage.snapshot("tokens", "users"):
+            token_records = token_store_utils.get_token_store().lookup_many(
+                uncached_tokens
+            )
+            for current_token, token_record in token_records.items():
+                user = storage.get("users", token_record["user_id"])
+                if user:
+                    users[current_token] = _cache_user(
+                        current_token, user, _token_expires_in(token_record),
+                        invalidations, now
+                    )
+    return users
+
+
+def invalidate_user_tokens(user_id):
+    """
+    Forget the cached tokens of `user_id`; call when the user's token is
+    rotated or the user record changes.
+    """
+    global _invalidations
+    with _token_cache_lock:
+        _invalidations += 1
+        for token in _user_tokens.pop(user_id, ()):
+            _token_cache.pop(token, None)
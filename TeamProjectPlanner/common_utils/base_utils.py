@@ -1,19 +1,809 @@
 import os
-import json
-from filelock import FileLock
+import queue
+import contextvars
+import logging
+import itertools
+import threading
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+
+from common_utils import group_commit_utils
+from common_utils import index_utils
+from common_utils import lock_utils
+from common_utils import wal_utils
+
+
+logger = logging.getLogger(__name__)
+
+# records is an ordered {primary key: record} dict built from the snapshot
+# plus the replayed log, indexes its secondary indexes, key_order its
+# sorted primary keys and sort_orders its records sorted by other fields
+# (see index_utils), all kept in step with it. log_offset is the end of the
+# replayed part of the log of generation log_generation (see wal_utils). States
+# are never mutated once published; writers build a new one so lock-free
+# readers always see a complete version.
+#
+# That has a price: each write copies the records dict and the field ->
+# buckets dict of every index, plus the key order when a key comes or goes
+# and a sort order when its field changes (only the touched index buckets
+# are copied). CPU and memory per write are O(records in the collection),
+# about 2 ms per 100k records, even though only the changed records are
+# appended to the log. Sharding keeps the large collections (tasks) small.
+CollectionState = namedtuple(
+    "CollectionState",
+    [
+        "signature", "records", "indexes", "key_order", "sort_orders",
+        "log_generation", "log_offset", "log_records", "version"
+    ]
+)
+
+# Every newly published state gets the next version number; a state reused
+# from the cache keeps its version, so a changed version means the collection
+# was written since it was read
+_versions = itertools.count(1)
+
+# Collections whose lock the current thread already holds (transactions)
+_held_locks = threading.local()
+
+# path -> CollectionState pinned by the current request (see snapshot()),
+# or None outside of one
+_request_snapshot = contextvars.ContextVar(
+    "json_store_request_snapshot", default=None
+)
+
+# path -> CollectionState. Collections are parsed once per on-disk version
+# and revalidated with a stat() of the snapshot and its log on every load.
+_document_cache = {}
+
+_compaction_queue = queue.Queue()
+_compaction_pending = set()
+_compaction_worker = None
+_compaction_worker_lock = threading.Lock()
+
+
+def _stat_signature(path):
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return wal_utils.file_signature(stat_result)
+
+
+def _collection_signature(path):
+    return (
+        _stat_signature(path),
+        _stat_signature(wal_utils.log_path(path))
+    )
+
+
+def _held_paths():
+    if not hasattr(_held_locks, "paths"):
+        _held_locks.paths = set()
+    return _held_locks.paths
+
+
+@contextmanager
+def _collection_lock(path):
+    held_paths = _held_paths()
+    if path in held_paths:
+        # Already locked by an enclosing transaction on this thread
+        yield
+        return
+    with lock_utils.exclusive_lock(path + ".lock"):
+        held_paths.add(path)
+        try:
+            yield
+        finally:
+            held_paths.discard(path)
+
+
+def _key_field(path):
+    key_fields = settings.JSON_STORE_PRIMARY_KEYS
+    if path in key_fields:
+        return key_fields[path]
+    # Sharded collections are registered by their directory
+    return key_fields[os.path.dirname(path)]
+
+
+def _index_fields(path):
+    index_fields = settings.JSON_STORE_INDEXED_FIELDS
+    if path in index_fields:
+        return index_fields[path]
+    return index_fields.get(os.path.dirname(path), [])
+
+
+def _sort_fields(path):
+    sort_fields = settings.JSON_STORE_SORTED_FIELDS
+    if path in sort_fields:
+        return sort_fields[path]
+    return sort_fields.get(os.path.dirname(path), [])
+
+
+def _detach(records):
+    # Managers mutate the records they load before saving them back, so hand
+    # out copies one level deep and keep the cached state untouched.
+    # NOTE: nested lists (e.g. team members) must be replaced, not mutated
+    return [dict(record) for record in records.values()]
+
+
+@contextmanager
+def _shared_collection_lock(path):
+    if path in _held_paths():
+        yield
+        return
+    with lock_utils.shared_lock(path + ".lock"):
+        yield
+
+
+def _replay(path, signature, full=False):
+    """
+    Read the state of `path` on top of the cached one: replay only the new
+    log records when the snapshot is unchanged and the log is still the
+    generation the cached offset belongs to, otherwise (or when `full`)
+    reload the snapshot and replay the whole log.
+
+    :return: (records, indexes, key_order, sort_orders, log_records, ops,
+    log_header, paired, good_offset), where paired is False when the log
+    read does not apply to the snapshot read (a compaction got in between)
+    and good_offset may stop short of the log size on a torn tail
+    """
+    key_field = _key_field(path)
+    snapshot_signature, log_signature = signature
+    cached = _document_cache.get(path)
+    log_header = None
+    paired = True
+    if (
+        not full and cached and log_signature
+        and cached.signature[0] == snapshot_signature
+        and (
+            cached.signature[1] is None
+            or cached.signature[1][2] == log_signature[2]
+        )
+        and log_signature[1] >= cached.log_offset
+    ):
+        log_header, ops, good_offset = wal_utils.read_log(
+            path, cached.log_offset, cached.log_generation
+        )
+        if wal_utils.log_generation(log_header) != cached.log_generation:
+            # Replaced by a compaction since: the log was read from its
+            # start, so it must go on top of the snapshot instead
+            cached = None
+    else:
+        cached = None
+
+    if cached is not None:
+        records = dict(cached.records)
+        indexes = cached.indexes
+        key_order = cached.key_order
+        log_records = cached.log_records
+    else:
+        records, read_signature = wal_utils.read_snapshot(path, key_field)
+        indexes = index_utils.build_indexes(records, _index_fields(path))
+        key_order = index_utils.build_key_order(records)
+        log_records = 0
+        if log_header is None:
+            log_header, ops, good_offset = wal_utils.read_log(path)
+        paired = wal_utils.log_applies_to(log_header, read_signature)
+
+    indexes = index_utils.apply_ops(records, indexes, ops, key_field)
+    key_order = index_utils.apply_key_order(key_order, records, ops, key_field)
+    if cached is None:
+        sort_orders = index_utils.build_sort_orders(
+            records, _sort_fields(path)
+        )
+    else:
+        sort_orders = index_utils.apply_sort_orders(
+            cached.sort_orders, cached.records, records, ops, key_field
+        )
+    return (
+        records, indexes, key_order, sort_orders, log_records, ops,
+        log_header, paired, good_offset
+    )
+
+
+def _new_state(signature, replayed):
+    (
+        records, indexes, key_order, sort_orders, log_records, ops,
+        log_header, _, good_offset
+    ) = replayed
+    return CollectionState(
+        signature=signature,
+        records=records,
+        indexes=indexes,
+        key_order=key_order,
+        sort_orders=sort_orders,
+        log_generation=wal_utils.log_generation(log_header),
+        log_offset=good_offset,
+        log_records=log_records + len(ops),
+        version=next(_versions)
+    )
+
+
+def _publish_state(path, signature, replayed):
+    state = _new_state(signature, replayed)
+    _document_cache[path] = state
+    return state
+
+
+def _start_generation(path, state):
+    """
+    Write the records of `state` as the snapshot of `path` and start a new,
+    empty log generation on it. Must be called with the collection lock
+    held.
+    """
+    snapshot_signature = wal_utils.write_snapshot(
+        path, state.records.values()
+    )
+    # A crash before the new log replaces the old one leaves a log that
+    # names the previous snapshot. Its records are all in this one already,
+    # the next locked load replays them (put/del are idempotent) and starts
+    # the new log
+    log_header = wal_utils.start_log(path, snapshot_signature)
+    signature = _collection_signature(path)
+    state = state._replace(
+        signature=signature,
+        log_generation=wal_utils.log_generation(log_header),
+        log_offset=signature[1][1],
+        log_records=0
+    )
+    _document_cache[path] = state
+    return state
+
+
+def _read_state(path):
+    """
+    Build the current state of `path` without the exclusive lock, in the
+    manner of a seqlock: the read only counts if the snapshot and log
+    signatures are the same before and after it and the log was consumed
+    up to its end.
+
+    :return: The state, or None when a writer or a compaction got in the
+    way (or a torn tail needs truncating) and the read must be retried
+    """
+    signature = _collection_signature(path)
+    cached = _document_cache.get(path)
+    if cached and cached.signature == signature:
+        return cached
+
+    try:
+        replayed = _replay(path, signature)
+    except (ValueError, FileNotFoundError):
+        # Snapshot replaced or log truncated under us by a compaction
+        return None
+    log_size = signature[1][1] if signature[1] else 0
+    if (
+        not replayed[-2]
+        or replayed[-1] != log_size
+        or _collection_signature(path) != signature
+    ):
+        return None
+    return _publish_state(path, signature, replayed)
+
+
+def _refresh_state(path):
+    """
+    Bring the cached state of `path` up to date. Must be called with the
+    collection lock held, since it also truncates a torn log tail.
+    """
+    signature = _collection_signature(path)
+    cached = _document_cache.get(path)
+    if cached and cached.signature == signature:
+        return cached
+
+    replayed = _replay(path, signature)
+    log_size = signature[1][1] if signature[1] else 0
+    if replayed[-1] < log_size:
+        # Only a read of the log generation from its start tells a torn
+        # tail apart from a cached offset that is not a record boundary
+        replayed = _replay(path, signature, full=True)
+
+    if not replayed[-2]:
+        # Crash recovery: a compaction died between writing the snapshot
+        # and starting the new log, finish it
+        logger.warning("Finishing interrupted compaction of %s", path)
+        return _start_generation(path, _new_state(signature, replayed))
+
+    good_offset = replayed[-1]
+    if good_offset < log_size:
+        # Crash recovery: drop the partially written record at the tail
+        logger.warning(
+            "Truncating torn log tail of %s at offset %s", path, good_offset
+        )
+        wal_utils.truncate_log(path, good_offset)
+    return _publish_state(path, _collection_signature(path), replayed)
+
+
+def _current_state(path):
+    # Readers take no lock at all unless writers keep changing the files
+    # under them, then queue for a shared lock, which still lets any number
+    # of readers in. Only a crashed writer's torn tail needs the exclusive
+    # lock to be truncated.
+    for _ in range(settings.JSON_STORE_LOCK_FREE_READ_ATTEMPTS):
+        state = _read_state(path)
+        if state is not None:
+            return state
+    with _shared_collection_lock(path):
+        state = _read_state(path)
+    if state is not None:
+        return state
+    with _collection_lock(path):
+        return _refresh_state(path)
+
+
+def _snapshot_state(path):
+    """
+    State of `path` for reads: the version pinned by the enclosing
+    snapshot(), pinning the current one on first use, or simply the
+    current one outside of a snapshot.
+    """
+    pinned = _request_snapshot.get()
+    if pinned is None:
+        return _current_state(path)
+    if path not in pinned:
+        pinned[path] = _current_state(path)
+    return pinned[path]
+
+
+@contextmanager
+def snapshot():
+    """
+    Pin every collection read inside the block to one immutable version,
+    so repeated and related reads agree with each other even while writers
+    publish newer versions. Versions are pinned on first read, use pin() to
+    read several collections as of one consistent point instead. A pinned
+    version is freed as soon as the last snapshot holding it exits.
+
+    Transactions inside the block always read the latest versions, and
+    collections they write are re-pinned on their next read.
+    """
+    if _request_snapshot.get() is not None:
+        yield
+        return
+    token = _request_snapshot.set({})
+    try:
+        yield
+    finally:
+        _request_snapshot.reset(token)
+
+
+def pin(*paths):
+    """
+    Pin `paths` in the enclosing snapshot() at one consistent point: no
+    transaction writing any of them is half committed in the pinned set.
+    """
+    pinned = _request_snapshot.get()
+    if pinned is None:
+        raise Exception("pin() must be called inside snapshot()")
+    missing = sorted(set(paths) - set(pinned))
+    # Bring the cache up to date first, so the shared locks below are only
+    # held for a stat() per collection unless a write slipped in meanwhile
+    for path in missing:
+        _current_state(path)
+
+    # Writers keep the exclusive lock of every collection of a transaction
+    # until all of them are written, so while holding the shared locks the
+    # collections cannot be caught between two versions
+    states = {}
+    with ExitStack() as locks:
+        for path in missing:
+            locks.enter_context(_shared_collection_lock(path))
+        for path in missing:
+            states[path] = _read_state(path)
+    for path, state in states.items():
+        # None only for a torn tail or an unfinished compaction left by a
+        # crash
+        pinned[path] = state if state is not None else _current_state(path)
+
+
+@contextmanager
+def _latest_versions(paths):
+    # Writes need the latest versions, not the ones pinned by the request
+    pinned = _request_snapshot.get()
+    if pinned is None:
+        yield
+        return
+    token = _request_snapshot.set(None)
+    try:
+        yield
+    finally:
+        _request_snapshot.reset(token)
+        for path in paths:
+            pinned.pop(path, None)
+
+
+def _diff_state(path, data):
+    """
+    Return the current state of `path` and the log records that turn it into
+    `data`. Must be called with the collection lock held.
+    """
+    state = _refresh_state(path)
+    key_field = _key_field(path)
+    return state, wal_utils.diff_ops(state.records, data, key_field)
+
+
+def _group_commit_window():
+    return settings.JSON_STORE_GROUP_COMMIT_WINDOW_MS / 1000
+
+
+def _write_state(path, state, ops):
+    """
+    :return: (new state, group commit sequence of the append or None when
+    it is already durable)
+    """
+    if not ops:
+        return state, None
+
+    # Only the changed records hit the disk, so the I/O of a write no longer
+    # grows with the size of the collection. Building the new in-memory
+    # state below still does (see CollectionState)
+    key_field = _key_field(path)
+    log_generation = state.log_generation
+    if state.signature[1] is None:
+        # First write: start the log with its header
+        log_generation = wal_utils.log_generation(
+            wal_utils.start_log(path, state.signature[0])
+        )
+    group_commit = _group_commit_window() > 0
+    wal_utils.append_log(path, ops, sync=not group_commit)
+    sequence = None
+    if group_commit:
+        sequence = group_commit_utils.record_write(path)
+    # O(n) copy, published states stay untouched for their readers
+    records = dict(state.records)
+    indexes = index_utils.apply_ops(records, state.indexes, ops, key_field)
+    key_order = index_utils.apply_key_order(
+        state.key_order, records, ops, key_field
+    )
+    sort_orders = index_utils.apply_sort_orders(
+        state.sort_orders, state.records, records, ops, key_field
+    )
+    signature = _collection_signature(path)
+    state = CollectionState(
+        signature=signature,
+        records=records,
+        indexes=indexes,
+        key_order=key_order,
+        sort_orders=sort_orders,
+        log_generation=log_generation,
+        log_offset=signature[1][1],
+        log_records=state.log_records + len(ops),
+        version=next(_versions)
+    )
+    _document_cache[path] = state
+    return state, sequence
+
+
+def _after_write(path, state, sequence):
+    # Called once the collection lock is released, so the writers waiting
+    # for the same group commit fsync can keep appending meanwhile
+    if sequence is not None:
+        group_commit_utils.wait_durable(
+            path, sequence, _group_commit_window()
+        )
+    if state.log_records >= settings.JSON_STORE_COMPACTION_THRESHOLD:
+        _schedule_compaction(path)
 
 
 def load_json(path):
-    lock = FileLock(path + ".lock")
-    with lock:
-        if os.path.exists(path):
-            with open(path, "r") as json_file:
-                return json.load(json_file)
-        return []
+    return _detach(_snapshot_state(path).records)
+
+
+def load_record(path, key):
+    """
+    Fetch a single record of `path` by primary key without copying the rest
+    of the collection.
+    """
+    record = _snapshot_state(path).records.get(key)
+    return dict(record) if record is not None else None
+
+
+def scan_records(path):
+    """
+    Read-only view of the current records of `path`, without copying; copy
+    any record before modifying it.
+    """
+    return _snapshot_state(path).records.values()
+
+
+def query_records(path, **filters):
+    """
+    Read-only records of `path` matching every field == value filter, served
+    by the primary key or a secondary index (JSON_STORE_INDEXED_FIELDS)
+    instead of a scan whenever one of the fields has one.
+    """
+    state = _snapshot_state(path)
+    return index_utils.query(
+        state.records, state.indexes, _key_field(path), filters
+    )
+
+
+def page_records(path, after=None, limit=100, **filters):
+    """
+    Read-only page of the records of `path` in primary key order, in
+    O(log n + limit) through the collection's key order.
+
+    :param after: Primary key the page starts after, None for the first page
+    :param filters: Optional field == value filters; with an indexed field
+    among them only the records under its value are visited
+    :return: (records, key to pass as `after` for the next page or None)
+    """
+    state = _snapshot_state(path)
+    return index_utils.page(
+        state.records, state.key_order, after, limit, state.indexes, filters
+    )
+
+
+def sorted_page_records(path, field, after=None, limit=100, **kwargs):
+    """
+    Read-only page of the records of `path` in the order of `field`, one of
+    its JSON_STORE_SORTED_FIELDS, through the collection's sort order.
+
+    :param after: [value, key] the page starts after, None for the first
+    page
+    :param kwargs: start, end, descending and filters of
+    index_utils.sorted_page()
+    :return: (records, [value, key] to pass as `after` for the next page or
+    None)
+    """
+    state = _snapshot_state(path)
+    return index_utils.sorted_page(
+        state.records, state.sort_orders[field], after, limit, **kwargs
+    )
+
+
+def index_values(path, field):
+    """
+    Distinct values of an indexed field of `path`.
+    """
+    return list(_snapshot_state(path).indexes[field])
 
 
 def save_json(path, data):
-    lock = FileLock(path + ".lock")
-    with lock:
-        with open(path, "w") as json_file:
-            json.dump(data, json_file, indent=2)
+    with _latest_versions([path]), _collection_lock(path):
+        state, sequence = _write_state(path, *_diff_state(path, data))
+    _after_write(path, state, sequence)
+
+
+class TransactionConflict(Exception):
+    pass
+
+
+class JsonTransaction:
+    """
+    Read-modify-write over a declared set of collections.
+
+    Pessimistic transactions lock every collection up front, always in sorted
+    path order so two transactions can never deadlock, and keep the locks
+    until the staged saves are committed. Optimistic transactions read
+    without locks, remember the version of each collection they read and
+    only lock at commit time, raising TransactionConflict if any of those
+    collections changed in between.
+
+    `append_paths` may only be written with put()/delete(). They are neither
+    read nor locked until commit, where each is locked just for its append
+    after the other collections are written. Use them for collections that
+    only receive independent single-record writes (e.g. the task manifest)
+    so they do not serialize whole transactions.
+    """
+
+    def __init__(self, paths, optimistic=False, append_paths=()):
+        self.paths = sorted(set(paths))
+        self.append_paths = sorted(set(append_paths) - set(self.paths))
+        self.optimistic = optimistic
+        self._read_versions = {}
+        self._staged = {}
+        self._staged_ops = {}
+        self._locks = ExitStack()
+
+    def _check_declared(self, path, writing=False):
+        if path in self.paths or (writing and path in self.append_paths):
+            return
+        raise Exception(f"{path} is not part of this transaction")
+
+    def begin(self):
+        if not self.optimistic:
+            self._acquire_locks()
+        return self
+
+    def _acquire_locks(self):
+        for path in self.paths:
+            self._locks.enter_context(_collection_lock(path))
+
+    def _state(self, path):
+        self._check_declared(path)
+        if self.optimistic:
+            state = _current_state(path)
+        else:
+            state = _refresh_state(path)
+        self._read_versions.setdefault(path, state.version)
+        return state
+
+    def load(self, path):
+        if path in self._staged:
+            return [dict(record) for record in self._staged[path]]
+        return _detach(self._state(path).records)
+
+    def load_record(self, path, key):
+        record = self._state(path).records.get(key)
+        return dict(record) if record is not None else None
+
+    def records(self, path):
+        """
+        Read-only view of the committed records of `path`, without copying.
+        """
+        return self._state(path).records.values()
+
+    def query(self, path, **filters):
+        """
+        query_records() over the committed records of `path`.
+        """
+        state = self._state(path)
+        return index_utils.query(
+            state.records, state.indexes, _key_field(path), filters
+        )
+
+    def page(self, path, after=None, limit=100, **filters):
+        """
+        page_records() over the committed records of `path`.
+        """
+        state = self._state(path)
+        return index_utils.page(
+            state.records, state.key_order, after, limit, state.indexes,
+            filters
+        )
+
+    def sorted_page(self, path, field, after=None, limit=100, **kwargs):
+        """
+        sorted_page_records() over the committed records of `path`.
+        """
+        state = self._state(path)
+        return index_utils.sorted_page(
+            state.records, state.sort_orders[field], after, limit, **kwargs
+        )
+
+    def save(self, path, data):
+        self._check_declared(path)
+        self._staged[path] = [dict(record) for record in data]
+
+    def put(self, path, record):
+        """
+        Stage an insert-or-replace of one record without loading `path`;
+        cheaper than load() + save() for large collections.
+        """
+        self._check_declared(path, writing=True)
+        self._staged_ops.setdefault(path, []).append(
+            {"op": wal_utils.PUT_OP, "record": dict(record)}
+        )
+
+    def delete(self, path, key):
+        self._check_declared(path, writing=True)
+        self._staged_ops.setdefault(path, []).append(
+            {"op": wal_utils.DELETE_OP, "key": key}
+        )
+
+    def commit(self):
+        if self.optimistic:
+            self._acquire_locks()
+            for path, version in self._read_versions.items():
+                if _refresh_state(path).version != version:
+                    raise TransactionConflict(path)
+
+        # Diff every collection before writing anything so a bad record
+        # fails the whole transaction instead of leaving it half applied
+        pending = []
+        for path in self.paths:
+            if path in self._staged:
+                state, ops = _diff_state(path, self._staged[path])
+            elif path in self._staged_ops:
+                state, ops = _refresh_state(path), []
+            else:
+                continue
+            pending.append((path, state, ops + self._staged_ops.get(path, [])))
+        written = [
+            (path, *_write_state(path, state, ops))
+            for path, state, ops in pending
+        ]
+        for path in self.append_paths:
+            if path not in self._staged_ops:
+                continue
+            with _collection_lock(path):
+                state = _refresh_state(path)
+                written.append((
+                    path, *_write_state(path, state, self._staged_ops[path])
+                ))
+        self.release()
+        for path, state, sequence in written:
+            _after_write(path, state, sequence)
+
+    def release(self):
+        self._locks.close()
+
+
+@contextmanager
+def transaction(*paths, append_paths=()):
+    """
+    Hold the locks of `paths` across reads and writes; staged saves are
+    committed together when the block exits without an exception.
+
+        with generic_utils.transaction(settings.TASK_FILE) as txn:
+            tasks_info = txn.load(settings.TASK_FILE)
+            ...
+            txn.save(settings.TASK_FILE, tasks_info)
+    """
+    with _latest_versions(paths + tuple(append_paths)):
+        txn = JsonTransaction(paths, append_paths=append_paths).begin()
+        try:
+            yield txn
+            txn.commit()
+        finally:
+            txn.release()
+
+
+def run_in_transaction(paths, work, optimistic=False, append_paths=()):
+    """
+    Call `work(txn)` inside a transaction over `paths` and return its result.
+
+    In optimistic mode `work` is re-run on a fresh read whenever a conflict is
+    detected at commit, falling back to a locked run once
+    STORAGE_TRANSACTION_RETRIES attempts have conflicted.
+    """
+    with _latest_versions(tuple(paths) + tuple(append_paths)):
+        return _run_in_transaction(paths, work, optimistic, append_paths)
+
+
+def _run_in_transaction(paths, work, optimistic, append_paths):
+    if optimistic:
+        for _ in range(settings.STORAGE_TRANSACTION_RETRIES):
+            txn = JsonTransaction(
+                paths, optimistic=True, append_paths=append_paths
+            ).begin()
+            try:
+                result = work(txn)
+                txn.commit()
+                return result
+            except TransactionConflict:
+                continue
+            finally:
+                txn.release()
+
+    with transaction(*paths, append_paths=append_paths) as txn:
+        return work(txn)
+
+
+def compact_json(path):
+    """
+    Fold the log of `path` into a fresh snapshot and start a new log
+    generation.
+    """
+    with _collection_lock(path):
+        state = _refresh_state(path)
+        if not state.log_records:
+            return
+        _start_generation(path, state)
+
+
+def _run_compactions():
+    while True:
+        path = _compaction_queue.get()
+        try:
+            compact_json(path)
+        except Exception:
+            logger.exception("Compaction of %s failed", path)
+        finally:
+            _compaction_pending.discard(path)
+
+
+def _schedule_compaction(path):
+    global _compaction_worker
+    if path in _compaction_pending:
+        return
+    _compaction_pending.add(path)
+    with _compaction_worker_lock:
+        if _compaction_worker is None:
+            _compaction_worker = threading.Thread(
+                target=_run_compactions, name="json-compaction", daemon=True
+            )
+            _compaction_worker.start()
+    _compaction_queue.put(path)
@@ -0,0 +1,49 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is used
+    orjson = None
+
+
+# JSON encoding used for the collection files and the API payloads: compact
+# (no indentation or padding) and through orjson when it is installed,
+# which parses and encodes several times faster than the json module.
+# Both produce the same documents, so files written by either are
+# interchangeable.
+
+CODEC_NAME = "orjson" if orjson else "json"
+
+
+def dumps(obj):
+    """
+    Compact JSON text of `obj`.
+    """
+    if orjson:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def dumps_bytes(obj):
+    """
+    UTF-8 encoded compact JSON of `obj`, ready for a file or response body.
+    """
+    if orjson:
+        return orjson.dumps(obj)
+    return dumps(obj).encode()
+
+
+def loads(data):
+    """
+    :param data: JSON text as str or bytes
+    """
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def pretty(obj):
+    """
+    Indented JSON for humans; never used for the stored files.
+    """
+    return json.dumps(obj, indent=2, ensure_ascii=False)
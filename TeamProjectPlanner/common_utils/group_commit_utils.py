@@ -0,0 +1,82 @@
+import time
+import threading
+
+from common_utils import wal_utils
+
+
+# Group commit: writers append their records to a collection log without
+# syncing it, release the collection lock and then wait here until an fsync
+# issued after their append completes. The first waiter becomes the leader,
+# lingers for the commit window so concurrent writers can join, and issues
+# one fsync for all of them.
+
+
+class _LogSyncer:
+    def __init__(self, path):
+        self.path = path
+        self.condition = threading.Condition()
+        self.written = 0
+        self.synced = 0
+        self.syncing = False
+
+    def record_write(self):
+        with self.condition:
+            self.written += 1
+            return self.written
+
+    def wait_durable(self, sequence, window):
+        with self.condition:
+            while self.synced < sequence:
+                if not self.syncing:
+                    self.syncing = True
+                    break
+                self.condition.wait()
+            else:
+                return
+
+        synced_to = None
+        try:
+            time.sleep(window)
+            with self.condition:
+                target = self.written
+            wal_utils.sync_log(self.path)
+            synced_to = target
+        finally:
+            with self.condition:
+                self.syncing = False
+                # A failed fsync leaves `synced` as it was, so the next
+                # waiter takes over and retries
+                if synced_to is not None and self.synced < synced_to:
+                    self.synced = synced_to
+                self.condition.notify_all()
+
+
+_syncers = {}
+_syncers_lock = threading.Lock()
+
+
+def _syncer(path):
+    with _syncers_lock:
+        if path not in _syncers:
+            _syncers[path] = _LogSyncer(path)
+        return _syncers[path]
+
+
+def record_write(path):
+    """
+    Register an unsynced append to the log of `path`; call right after it,
+    with the collection lock still held.
+
+    :return: Sequence number to pass to wait_durable()
+    """
+    return _syncer(path).record_write()
+
+
+def wait_durable(path, sequence, window):
+    """
+    Block until the append numbered `sequence` is on disk. Call without
+    holding the collection lock, so other writers can append meanwhile.
+
+    :param window: Seconds the syncing writer waits for others to join
+    """
+    _syncer(path).wait_durable(sequence, window)
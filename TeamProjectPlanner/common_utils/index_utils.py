@@ -0,0 +1,326 @@
+import bisect
+import itertools
+
+from common_utils import wal_utils
+
+
+# Secondary indexes of a collection: {field: {value: {key: None}}}. Buckets
+# are dicts used as ordered sets so lookups return records in the order
+# they were indexed. A list-valued field (e.g. team members) is indexed
+# under each of its items, so a team can be found by any of its members.
+#
+# The key order is the sorted list of primary keys, used to page through a
+# collection by id. Like the indexes it is copied on change, and only when
+# a record is added or removed.
+#
+# Sort orders do the same for other fields: {field: [(value, key)]}, sorted,
+# over the records whose value is a string (e.g. task creation times), so a
+# collection can be paged through in that field's order.
+
+
+def _index_values(record, field):
+    value = record.get(field)
+    values = value if isinstance(value, list) else [value]
+    for value in values:
+        try:
+            hash(value)
+        except TypeError:
+            continue
+        yield value
+
+
+def build_indexes(records, fields):
+    indexes = {field: {} for field in fields}
+    for key, record in records.items():
+        for field in fields:
+            for value in _index_values(record, field):
+                indexes[field].setdefault(value, {})[key] = None
+    return indexes
+
+
+class _IndexWriter:
+    """
+    Applies record changes to a copy of published indexes, copying only the
+    buckets it touches so the previous indexes stay valid for readers.
+    """
+
+    def __init__(self, indexes):
+        self.indexes = {
+            field: dict(buckets) for field, buckets in indexes.items()
+        }
+        self._copied = set()
+
+    def _bucket(self, field, value):
+        buckets = self.indexes[field]
+        if (field, value) not in self._copied:
+            buckets[value] = dict(buckets.get(value, {}))
+            self._copied.add((field, value))
+        return buckets[value]
+
+    def remove(self, key, record):
+        for field in self.indexes:
+            for value in _index_values(record, field):
+                bucket = self._bucket(field, value)
+                bucket.pop(key, None)
+                if not bucket:
+                    del self.indexes[field][value]
+                    self._copied.discard((field, value))
+
+    def add(self, key, record):
+        for field in self.indexes:
+            for value in _index_values(record, field):
+                self._bucket(field, value)[key] = None
+
+
+def apply_ops(records, indexes, ops, key_field):
+    """
+    wal_utils.apply_ops that also keeps `indexes` in step.
+
+    :param records: Private copy of the records, modified in place
+    :return: The updated copy of `indexes`
+    """
+    if not ops:
+        return indexes
+    writer = _IndexWriter(indexes)
+    for op in ops:
+        if op["op"] == wal_utils.PUT_OP:
+            key = op["record"][key_field]
+        else:
+            key = op["key"]
+        if key in records:
+            writer.remove(key, records[key])
+        wal_utils.apply_ops(records, [op], key_field)
+        if key in records:
+            writer.add(key, records[key])
+    return writer.indexes
+
+
+def build_key_order(records):
+    return sorted(records)
+
+
+def apply_key_order(key_order, records, ops, key_field):
+    """
+    :param records: The records with `ops` already applied
+    :return: The key order of `records`, `key_order` itself when no key was
+    added or removed
+    """
+    updated = None
+    touched_keys = {
+        op["record"][key_field] if op["op"] == wal_utils.PUT_OP
+        else op["key"]
+        for op in ops
+    }
+    for key in touched_keys:
+        current = updated if updated is not None else key_order
+        position = bisect.bisect_left(current, key)
+        ordered = position < len(current) and current[position] == key
+        if ordered == (key in records):
+            continue
+        if updated is None:
+            updated = list(key_order)
+        if ordered:
+            del updated[position]
+        else:
+            updated.insert(position, key)
+    return updated if updated is not None else key_order
+
+
+def page(records, key_order, after, limit, indexes=None, filters=None):
+    """
+    Up to `limit` records in primary key order, starting after the key
+    `after` (None: from the start).
+
+    :param filters: Optional field == value filters as in query()
+    :return: (records, key to continue after or None on the last page)
+    """
+    if filters:
+        return _filtered_page(
+            records, key_order, indexes or {}, after, limit, filters
+        )
+    start = 0 if after is None else bisect.bisect_right(key_order, after)
+    keys = key_order[start:start + limit]
+    next_after = None
+    if keys and start + limit < len(key_order):
+        next_after = keys[-1]
+    return [records[key] for key in keys], next_after
+
+
+def _filtered_page(records, key_order, indexes, after, limit, filters):
+    indexed_field = next(
+        (field for field in filters if field in indexes), None
+    )
+    if indexed_field is not None:
+        # Only the keys under the filter value are sorted, not the whole
+        # collection
+        try:
+            bucket = indexes[indexed_field].get(filters[indexed_field], ())
+        except TypeError:
+            bucket = ()
+        keys = sorted(
+            key for key in bucket if after is None or key > after
+        )
+    else:
+        start = 0 if after is None else bisect.bisect_right(key_order, after)
+        keys = itertools.islice(key_order, start, None)
+
+    # One match past the page tells whether another page follows
+    matched = []
+    for key in keys:
+        if matches(records[key], filters):
+            matched.append(key)
+            if len(matched) > limit:
+                break
+    next_after = matched[limit - 1] if len(matched) > limit else None
+    return [records[key] for key in matched[:limit]], next_after
+
+
+def _sort_value(record, field):
+    value = record.get(field) if record is not None else None
+    return value if isinstance(value, str) else None
+
+
+def build_sort_orders(records, fields):
+    return {
+        field: sorted(
+            (_sort_value(record, field), key)
+            for key, record in records.items()
+            if _sort_value(record, field) is not None
+        )
+        for field in fields
+    }
+
+
+def apply_sort_orders(sort_orders, old_records, records, ops, key_field):
+    """
+    :param old_records: The records before `ops`
+    :param records: The records with `ops` already applied
+    :return: The sort orders of `records`, each copied only if it changed
+    """
+    updated = {}
+    touched_keys = {
+        op["record"][key_field] if op["op"] == wal_utils.PUT_OP
+        else op["key"]
+        for op in ops
+    }
+    for field, order in sort_orders.items():
+        for key in touched_keys:
+            old_value = _sort_value(old_records.get(key), field)
+            new_value = _sort_value(records.get(key), field)
+            if old_value == new_value:
+                continue
+            if field not in updated:
+                updated[field] = order = list(order)
+            if old_value is not None:
+                del order[bisect.bisect_left(order, (old_value, key))]
+            if new_value is not None:
+                bisect.insort(order, (new_value, key))
+    return {**sort_orders, **updated}
+
+
+def sorted_page(
+    records, sort_order, after, limit, start=None, end=None,
+    descending=False, filters=None
+):
+    """
+    Up to `limit` records in the order of `sort_order`, starting after the
+    entry `after` ((value, key), None: from the start). Only the entries in
+    the page and the ones skipped by `filters` are visited.
+
+    :param start: Smallest value included, None for no bound
+    :param end: Largest value included, None for no bound
+    :return: (records, (value, key) to continue after or None on the last
+    page)
+    """
+    def value_of(entry):
+        return entry[0]
+
+    if descending:
+        position = len(sort_order)
+        if end is not None:
+            position = bisect.bisect_right(sort_order, end, key=value_of)
+        if after is not None:
+            position = min(
+                position, bisect.bisect_left(sort_order, tuple(after))
+            )
+        entries = (sort_order[i] for i in range(position - 1, -1, -1))
+        in_range = (
+            (lambda value: True) if start is None
+            else (lambda value: value >= start)
+        )
+    else:
+        position = 0
+        if start is not None:
+            position = bisect.bisect_left(sort_order, start, key=value_of)
+        if after is not None:
+            position = max(
+                position, bisect.bisect_right(sort_order, tuple(after))
+            )
+        entries = itertools.islice(sort_order, position, None)
+        in_range = (
+            (lambda value: True) if end is None
+            else (lambda value: value <= end)
+        )
+
+    # One match past the page tells whether another page follows
+    matched = []
+    for value, key in entries:
+        if not in_range(value):
+            break
+        if not filters or matches(records[key], filters):
+            matched.append((value, key))
+            if len(matched) > limit:
+                break
+    next_after = list(matched[limit - 1]) if len(matched) > limit else None
+    return [records[key] for _, key in matched[:limit]], next_after
+
+
+def matches(record, filters):
+    for field, value in filters.items():
+        record_value = record.get(field)
+        if isinstance(record_value, list):
+            if value not in record_value:
+                return False
+        elif record_value != value:
+            return False
+    return True
+
+
+def query(records, indexes, key_field, filters):
+    """
+    Records matching every field == value filter (list fields: contains),
+    narrowed by the primary key or the first indexed field when possible.
+    """
+    if key_field in filters:
+        return _query_key(records, indexes, filters[key_field], filters)
+    indexed_field = next(
+        (field for field in filters if field in indexes), None
+    )
+    if indexed_field is None:
+        candidates = records.values()
+    else:
+        try:
+            keys = indexes[indexed_field].get(filters[indexed_field], ())
+        except TypeError:
+            keys = ()
+        candidates = [records[key] for key in keys]
+    return [record for record in candidates if matches(record, filters)]
+
+
+def _query_key(records, indexes, key, filters):
+    record = records.get(key)
+    if record is None:
+        return []
+    # Indexed fields are checked against their bucket, so e.g. team_id plus
+    # members is a constant-time membership check, not a scan of the list
+    remaining = {}
+    for field, value in filters.items():
+        if field not in indexes:
+            remaining[field] = value
+            continue
+        try:
+            if key not in indexes[field].get(value, ()):
+                return []
+        except TypeError:
+            remaining[field] = value
+    return [record] if matches(record, remaining) else []
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+
+from filelock import FileLock
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@contextmanager
+def _flock(path, operation):
+    # Every acquisition opens its own file description, so flock() also
+    # arbitrates between threads of the same process
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def shared_lock(path):
+    """
+    Lock `path` for reading: any number of shared holders, no exclusive one.
+    Without fcntl this falls back to an exclusive FileLock.
+    """
+    if fcntl is None:
+        with FileLock(path):
+            yield
+        return
+    with _flock(path, fcntl.LOCK_SH):
+        yield
+
+
+@contextmanager
+def exclusive_lock(path):
+    """
+    Lock `path` for writing. Compatible with FileLock, which also uses
+    flock() on POSIX systems.
+    """
+    if fcntl is None:
+        with FileLock(path):
+            yield
+        return
+    with _flock(path, fcntl.LOCK_EX):
+        yield
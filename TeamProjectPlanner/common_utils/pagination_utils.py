@@ -0,0 +1,79 @@
+import base64
+import binascii
+
+from rest_framework import serializers
+
+from django.conf import settings
+
+from common_utils import codec_utils
+
+
+# List endpoints page through a collection in primary key order. The cursor
+# handed to clients is the base64url-encoded key of the last record served;
+# it is opaque to them and stays valid when records are added or removed.
+
+
+class PageSerializer(serializers.Serializer):
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=settings.LIST_PAGE_MAX_SIZE,
+        default=settings.LIST_PAGE_DEFAULT_SIZE
+    )
+
+
+def encode_cursor(after):
+    if after is None:
+        return None
+    raw = codec_utils.dumps_bytes({"after": after})
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor):
+    """
+    :return: The key a page starts after, None for the first page
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return codec_utils.loads(raw)["after"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise Exception(
+            settings.RESPONSE_MSG_CONSTANTS_DICT['INVALID_CURSOR']
+        )
+
+
+def decode_sorted_cursor(cursor):
+    """
+    Cursor of a page in field order (StorageBase.page_sorted).
+
+    :return: [value, key] a page starts after, None for the first page
+    """
+    after = decode_cursor(cursor)
+    if after is not None and not (
+        isinstance(after, list) and len(after) == 2
+        and all(isinstance(part, str) for part in after)
+    ):
+        raise Exception(
+            settings.RESPONSE_MSG_CONSTANTS_DICT['INVALID_CURSOR']
+        )
+    return after
+
+
+def load_page(storage, collection, request, **kwargs):
+    """
+    :param request: JSON string with the optional "cursor" and "limit"
+    :return: (records, next cursor or None on the last page)
+    """
+    serializer = PageSerializer(data=codec_utils.loads(request))
+    serializer.is_valid(raise_exception=True)
+    validated = serializer.validated_data
+    records, next_after = storage.page(
+        collection,
+        after=decode_cursor(validated.get("cursor")),
+        limit=validated["limit"],
+        **kwargs
+    )
+    return records, encode_cursor(next_after)
@@ -0,0 +1,36 @@
+from rest_framework import exceptions
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+
+from django.conf import settings
+from django.http import HttpResponse
+
+
+def json_response(result, status):
+    """
+    Send the JSON string returned by a manager as the response body as is,
+    instead of decoding it only for the renderer to encode it again.
+    """
+    return HttpResponse(
+        result, status=status, content_type="application/json"
+    )
+
+
+def api_exception_handler(exc, context):
+    """
+    Report authentication and permission failures as {"error": <message>}
+    with 403, the shape every endpoint uses.
+    """
+    if isinstance(
+        exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+    ):
+        return Response(
+            {"error": settings.RESPONSE_MSG_CONSTANTS_DICT['UNAUTH']},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    if isinstance(exc, exceptions.PermissionDenied):
+        return Response(
+            {"error": str(exc.detail)}, status=status.HTTP_403_FORBIDDEN
+        )
+    return exception_handler(exc, context)
@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+
+class CleanNameMixin:
+    """
+    For create serializers whose `name` must be unique: the uniqueness check
+    needs the name as validation stores it.
+    """
+
+    @classmethod
+    def clean_name(cls, value):
+        """
+        `value` as validation stores it (e.g. 12345 -> "12345"), or None when
+        it is invalid; look existing names up with this, not the raw value.
+        """
+        try:
+            return cls().fields["name"].run_validation(value)
+        except serializers.ValidationError:
+            return None
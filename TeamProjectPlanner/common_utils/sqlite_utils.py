@@ -0,0 +1,297 @@
+import sqlite3
+import threading
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+
+from project_planner_tool.base_interface import storage_base as \
+    storage_base_interface
+
+from common_utils import codec_utils
+
+
+# collection -> (primary key, indexed columns, indexed list fields). Every
+# record is stored whole as JSON in the `data` column; the key and indexed
+# fields are copied into their own columns so lookups on them use a B-tree
+# instead of a scan. Each item of a list field gets a row in a
+# "<collection>_<field>" table, e.g. teams_members for user -> teams.
+SCHEMA = {
+    "tokens": ("user_id", ["token"], []),
+    "users": ("user_id", ["name"], []),
+    "teams": ("team_id", [], ["members"]),
+    "boards": ("board_id", ["team_id"], []),
+    "tasks": ("task_id", ["board_id", "user_id"], []),
+    "stats": ("stat_id", [], []),
+}
+
+
+# collection -> [(sorted field, column it is sorted within)]. An index on
+# the column, the field's JSON value and the key serves page_sorted()
+SORT_INDEXES = {
+    "tasks": [("creation_time", "board_id")],
+}
+
+
+def _check_field(field):
+    # Field names are interpolated into SQL, only allow plain identifiers
+    if not field.isidentifier():
+        raise Exception(f"Invalid field name: {field}")
+    return field
+
+
+class SqliteStorage(storage_base_interface.StorageBase):
+    """
+    Collections kept in a single local SQLite database in WAL journal mode,
+    using Python's built-in sqlite3 module. Each thread gets its own
+    connection.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # isolation_level=None: transactions are opened explicitly below
+            connection = sqlite3.connect(
+                self.db_path, timeout=30, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        connection = self._connection()
+        for collection, schema in SCHEMA.items():
+            key_field, indexed_fields, list_fields = schema
+            columns = (
+                [f"{key_field} TEXT PRIMARY KEY"]
+                + [f"{field} TEXT" for field in indexed_fields]
+                + ["data TEXT NOT NULL"]
+            )
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {collection} "
+                f"({', '.join(columns)})"
+            )
+            for field in indexed_fields:
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {collection}_{field}_idx "
+                    f"ON {collection} ({field})"
+                )
+            for field in list_fields:
+                self._create_list_table(
+                    connection, collection, key_field, field
+                )
+            for field, column in SORT_INDEXES.get(collection, []):
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS "
+                    f"{collection}_{column}_{field}_idx ON {collection} "
+                    f"({column}, json_extract(data, '$.{field}'), "
+                    f"{key_field})"
+                )
+
+    def _create_list_table(self, connection, collection, key_field, field):
+        table = f"{collection}_{field}"
+        exists = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table,)
+        ).fetchone()
+        if exists:
+            return
+        connection.execute(
+            f"CREATE TABLE {table} ({key_field} TEXT NOT NULL, "
+            f"value TEXT NOT NULL, PRIMARY KEY (value, {key_field}))"
+        )
+        # Databases created before the table existed
+        connection.execute(
+            f"INSERT OR IGNORE INTO {table} ({key_field}, value) "
+            f"SELECT {collection}.{key_field}, item.value "
+            f"FROM {collection}, json_each({collection}.data, '$.{field}') "
+            f"AS item"
+        )
+
+    def _where(self, collection, filters):
+        key_field, indexed_fields, list_fields = SCHEMA[collection]
+        clauses = []
+        params = []
+        for field, value in filters.items():
+            if field == key_field or field in indexed_fields:
+                clauses.append(f"{field} = ?")
+            elif field in list_fields:
+                # List fields match when they contain the value
+                clauses.append(
+                    f"{key_field} IN (SELECT {key_field} "
+                    f"FROM {collection}_{field} WHERE value = ?)"
+                )
+            else:
+                clauses.append(
+                    f"json_extract(data, '$.{_check_field(field)}') = ?"
+                )
+            params.append(value)
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def get(self, collection, key):
+        key_field = SCHEMA[collection][0]
+        row = self._connection().execute(
+            f"SELECT data FROM {collection} WHERE {key_field} = ?", (key,)
+        ).fetchone()
+        return codec_utils.loads(row[0]) if row else None
+
+    def find(self, collection, **filters):
+        where, params = self._where(collection, filters)
+        # rowid order keeps records in insertion order like the JSON files
+        rows = self._connection().execute(
+            f"SELECT data FROM {collection}{where} ORDER BY rowid", params
+        )
+        return [codec_utils.loads(row[0]) for row in rows]
+
+    def exists(self, collection, **filters):
+        where, params = self._where(collection, filters)
+        row = self._connection().execute(
+            f"SELECT 1 FROM {collection}{where} LIMIT 1", params
+        ).fetchone()
+        return row is not None
+
+    def all(self, collection):
+        return self.find(collection)
+
+    def page(
+        self, collection, after=None, limit=100, board_id=None, **filters
+    ):
+        key_field = SCHEMA[collection][0]
+        if board_id:
+            filters["board_id"] = board_id
+        where, params = self._where(collection, filters)
+        if after is not None:
+            where += " AND " if where else " WHERE "
+            where += f"{key_field} > ?"
+            params.append(after)
+        # One extra row tells whether another page follows
+        rows = self._connection().execute(
+            f"SELECT {key_field}, data FROM {collection}{where} "
+            f"ORDER BY {key_field} LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        next_after = rows[limit - 1][0] if len(rows) > limit else None
+        return [codec_utils.loads(row[1]) for row in rows[:limit]], next_after
+
+    def page_sorted(
+        self, collection, field, after=None, limit=100, board_id=None,
+        start=None, end=None, descending=False, **filters
+    ):
+        key_field = SCHEMA[collection][0]
+        if board_id:
+            filters["board_id"] = board_id
+        where, params = self._where(collection, filters)
+        # Must match the indexed expression to use the index
+        value = f"json_extract(data, '$.{_check_field(field)}')"
+        clauses = [f"json_type(data, '$.{field}') = 'text'"]
+        if start is not None:
+            clauses.append(f"{value} >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append(f"{value} <= ?")
+            params.append(end)
+        if after is not None:
+            # The plain bound on the value lets SQLite seek to the cursor,
+            # it does not for the row value comparison alone
+            operator = "<" if descending else ">"
+            clauses.append(
+                f"{value} {operator}= ? AND "
+                f"({value}, {key_field}) {operator} (?, ?)"
+            )
+            params.extend([after[0]] + after)
+        where += (" AND " if where else " WHERE ") + " AND ".join(clauses)
+        direction = "DESC" if descending else "ASC"
+        # One extra row tells whether another page follows
+        rows = self._connection().execute(
+            f"SELECT {value}, {key_field}, data FROM {collection}{where} "
+            f"ORDER BY {value} {direction}, {key_field} {direction} "
+            f"LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        next_after = list(rows[limit - 1][:2]) if len(rows) > limit else None
+        return [codec_utils.loads(row[2]) for row in rows[:limit]], next_after
+
+    def put(self, collection, record):
+        key_field, indexed_fields, list_fields = SCHEMA[collection]
+        fields = [key_field] + indexed_fields
+        connection = self._connection()
+        connection.execute(
+            f"INSERT OR REPLACE INTO {collection} "
+            f"({', '.join(fields)}, data) "
+            f"VALUES ({', '.join('?' * (len(fields) + 1))})",
+            [record.get(field) for field in fields]
+            + [codec_utils.dumps(record)]
+        )
+        key = record[key_field]
+        for field in list_fields:
+            connection.execute(
+                f"DELETE FROM {collection}_{field} WHERE {key_field} = ?",
+                (key,)
+            )
+            connection.executemany(
+                f"INSERT OR IGNORE INTO {collection}_{field} "
+                f"({key_field}, value) VALUES (?, ?)",
+                [(key, value) for value in record.get(field) or []]
+            )
+
+    def delete(self, collection, key):
+        key_field, _, list_fields = SCHEMA[collection]
+        connection = self._connection()
+        connection.execute(
+            f"DELETE FROM {collection} WHERE {key_field} = ?", (key,)
+        )
+        for field in list_fields:
+            connection.execute(
+                f"DELETE FROM {collection}_{field} WHERE {key_field} = ?",
+                (key,)
+            )
+
+    @contextmanager
+    def _begin(self, mode):
+        connection = self._connection()
+        connection.execute(f"BEGIN {mode}")
+        try:
+            yield self
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def snapshot(self, *collections, board_id=None):
+        # Every statement already reads one consistent WAL snapshot; a read
+        # transaction extends that to several statements. It cannot be
+        # upgraded, so only explicit (read-only) snapshots open one.
+        # A snapshot taken inside another one joins it.
+        if not collections or self._connection().in_transaction:
+            return nullcontext(self)
+        return self._begin("DEFERRED")
+
+    def transaction(self, *collections, board_id=None):
+        # IMMEDIATE takes the database write lock up front, the SQLite
+        # equivalent of locking the collections before reading them
+        return self._begin("IMMEDIATE")
+
+    def run_in_transaction(
+        self, work, *collections, board_id=None, optimistic=False
+    ):
+        if optimistic:
+            for _ in range(settings.STORAGE_TRANSACTION_RETRIES):
+                try:
+                    # DEFERRED reads without the write lock; SQLite reports
+                    # the database as busy if another writer committed since
+                    # our read snapshot
+                    with self._begin("DEFERRED") as txn:
+                        return work(txn)
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e) and "busy" not in str(e):
+                        raise
+
+        with self.transaction(*collections, board_id=board_id) as txn:
+            return work(txn)
@@ -0,0 +1,136 @@
+import copy
+
+from django.conf import settings
+
+
+# Counters kept in the "stats" collection so dashboards and checks read
+# them instead of scanning boards and tasks:
+#
+#   {"stat_id": "team:<team_id>", "boards": {<board status>: n}}
+#   {"stat_id": "board:<board_id>", "tasks": {<task status>: n},
+#    "assignees": {<user_id>: {<task status>: n}}}
+#
+# A team record is only written under the boards lock (create_board,
+# close_board) and a board record only under the lock of that board's tasks
+# (add_task, update_task_status), the locks every change they count is
+# made under. The JSON backend therefore writes them in append mode without
+# serializing task writes on different boards.
+#
+# Boards and teams written before the counters existed have no record yet;
+# theirs are computed from the boards and tasks on the first read and
+# stored on the first write.
+
+
+def _team_key(team_id):
+    return f"team:{team_id}"
+
+
+def _board_key(board_id):
+    return f"board:{board_id}"
+
+
+def _board_statuses():
+    return [settings.TASK_STATUS_CHOICES[0]] + settings.BOARD_STATUS_CHOICES
+
+
+def _count(counts, status, delta):
+    counts[status] = counts.get(status, 0) + delta
+    if not counts[status]:
+        del counts[status]
+
+
+def _new_team_stats(team_id, boards):
+    counts = dict.fromkeys(_board_statuses(), 0)
+    for board in boards:
+        counts[board["status"]] = counts.get(board["status"], 0) + 1
+    return {"stat_id": _team_key(team_id), "boards": counts}
+
+
+def _new_board_stats(board_id, tasks):
+    stats = {
+        "stat_id": _board_key(board_id),
+        "tasks": dict.fromkeys(settings.TASK_STATUS_CHOICES, 0),
+        "assignees": {}
+    }
+    for task in tasks:
+        stats["tasks"][task["status"]] += 1
+        _count(
+            stats["assignees"].setdefault(task["user_id"], {}),
+            task["status"], 1
+        )
+    return stats
+
+
+def team_board_counts(storage, team_id):
+    """
+    :return: {board status: number of the team's boards}
+    """
+    stats = storage.get("stats", _team_key(team_id))
+    if stats is None:
+        stats = _new_team_stats(
+            team_id, storage.find("boards", team_id=team_id)
+        )
+    return stats["boards"]
+
+
+def board_task_counts(storage, board_id):
+    """
+    :return: {"tasks": {status: n}, "assignees": {user_id: {status: n}}}
+    of the board's tasks
+    """
+    stats = storage.get("stats", _board_key(board_id))
+    if stats is None:
+        stats = _new_board_stats(
+            board_id, storage.find("tasks", board_id=board_id)
+        )
+    return {"tasks": stats["tasks"], "assignees": stats["assignees"]}
+
+
+def _load_for_update(txn, key):
+    # Records come copied one level deep, the counters are nested
+    stats = txn.get("stats", key)
+    return copy.deepcopy(stats) if stats is not None else None
+
+
+def count_board_changes(txn, team_id, changes):
+    """
+    Apply board status changes to the team's counters. Call once per
+    transaction and team, with the boards collection locked and before the
+    changed boards are put.
+
+    :param changes: [(old status or None for a new board, new status)]
+    """
+    stats = _load_for_update(txn, _team_key(team_id))
+    if stats is None:
+        stats = _new_team_stats(team_id, txn.find("boards", team_id=team_id))
+    for old_status, new_status in changes:
+        if old_status is not None:
+            stats["boards"][old_status] -= 1
+        stats["boards"][new_status] = stats["boards"].get(new_status, 0) + 1
+    txn.put("stats", stats)
+
+
+def count_task_changes(txn, board_id, changes):
+    """
+    Apply task changes to the board's counters. Call once per transaction
+    and board, with the board's tasks locked and before the changed tasks
+    are put.
+
+    :param changes: [(user_id, old status or None for a new task,
+    new status)]
+    """
+    stats = _load_for_update(txn, _board_key(board_id))
+    if stats is None:
+        stats = _new_board_stats(
+            board_id, txn.find("tasks", board_id=board_id)
+        )
+    for user_id, old_status, new_status in changes:
+        assignee = stats["assignees"].setdefault(user_id, {})
+        if old_status is not None:
+            stats["tasks"][old_status] -= 1
+            _count(assignee, old_status, -1)
+        stats["tasks"][new_status] += 1
+        _count(assignee, new_status, 1)
+        if not assignee:
+            del stats["assignees"][user_id]
+    txn.put("stats", stats)
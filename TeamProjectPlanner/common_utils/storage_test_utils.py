@@ -0,0 +1,36 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from common_utils import base_utils as generic_utils
+from common_utils import storage_utils
+from common_utils import task_shard_utils
+
+
+@override_settings(
+    STORAGE_BACKEND="json", JSON_STORE_COMPACTION_THRESHOLD=10 ** 9
+)
+class JsonStoreTestCase(SimpleTestCase):
+    """
+    Runs every test on empty JSON collections in a temporary directory.
+    Compaction only happens when a test calls it.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.cwd = os.getcwd()
+        self.work_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.work_dir, "db"))
+        os.chdir(self.work_dir)
+        generic_utils._document_cache.clear()
+        storage_utils._storage = None
+        task_shard_utils._legacy_tasks_migrated = False
+
+    def tearDown(self):
+        generic_utils._document_cache.clear()
+        storage_utils._storage = None
+        os.chdir(self.cwd)
+        shutil.rmtree(self.work_dir)
+        super().tearDown()
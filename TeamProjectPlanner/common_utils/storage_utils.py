@@ -0,0 +1,328 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from project_planner_tool.base_interface import storage_base as \
+    storage_base_interface
+
+from common_utils import base_utils as generic_utils
+from common_utils import index_utils
+from common_utils import task_shard_utils
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """
+    Process-wide storage backend selected by settings.STORAGE_BACKEND.
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = build_storage(settings.STORAGE_BACKEND)
+    return _storage
+
+
+def build_storage(backend):
+    if backend == "json":
+        return JsonStorage()
+    if backend == "sqlite":
+        from common_utils import sqlite_utils
+        return sqlite_utils.SqliteStorage(settings.SQLITE_DB_FILE)
+    raise Exception(f"Unknown storage backend: {backend}")
+
+
+def copy_storage(source, target):
+    """
+    Copy every collection of `source` into `target`, e.g. to move from the
+    JSON files to SQLite. Existing records of `target` with the same keys
+    are replaced.
+
+    :return: {collection: number of records copied}
+    """
+    copied = {}
+    for collection in storage_base_interface.StorageBase.COLLECTIONS:
+        records = source.all(collection)
+        if collection == "tasks":
+            # Tasks are written per board
+            tasks_by_board = {}
+            for task in records:
+                tasks_by_board.setdefault(task["board_id"], []).append(task)
+            for board_id, board_tasks in tasks_by_board.items():
+                with target.transaction("tasks", board_id=board_id) as txn:
+                    for task in board_tasks:
+                        txn.put("tasks", task)
+        else:
+            with target.transaction(collection) as txn:
+                for record in records:
+                    txn.put(collection, record)
+        copied[collection] = len(records)
+    return copied
+
+
+class JsonStorage(storage_base_interface.StorageBase):
+    """
+    Collections kept in the JSON files of base_utils, tasks sharded per
+    board (see task_shard_utils).
+    """
+
+    # Written in append mode: transactions neither lock nor read them, as
+    # each of their records is only written under the lock of its owner
+    APPEND_COLLECTIONS = ("stats",)
+
+    def collection_path(self, collection, board_id=None):
+        if collection == "tasks":
+            return task_shard_utils.shard_path(board_id)
+        return {
+            "tokens": settings.TOKEN_FILE,
+            "users": settings.USER_FILE,
+            "teams": settings.TEAM_FILE,
+            "boards": settings.BOARD_FILE,
+            "stats": settings.STATS_FILE,
+        }[collection]
+
+    def _read_paths(self, collection, filters):
+        if collection != "tasks":
+            return [self.collection_path(collection)]
+        if "board_id" in filters:
+            return [task_shard_utils.shard_path(filters["board_id"])]
+        return task_shard_utils.all_shard_paths()
+
+    def get(self, collection, key):
+        if collection == "tasks":
+            board_id = task_shard_utils.board_id_of_task(key)
+            if not board_id:
+                return None
+            return generic_utils.load_record(
+                task_shard_utils.shard_path(board_id), key
+            )
+        return generic_utils.load_record(
+            self.collection_path(collection), key
+        )
+
+    def find(self, collection, **filters):
+        if (
+            collection == "tasks"
+            and "board_id" not in filters and "user_id" in filters
+        ):
+            return self._find_user_tasks(filters)
+        return [
+            dict(record)
+            for path in self._read_paths(collection, filters)
+            for record in generic_utils.query_records(path, **filters)
+        ]
+
+    def _find_user_tasks(self, filters):
+        # The manifest indexes tasks by assignee, so only the shards holding
+        # the user's tasks are read
+        user_tasks = []
+        locations = task_shard_utils.task_locations_of_user(filters["user_id"])
+        for board_id, task_ids in locations.items():
+            path = task_shard_utils.shard_path(board_id)
+            for task_id in task_ids:
+                task = generic_utils.load_record(path, task_id)
+                if task and index_utils.matches(task, filters):
+                    user_tasks.append(task)
+        return user_tasks
+
+    def exists(self, collection, **filters):
+        if collection == "tasks" and "board_id" not in filters:
+            return bool(self.find(collection, **filters))
+        # No record is copied, only looked up
+        return any(
+            generic_utils.query_records(path, **filters)
+            for path in self._read_paths(collection, filters)
+        )
+
+    def all(self, collection):
+        return self.find(collection)
+
+    def page(
+        self, collection, after=None, limit=100, board_id=None, **filters
+    ):
+        if collection == "tasks" and not board_id:
+            if "user_id" not in filters:
+                raise Exception(
+                    "Paging through tasks requires a board_id or user_id"
+                )
+            return self._page_user_tasks(after, limit, filters)
+        records, next_after = generic_utils.page_records(
+            self.collection_path(collection, board_id), after, limit,
+            **filters
+        )
+        return [dict(record) for record in records], next_after
+
+    def page_sorted(
+        self, collection, field, after=None, limit=100, board_id=None,
+        start=None, end=None, descending=False, **filters
+    ):
+        if collection == "tasks" and not board_id:
+            raise Exception("Sorted task pages require a board_id")
+        records, next_after = generic_utils.sorted_page_records(
+            self.collection_path(collection, board_id), field, after, limit,
+            start=start, end=end, descending=descending, filters=filters
+        )
+        return [dict(record) for record in records], next_after
+
+    def _page_user_tasks(self, after, limit, filters):
+        # The manifest pages through the user's tasks across boards, only
+        # the tasks on the page are read from their shards
+        locations, next_after = task_shard_utils.page_user_tasks(
+            after, limit, **filters
+        )
+        user_tasks = []
+        for location in locations:
+            task = generic_utils.load_record(
+                task_shard_utils.shard_path(location["board_id"]),
+                location["task_id"]
+            )
+            if task:
+                user_tasks.append(task)
+        return user_tasks, next_after
+
+    @contextmanager
+    def snapshot(self, *collections, board_id=None):
+        paths = []
+        for collection in collections:
+            if collection != "tasks":
+                paths.append(self.collection_path(collection))
+            elif board_id:
+                paths.append(task_shard_utils.shard_path(board_id))
+            else:
+                paths.extend(task_shard_utils.all_shard_paths())
+        if "tasks" in collections:
+            paths.append(settings.TASK_MANIFEST_FILE)
+
+        with generic_utils.snapshot():
+            if paths:
+                generic_utils.pin(*paths)
+            yield self
+
+    def _transaction_paths(self, collections, board_id):
+        paths = []
+        append_paths = []
+        for collection in collections:
+            path = self.collection_path(collection, board_id)
+            if collection in self.APPEND_COLLECTIONS:
+                append_paths.append(path)
+            else:
+                paths.append(path)
+        if "tasks" in collections:
+            append_paths.append(settings.TASK_MANIFEST_FILE)
+        return paths, append_paths
+
+    @contextmanager
+    def transaction(self, *collections, board_id=None):
+        paths, append_paths = self._transaction_paths(collections, board_id)
+        with generic_utils.transaction(
+            *paths, append_paths=append_paths
+        ) as txn:
+            yield JsonStorageTransaction(self, txn, collections, board_id)
+
+    def run_in_transaction(
+        self, work, *collections, board_id=None, optimistic=False
+    ):
+        paths, append_paths = self._transaction_paths(collections, board_id)
+        return generic_utils.run_in_transaction(
+            paths,
+            lambda txn: work(
+                JsonStorageTransaction(self, txn, collections, board_id)
+            ),
+            optimistic=optimistic,
+            append_paths=append_paths
+        )
+
+
+class JsonStorageTransaction:
+    """
+    Reads of the collections a transaction writes see their locked state;
+    any other collection is read from the latest committed data.
+    """
+
+    def __init__(self, storage, txn, collections, board_id):
+        self.storage = storage
+        self.txn = txn
+        self.collections = collections
+        self.board_id = board_id
+        # Append collections are read like the ones outside the transaction
+        self.locked_collections = [
+            collection for collection in collections
+            if collection not in storage.APPEND_COLLECTIONS
+        ]
+
+    def _path(self, collection):
+        return self.storage.collection_path(collection, self.board_id)
+
+    def get(self, collection, key):
+        if collection not in self.locked_collections:
+            return self.storage.get(collection, key)
+        return self.txn.load_record(self._path(collection), key)
+
+    def find(self, collection, **filters):
+        if collection not in self.locked_collections:
+            return self.storage.find(collection, **filters)
+        return [
+            dict(record)
+            for record in self.txn.query(self._path(collection), **filters)
+        ]
+
+    def exists(self, collection, **filters):
+        if collection not in self.locked_collections:
+            return self.storage.exists(collection, **filters)
+        return bool(self.txn.query(self._path(collection), **filters))
+
+    def all(self, collection):
+        return self.find(collection)
+
+    def page(
+        self, collection, after=None, limit=100, board_id=None, **filters
+    ):
+        if collection not in self.locked_collections:
+            return self.storage.page(
+                collection, after, limit, board_id, **filters
+            )
+        records, next_after = self.txn.page(
+            self._path(collection), after, limit, **filters
+        )
+        return [dict(record) for record in records], next_after
+
+    def page_sorted(
+        self, collection, field, after=None, limit=100, board_id=None,
+        start=None, end=None, descending=False, **filters
+    ):
+        if collection not in self.locked_collections:
+            return self.storage.page_sorted(
+                collection, field, after, limit, board_id, start, end,
+                descending, **filters
+            )
+        records, next_after = self.txn.sorted_page(
+            self._path(collection), field, after, limit, start=start,
+            end=end, descending=descending, filters=filters
+        )
+        return [dict(record) for record in records], next_after
+
+    def put(self, collection, record):
+        path = self._path(collection)
+        if collection == "tasks":
+            if record["board_id"] != self.board_id:
+                raise Exception(
+                    f"Task {record['task_id']} belongs to another board"
+                )
+            # Keep the manifest's board, assignee and status of the task
+            # current
+            existing = self.txn.load_record(path, record["task_id"])
+            if task_shard_utils.manifest_changed(existing, record):
+                self.txn.put(
+                    settings.TASK_MANIFEST_FILE,
+                    task_shard_utils.manifest_entry(record)
+                )
+        self.txn.put(path, record)
+
+    def delete(self, collection, key):
+        self.txn.delete(self._path(collection), key)
+        if collection == "tasks":
+            self.txn.delete(settings.TASK_MANIFEST_FILE, key)
@@ -0,0 +1,151 @@
+import os
+
+from django.conf import settings
+
+from common_utils import base_utils as generic_utils
+
+
+_legacy_tasks_migrated = False
+
+# Task fields copied into the manifest, kept current on every task write
+MANIFEST_FIELDS = ("task_id", "board_id", "user_id", "status")
+
+
+def shard_path(board_id):
+    _ensure_task_shards()
+    # Board ids end up in a file name, never let one escape the shard dir
+    if not board_id or os.path.basename(board_id) != board_id:
+        raise Exception(
+            settings.RESPONSE_MSG_CONSTANTS_DICT['BOARD_NOT_FOUND']
+        )
+    return os.path.join(settings.TASK_SHARD_DIR, board_id + ".json")
+
+
+def board_id_of_task(task_id):
+    _ensure_task_shards()
+    location = generic_utils.load_record(settings.TASK_MANIFEST_FILE, task_id)
+    return location["board_id"] if location else None
+
+
+def all_shard_paths():
+    _ensure_task_shards()
+    board_ids = generic_utils.index_values(
+        settings.TASK_MANIFEST_FILE, "board_id"
+    )
+    return [shard_path(board_id) for board_id in sorted(board_ids)]
+
+
+def task_locations_of_user(user_id):
+    """
+    :return: {board_id: [task_id]} of the tasks assigned to `user_id`
+    """
+    _ensure_task_shards()
+    locations = {}
+    for location in generic_utils.query_records(
+        settings.TASK_MANIFEST_FILE, user_id=user_id
+    ):
+        locations.setdefault(location["board_id"], []).append(
+            location["task_id"]
+        )
+    return locations
+
+
+def page_user_tasks(after, limit, **filters):
+    """
+    Page through the manifest entries of a user's tasks in task_id order.
+
+    :param filters: "user_id" and optionally "board_id" and "status"
+    :return: (manifest entries, task_id to continue after or None)
+    """
+    _ensure_task_shards()
+    unknown = set(filters) - set(MANIFEST_FIELDS)
+    if unknown:
+        raise Exception(
+            f"Cannot page tasks by {', '.join(sorted(unknown))} without a "
+            "board_id"
+        )
+    return generic_utils.page_records(
+        settings.TASK_MANIFEST_FILE, after, limit, **filters
+    )
+
+
+def manifest_entry(task):
+    return {field: task[field] for field in MANIFEST_FIELDS}
+
+
+def manifest_changed(existing, task):
+    return not existing or any(
+        existing[field] != task[field] for field in MANIFEST_FIELDS
+    )
+
+
+def _ensure_task_shards():
+    global _legacy_tasks_migrated
+    if _legacy_tasks_migrated:
+        return
+    os.makedirs(settings.TASK_SHARD_DIR, exist_ok=True)
+    _migrate_legacy_tasks()
+    _backfill_manifest_fields()
+    _legacy_tasks_migrated = True
+
+
+def _migrate_legacy_tasks():
+    """
+    Move tasks written before sharding (settings.TASK_FILE) into their
+    board shards and register them in the manifest.
+    """
+    legacy_board_ids = {
+        task["board_id"]
+        for task in generic_utils.load_json(settings.TASK_FILE)
+    }
+    if not legacy_board_ids:
+        return
+
+    shard_paths = {
+        board_id: os.path.join(settings.TASK_SHARD_DIR, board_id + ".json")
+        for board_id in legacy_board_ids
+    }
+    with generic_utils.transaction(
+        settings.TASK_FILE, settings.TASK_MANIFEST_FILE, *shard_paths.values()
+    ) as txn:
+        shards = {
+            board_id: txn.load(path) for board_id, path in shard_paths.items()
+        }
+        remaining_tasks = []
+        for task in txn.load(settings.TASK_FILE):
+            # Another worker may have moved more tasks in the meantime
+            if task["board_id"] not in shards:
+                remaining_tasks.append(task)
+                continue
+            shards[task["board_id"]].append(task)
+            txn.put(settings.TASK_MANIFEST_FILE, manifest_entry(task))
+
+        for board_id, tasks_info in shards.items():
+            txn.save(shard_paths[board_id], tasks_info)
+        txn.save(settings.TASK_FILE, remaining_tasks)
+
+
+def _backfill_manifest_fields():
+    """
+    Add the assigned user and status to manifest entries written before the
+    manifest recorded them.
+    """
+    missing = [
+        location for location in generic_utils.scan_records(
+            settings.TASK_MANIFEST_FILE
+        )
+        if any(field not in location for field in MANIFEST_FIELDS)
+    ]
+    if not missing:
+        return
+
+    with generic_utils.transaction(settings.TASK_MANIFEST_FILE) as txn:
+        for location in missing:
+            task = generic_utils.load_record(
+                os.path.join(
+                    settings.TASK_SHARD_DIR, location["board_id"] + ".json"
+                ),
+                location["task_id"]
+            )
+            if task:
+                txn.put(settings.TASK_MANIFEST_FILE, manifest_entry(task))
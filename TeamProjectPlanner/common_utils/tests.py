@@ -0,0 +1,624 @@
+import os
+import threading
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from common_utils import base_utils as generic_utils
+from common_utils import codec_utils
+from common_utils import group_commit_utils
+from common_utils import lock_utils
+from common_utils import storage_test_utils
+from common_utils import sqlite_utils
+from common_utils import storage_utils
+from common_utils import task_shard_utils
+from common_utils import user_search_utils
+from common_utils import wal_utils
+
+
+class JsonStoreCompactionTests(storage_test_utils.JsonStoreTestCase):
+    path = settings.USER_FILE
+
+    def _put(self, index):
+        # Names of varying length, so offsets carried over from one log
+        # generation to the next land inside a record
+        with generic_utils.transaction(self.path) as txn:
+            txn.put(self.path, {
+                "user_id": f"u_{index:02d}", "name": "user" * (index % 3 + 1)
+            })
+
+    def _stored_ids(self):
+        generic_utils._document_cache.clear()
+        return sorted(
+            record["user_id"] for record in generic_utils.load_json(self.path)
+        )
+
+    def _expected_ids(self, count):
+        return [f"u_{index:02d}" for index in range(count)]
+
+    def test_read_during_compaction_is_retried(self):
+        for index in range(4):
+            self._put(index)
+
+        start_log = wal_utils.start_log
+        stale = {}
+
+        def read_then_start_log(*args):
+            # Another process reading between the snapshot replace and the
+            # log replace, with nothing cached
+            own_state = generic_utils._document_cache.pop(self.path)
+            stale["state"] = generic_utils._read_state(self.path)
+            generic_utils._document_cache[self.path] = own_state
+            return start_log(*args)
+
+        with mock.patch.object(
+            wal_utils, "start_log", side_effect=read_then_start_log
+        ):
+            generic_utils.compact_json(self.path)
+        self.assertIsNone(stale["state"])
+
+        for index in range(4, 12):
+            self._put(index)
+        self.assertEqual(self._stored_ids(), self._expected_ids(12))
+
+    def test_offset_of_previous_log_generation_is_not_reused(self):
+        for index in range(4):
+            self._put(index)
+        # Cached by a process that sleeps through the compaction and the
+        # appends after it
+        stale_state = generic_utils._document_cache[self.path]
+        generic_utils.compact_json(self.path)
+        for index in range(4, 12):
+            self._put(index)
+
+        generic_utils._document_cache[self.path] = stale_state
+        self._put(12)
+        self.assertEqual(
+            sorted(
+                record["user_id"]
+                for record in generic_utils.load_json(self.path)
+            ),
+            self._expected_ids(13)
+        )
+        self.assertEqual(self._stored_ids(), self._expected_ids(13))
+
+    def test_interrupted_compaction_is_finished(self):
+        for index in range(4):
+            self._put(index)
+
+        with mock.patch.object(
+            wal_utils, "start_log", side_effect=OSError("crash")
+        ):
+            with self.assertRaises(OSError):
+                generic_utils.compact_json(self.path)
+        generic_utils._document_cache.clear()
+        self.assertIsNone(generic_utils._read_state(self.path))
+
+        self.assertEqual(self._stored_ids(), self._expected_ids(4))
+        log_header, ops, _ = wal_utils.read_log(self.path)
+        self.assertEqual(ops, [])
+        self.assertTrue(wal_utils.log_applies_to(
+            log_header, generic_utils._collection_signature(self.path)[0]
+        ))
+        self._put(4)
+        self.assertEqual(self._stored_ids(), self._expected_ids(5))
+
+
+class UserSearchIndexTests(SimpleTestCase):
+    def _user(self, display_name):
+        return {
+            "user_id": "u_01", "name": "alice", "display_name": display_name
+        }
+
+    def test_sync_keeps_users_changed_after_the_read(self):
+        index = user_search_utils.UserSearchIndex()
+        index.add(self._user("Old Name"))
+
+        def read_users():
+            # The users collection was read before this update was indexed
+            index.add(self._user("New Name"))
+            yield self._user("Old Name")
+
+        index.sync(read_users())
+        self.assertEqual(index.search("new", 10), ["u_01"])
+        self.assertEqual(index.search("old", 10), [])
+
+    def test_sync_applies_changes_in_batches(self):
+        index = user_search_utils.UserSearchIndex()
+        users = [
+            {"user_id": f"u_{i:03d}", "name": f"user{i:03d}"}
+            for i in range(250)
+        ]
+        with mock.patch.object(index, "_lock", wraps=index._lock) as lock:
+            index.sync(users)
+        # One hold to copy the index, then one per batch
+        self.assertEqual(lock.__enter__.call_count, 1 + 3)
+        self.assertEqual(index.search("user249", 10), ["u_249"])
+
+    def _lettered_users(self, count):
+        # Four terms per user, all starting with "b"
+        return [
+            {
+                "user_id": f"u_{i:03d}", "name": f"user{i:03d}",
+                "display_name": f"b{i:03d}x b{i:03d}y"
+            }
+            for i in range(count)
+        ]
+
+    def test_short_prefix_ranks_distinct_users(self):
+        users = self._lettered_users(60)
+        synced = user_search_utils.UserSearchIndex()
+        synced.sync(users)
+        added = user_search_utils.UserSearchIndex()
+        for user in users:
+            added.add(user)
+
+        for index in (synced, added):
+            found = index.search("b", 50)
+            self.assertEqual(len(found), 50)
+            self.assertEqual(len(set(found)), 50)
+
+    def test_renamed_user_leaves_room_for_others(self):
+        index = user_search_utils.UserSearchIndex()
+        users = self._lettered_users(60)
+        for user in users:
+            index.add(user)
+        for user in users[:20]:
+            index.add(dict(user, display_name="Renamed"))
+
+        found = index.search("b", 50)
+        self.assertEqual(len(found), 40)
+        self.assertFalse(set(found) & {user["user_id"] for user in users[:20]})
+
+
+class JsonTransactionTests(storage_test_utils.JsonStoreTestCase):
+    def _user(self, user_id):
+        return {"user_id": user_id, "name": f"user {user_id}"}
+
+    def _team(self, team_id):
+        return {"team_id": team_id, "team_name": f"team {team_id}"}
+
+    def test_commit_writes_every_collection(self):
+        with generic_utils.transaction(
+            settings.USER_FILE, settings.TEAM_FILE
+        ) as txn:
+            txn.put(settings.USER_FILE, self._user("u_01"))
+            txn.put(settings.TEAM_FILE, self._team("t_01"))
+            # Staged writes are not visible before the commit
+            self.assertIsNone(txn.load_record(settings.USER_FILE, "u_01"))
+
+        self.assertEqual(
+            generic_utils.load_json(settings.USER_FILE), [self._user("u_01")]
+        )
+        self.assertEqual(
+            generic_utils.load_json(settings.TEAM_FILE), [self._team("t_01")]
+        )
+
+    def test_exception_discards_every_write(self):
+        with self.assertRaises(ValueError):
+            with generic_utils.transaction(
+                settings.USER_FILE, settings.TEAM_FILE
+            ) as txn:
+                txn.put(settings.USER_FILE, self._user("u_01"))
+                txn.put(settings.TEAM_FILE, self._team("t_01"))
+                raise ValueError("abort")
+
+        self.assertEqual(generic_utils.load_json(settings.USER_FILE), [])
+        self.assertEqual(generic_utils.load_json(settings.TEAM_FILE), [])
+
+    def test_undeclared_collection_is_rejected(self):
+        with generic_utils.transaction(settings.USER_FILE) as txn:
+            with self.assertRaises(Exception):
+                txn.put(settings.TEAM_FILE, self._team("t_01"))
+
+    def test_optimistic_work_is_rerun_after_a_conflict(self):
+        calls = []
+
+        def add_user(txn):
+            calls.append(len(txn.load(settings.USER_FILE)))
+            if len(calls) == 1:
+                # Another writer commits between our read and our commit
+                writer = threading.Thread(
+                    target=generic_utils.save_json,
+                    args=(settings.USER_FILE, [self._user("u_01")])
+                )
+                writer.start()
+                writer.join()
+            users = txn.load(settings.USER_FILE)
+            txn.save(settings.USER_FILE, users + [self._user("u_02")])
+
+        generic_utils.run_in_transaction(
+            [settings.USER_FILE], add_user, optimistic=True
+        )
+        self.assertEqual(calls, [0, 1])
+        self.assertEqual(
+            [user["user_id"] for user in generic_utils.load_json(
+                settings.USER_FILE
+            )],
+            ["u_01", "u_02"]
+        )
+
+
+class TaskShardTests(storage_test_utils.JsonStoreTestCase):
+    def _task(self, task_id, board_id):
+        return {
+            "task_id": task_id, "board_id": board_id, "user_id": "u_01",
+            "status": "OPEN", "title": task_id
+        }
+
+    def _add_tasks(self, storage, board_id, *task_ids):
+        with storage.transaction("tasks", board_id=board_id) as txn:
+            for task_id in task_ids:
+                txn.put("tasks", self._task(task_id, board_id))
+
+    def test_tasks_are_stored_in_their_board_shard(self):
+        storage = storage_utils.get_storage()
+        self._add_tasks(storage, "b_01", "task_01", "task_02")
+        self._add_tasks(storage, "b_02", "task_03")
+
+        self.assertEqual(
+            [task["task_id"] for task in generic_utils.load_json(
+                task_shard_utils.shard_path("b_01")
+            )],
+            ["task_01", "task_02"]
+        )
+        self.assertEqual(
+            [task["task_id"] for task in storage.find(
+                "tasks", board_id="b_02"
+            )],
+            ["task_03"]
+        )
+        # Looked up by id through the manifest
+        self.assertEqual(storage.get("tasks", "task_03")["board_id"], "b_02")
+        self.assertEqual(
+            task_shard_utils.board_id_of_task("task_01"), "b_01"
+        )
+
+    def test_task_of_another_board_is_rejected(self):
+        storage = storage_utils.get_storage()
+        with self.assertRaises(Exception):
+            with storage.transaction("tasks", board_id="b_01") as txn:
+                txn.put("tasks", self._task("task_01", "b_02"))
+        self.assertIsNone(storage.get("tasks", "task_01"))
+
+    def test_board_id_cannot_escape_the_shard_directory(self):
+        with self.assertRaises(Exception):
+            task_shard_utils.shard_path("../users")
+
+    def test_legacy_tasks_are_moved_into_shards(self):
+        generic_utils.save_json(settings.TASK_FILE, [
+            self._task("task_01", "b_01"), self._task("task_02", "b_02")
+        ])
+
+        storage = storage_utils.get_storage()
+        self.assertEqual(storage.get("tasks", "task_02")["board_id"], "b_02")
+        self.assertEqual(generic_utils.load_json(settings.TASK_FILE), [])
+        self.assertEqual(
+            generic_utils.load_json(task_shard_utils.shard_path("b_01")),
+            [self._task("task_01", "b_01")]
+        )
+
+
+class SqliteStorageTests(storage_test_utils.JsonStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = sqlite_utils.SqliteStorage("db/test.sqlite3")
+
+    def _put_team(self, team_id, members):
+        with self.storage.transaction("teams") as txn:
+            txn.put("teams", {
+                "team_id": team_id, "team_name": f"team {team_id}",
+                "members": members
+            })
+
+    def test_find_by_key_column_list_item_and_json_field(self):
+        self._put_team("t_01", ["u_01", "u_02"])
+        self._put_team("t_02", ["u_02"])
+
+        self.assertEqual(self.storage.get("teams", "t_01")["members"], [
+            "u_01", "u_02"
+        ])
+        self.assertEqual(
+            [team["team_id"] for team in self.storage.find(
+                "teams", members="u_02"
+            )],
+            ["t_01", "t_02"]
+        )
+        self.assertEqual(
+            [team["team_id"] for team in self.storage.find(
+                "teams", team_name="team t_02"
+            )],
+            ["t_02"]
+        )
+        self.assertFalse(
+            self.storage.exists("teams", team_id="t_02", members="u_01")
+        )
+
+    def test_rewritten_list_field_drops_old_items(self):
+        self._put_team("t_01", ["u_01", "u_02"])
+        self._put_team("t_01", ["u_02"])
+        self.assertEqual(self.storage.find("teams", members="u_01"), [])
+
+    def test_exception_rolls_the_transaction_back(self):
+        with self.assertRaises(ValueError):
+            with self.storage.transaction("teams") as txn:
+                txn.put("teams", {"team_id": "t_01", "members": []})
+                raise ValueError("abort")
+        self.assertIsNone(self.storage.get("teams", "t_01"))
+
+    def test_copy_storage_moves_json_collections(self):
+        source = storage_utils.build_storage("json")
+        with source.transaction("users") as txn:
+            txn.put("users", {"user_id": "u_01", "name": "alice"})
+        with source.transaction("tasks", board_id="b_01") as txn:
+            txn.put("tasks", {
+                "task_id": "task_01", "board_id": "b_01",
+                "user_id": "u_01", "status": "OPEN"
+            })
+
+        copied = storage_utils.copy_storage(source, self.storage)
+        self.assertEqual(copied["users"], 1)
+        self.assertEqual(copied["tasks"], 1)
+        self.assertEqual(self.storage.get("users", "u_01")["name"], "alice")
+        self.assertEqual(
+            self.storage.find("tasks", user_id="u_01")[0]["task_id"],
+            "task_01"
+        )
+
+
+class JsonIndexTests(storage_test_utils.JsonStoreTestCase):
+    path = settings.TEAM_FILE
+
+    def _put(self, team_id, team_name, members):
+        with generic_utils.transaction(self.path) as txn:
+            txn.put(self.path, {
+                "team_id": team_id, "team_name": team_name,
+                "members": members
+            })
+
+    def _team_ids(self, **filters):
+        return [
+            team["team_id"]
+            for team in generic_utils.query_records(self.path, **filters)
+        ]
+
+    def test_list_field_is_indexed_under_each_item(self):
+        self._put("t_01", "alpha", ["u_01", "u_02"])
+        self._put("t_02", "beta", ["u_02"])
+
+        self.assertEqual(self._team_ids(members="u_02"), ["t_01", "t_02"])
+        self.assertEqual(self._team_ids(members="u_01"), ["t_01"])
+        self.assertEqual(
+            self._team_ids(team_id="t_02", members="u_01"), []
+        )
+
+    def test_update_moves_record_between_buckets(self):
+        self._put("t_01", "alpha", ["u_01"])
+        self._put("t_01", "gamma", ["u_02"])
+
+        self.assertEqual(self._team_ids(team_name="alpha"), [])
+        self.assertEqual(self._team_ids(team_name="gamma"), ["t_01"])
+        self.assertEqual(self._team_ids(members="u_01"), [])
+        self.assertEqual(
+            generic_utils.index_values(self.path, "team_name"), ["gamma"]
+        )
+
+    def test_published_indexes_are_not_changed_by_later_writes(self):
+        self._put("t_01", "alpha", ["u_01"])
+        state = generic_utils._document_cache[self.path]
+        self._put("t_02", "beta", ["u_01"])
+
+        self.assertEqual(list(state.indexes["members"]["u_01"]), ["t_01"])
+
+    def test_indexes_are_rebuilt_from_disk(self):
+        self._put("t_01", "alpha", ["u_01"])
+        generic_utils._document_cache.clear()
+        self.assertEqual(self._team_ids(members="u_01"), ["t_01"])
+
+
+class LockFreeReadTests(storage_test_utils.JsonStoreTestCase):
+    path = settings.USER_FILE
+
+    def _put(self, user_id):
+        with generic_utils.transaction(self.path) as txn:
+            txn.put(self.path, {"user_id": user_id, "name": user_id})
+
+    def _user_ids_in_thread(self):
+        # Read from another thread, which holds none of our locks
+        result = {}
+
+        def read():
+            generic_utils._document_cache.clear()
+            result["ids"] = [
+                user["user_id"]
+                for user in generic_utils.load_json(self.path)
+            ]
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join(5)
+        return result.get("ids")
+
+    def test_read_does_not_wait_for_a_writer(self):
+        self._put("u_01")
+        with generic_utils.transaction(self.path) as txn:
+            txn.put(self.path, {"user_id": "u_02", "name": "u_02"})
+            # The writer holds the exclusive lock until the block exits
+            self.assertEqual(self._user_ids_in_thread(), ["u_01"])
+        self.assertEqual(self._user_ids_in_thread(), ["u_01", "u_02"])
+
+    def test_read_racing_writers_falls_back_to_a_lock(self):
+        self._put("u_01")
+        generic_utils._document_cache.clear()
+        with mock.patch.object(
+            generic_utils, "_read_state",
+            side_effect=[None] * settings.JSON_STORE_LOCK_FREE_READ_ATTEMPTS
+            + [None]
+        ):
+            records = generic_utils.load_json(self.path)
+        self.assertEqual([user["user_id"] for user in records], ["u_01"])
+
+    def test_shared_locks_are_held_together(self):
+        lock_path = os.path.join(self.work_dir, "collection.lock")
+        entered = threading.Event()
+
+        def hold_shared():
+            with lock_utils.shared_lock(lock_path):
+                entered.set()
+
+        with lock_utils.shared_lock(lock_path):
+            holder = threading.Thread(target=hold_shared)
+            holder.start()
+            self.assertTrue(entered.wait(5))
+        holder.join()
+
+
+class SnapshotTests(storage_test_utils.JsonStoreTestCase):
+    def _put(self, path, record):
+        with generic_utils.transaction(path) as txn:
+            txn.put(path, record)
+
+    def _put_in_thread(self, path, record):
+        writer = threading.Thread(target=self._put, args=(path, record))
+        writer.start()
+        writer.join()
+
+    def _ids(self, path, key_field):
+        return [
+            record[key_field] for record in generic_utils.load_json(path)
+        ]
+
+    def test_reads_stay_on_the_pinned_version(self):
+        self._put(settings.USER_FILE, {"user_id": "u_01"})
+        with generic_utils.snapshot():
+            self.assertEqual(self._ids(settings.USER_FILE, "user_id"), [
+                "u_01"
+            ])
+            self._put_in_thread(settings.USER_FILE, {"user_id": "u_02"})
+            self.assertEqual(self._ids(settings.USER_FILE, "user_id"), [
+                "u_01"
+            ])
+            self.assertIsNone(
+                generic_utils.load_record(settings.USER_FILE, "u_02")
+            )
+        self.assertEqual(self._ids(settings.USER_FILE, "user_id"), [
+            "u_01", "u_02"
+        ])
+
+    def test_pin_reads_collections_at_one_point(self):
+        self._put(settings.USER_FILE, {"user_id": "u_01"})
+        with generic_utils.snapshot():
+            generic_utils.pin(settings.USER_FILE, settings.TEAM_FILE)
+            self._put_in_thread(settings.TEAM_FILE, {"team_id": "t_01"})
+            # Pinned before its first read, so the write is not seen
+            self.assertEqual(self._ids(settings.TEAM_FILE, "team_id"), [])
+
+    def test_transaction_writes_are_read_back_in_the_snapshot(self):
+        with generic_utils.snapshot():
+            self.assertEqual(self._ids(settings.USER_FILE, "user_id"), [])
+            self._put(settings.USER_FILE, {"user_id": "u_01"})
+            self.assertEqual(self._ids(settings.USER_FILE, "user_id"), [
+                "u_01"
+            ])
+
+    def test_pin_outside_a_snapshot_is_rejected(self):
+        with self.assertRaises(Exception):
+            generic_utils.pin(settings.USER_FILE)
+
+
+@override_settings(JSON_STORE_GROUP_COMMIT_WINDOW_MS=20)
+class GroupCommitTests(storage_test_utils.JsonStoreTestCase):
+    path = settings.USER_FILE
+
+    def _put(self, user_id):
+        with generic_utils.transaction(self.path) as txn:
+            txn.put(self.path, {"user_id": user_id})
+
+    def test_concurrent_writes_share_fsyncs(self):
+        user_ids = [f"u_{index:02d}" for index in range(8)]
+        start = threading.Barrier(len(user_ids))
+
+        def write(user_id):
+            start.wait()
+            self._put(user_id)
+
+        writers = [
+            threading.Thread(target=write, args=(user_id,))
+            for user_id in user_ids
+        ]
+        with mock.patch.object(
+            wal_utils, "sync_log", wraps=wal_utils.sync_log
+        ) as sync_log:
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+
+        self.assertGreaterEqual(sync_log.call_count, 1)
+        self.assertLess(sync_log.call_count, len(user_ids))
+        self.assertEqual(
+            sorted(
+                user["user_id"]
+                for user in generic_utils.load_json(self.path)
+            ),
+            user_ids
+        )
+
+    @override_settings(JSON_STORE_GROUP_COMMIT_WINDOW_MS=0)
+    def test_without_a_window_every_append_is_synced(self):
+        with mock.patch.object(wal_utils, "sync_log") as sync_log:
+            with mock.patch.object(
+                wal_utils, "append_log", wraps=wal_utils.append_log
+            ) as append_log:
+                self._put("u_01")
+        sync_log.assert_not_called()
+        self.assertTrue(
+            all(call.kwargs["sync"] for call in append_log.call_args_list)
+        )
+
+    def test_failed_fsync_is_retried_by_the_next_waiter(self):
+        syncer = group_commit_utils._LogSyncer(self.path)
+        sequence = syncer.record_write()
+        with mock.patch.object(
+            wal_utils, "sync_log", side_effect=[OSError("disk"), None]
+        ):
+            with self.assertRaises(OSError):
+                syncer.wait_durable(sequence, 0)
+            self.assertEqual(syncer.synced, 0)
+            syncer.wait_durable(sequence, 0)
+        self.assertEqual(syncer.synced, sequence)
+
+
+class CodecTests(storage_test_utils.JsonStoreTestCase):
+    record = {
+        "user_id": "u_01", "name": "zoë", "members": ["u_02"],
+        "is_admin": False, "count": 3
+    }
+
+    def test_standard_library_fallback_is_compact(self):
+        with mock.patch.object(codec_utils, "orjson", None):
+            text = codec_utils.dumps(self.record)
+            self.assertEqual(
+                text,
+                '{"user_id":"u_01","name":"zoë","members":["u_02"],'
+                '"is_admin":false,"count":3}'
+            )
+            self.assertEqual(
+                codec_utils.dumps_bytes(self.record), text.encode()
+            )
+            self.assertEqual(codec_utils.loads(text.encode()), self.record)
+
+    @skipUnless(codec_utils.orjson, "orjson is not installed")
+    def test_orjson_matches_the_fallback(self):
+        with mock.patch.object(codec_utils, "orjson", None):
+            fallback = codec_utils.dumps(self.record)
+        self.assertEqual(codec_utils.dumps(self.record), fallback)
+
+    def test_collection_written_by_the_fallback_reads_back(self):
+        with mock.patch.object(codec_utils, "orjson", None):
+            generic_utils.save_json(settings.USER_FILE, [self.record])
+        generic_utils._document_cache.clear()
+        self.assertEqual(
+            generic_utils.load_json(settings.USER_FILE), [self.record]
+        )
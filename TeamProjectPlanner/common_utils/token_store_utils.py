@@ -0,0 +1,190 @@
+import time
+import logging
+import threading
+from datetime import datetime
+
+from django.conf import settings
+
+from common_utils import storage_utils
+
+
+logger = logging.getLogger(__name__)
+
+_token_store = None
+_token_store_lock = threading.Lock()
+
+
+def get_token_store():
+    """
+    Process-wide token store; starts its expiry sweeper on first use.
+    """
+    global _token_store
+    if _token_store is None:
+        with _token_store_lock:
+            if _token_store is None:
+                _token_store = TokenStore(storage_utils.get_storage())
+                _token_store.start_sweeper()
+    return _token_store
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def issued_at_ms(token_record):
+    if "not_before" in token_record:
+        return token_record["not_before"]
+    # Records written before not_before existed
+    created_at = datetime.fromisoformat(token_record["created_at"])
+    return int(created_at.timestamp() * 1000)
+
+
+def is_expired(token_record, now=None):
+    if settings.AUTH_TOKEN_TTL_SECONDS <= 0:
+        return False
+    expires_at = (
+        issued_at_ms(token_record) + settings.AUTH_TOKEN_TTL_SECONDS * 1000
+    )
+    return expires_at <= (now if now is not None else now_ms())
+
+
+class TokenStore:
+    """
+    Auth tokens of the "tokens" collection, one record per user:
+    {user_id, token (opaque tokens only), created_at, not_before}. Upserts
+    are keyed by user_id and lookups by token go through its index, so both
+    are O(1). Records expire AUTH_TOKEN_TTL_SECONDS after not_before, the
+    time (epoch ms) of the user's last login or logout, and are removed by
+    a background sweeper.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._sweeper = None
+
+    def issue(self, user_id, token=None):
+        """
+        Replace the user's record, revoking every earlier token of the user.
+
+        :param token: The opaque token to store, None for signed tokens
+        :return: Issue time in epoch ms, the new cutoff. It is strictly after
+        the previous cutoff, so tokens issued earlier, even within the same
+        millisecond, fall before it
+        """
+        with self.storage.transaction("tokens") as txn:
+            issued_at = self._next_cutoff(txn, user_id)
+            token_record = {
+                "user_id": user_id,
+                "created_at": datetime.now().isoformat(),
+                "not_before": issued_at
+            }
+            if token:
+                token_record["token"] = token
+            txn.put("tokens", token_record)
+        return issued_at
+
+    def revoke(self, user_id):
+        """
+        Revoke every token of the user issued so far.
+
+        :return: The new cutoff in epoch ms, strictly after every issue time
+        handed out so far
+        """
+        with self.storage.transaction("tokens") as txn:
+            not_before = self._next_cutoff(txn, user_id)
+            txn.put("tokens", {
+                "user_id": user_id,
+                "created_at": datetime.now().isoformat(),
+                "not_before": not_before
+            })
+        return not_before
+
+    def _next_cutoff(self, txn, user_id):
+        # Cutoffs only ever move forward, one ms at least, as they are read
+        # and written under the tokens lock. Issue times equal the cutoff
+        # they set, so no two tokens of a user share one
+        previous = txn.get("tokens", user_id)
+        cutoff = now_ms()
+        if previous:
+            cutoff = max(cutoff, issued_at_ms(previous) + 1)
+        return cutoff
+
+    def lookup(self, token):
+        """
+        :return: The record of an unexpired opaque token, otherwise None
+        """
+        if not token:
+            return None
+        token_records = self.storage.find("tokens", token=token)
+        if not token_records or is_expired(token_records[0]):
+            return None
+        return token_records[0]
+
+    def lookup_many(self, tokens):
+        """
+        Batch form of lookup(), all tokens resolved from one snapshot of the
+        store.
+
+        :return: {token: record} of the unexpired opaque tokens among them
+        """
+        token_records = {}
+        with self.storage.snapshot("tokens"):
+            for token in set(tokens):
+                token_record = self.lookup(token)
+                if token_record:
+                    token_records[token] = token_record
+        return token_records
+
+    def cutoffs(self):
+        """
+        :return: {user_id: not_before} revocation cutoffs of every user
+        """
+        return {
+            token_record["user_id"]: issued_at_ms(token_record)
+            for token_record in self.storage.all("tokens")
+        }
+
+    def sweep(self):
+        """
+        Delete expired records. The scan needs no lock and the deletes are
+        made in small batches, each record re-checked under the lock in case
+        the user logged in since, so logins are never held up for long.
+
+        :return: Number of records deleted
+        """
+        now = now_ms()
+        expired_user_ids = [
+            token_record["user_id"]
+            for token_record in self.storage.all("tokens")
+            if is_expired(token_record, now)
+        ]
+        deleted = 0
+        batch_size = settings.AUTH_TOKEN_SWEEP_BATCH_SIZE
+        for start in range(0, len(expired_user_ids), batch_size):
+            with self.storage.transaction("tokens") as txn:
+                for user_id in expired_user_ids[start:start + batch_size]:
+                    token_record = txn.get("tokens", user_id)
+                    if token_record and is_expired(token_record, now):
+                        txn.delete("tokens", user_id)
+                        deleted += 1
+        return deleted
+
+    def _run_sweeper(self):
+        while True:
+            time.sleep(settings.AUTH_TOKEN_SWEEP_INTERVAL_SECONDS)
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Sweeping expired tokens failed")
+
+    def start_sweeper(self):
+        if (
+            self._sweeper is not None
+            or settings.AUTH_TOKEN_TTL_SECONDS <= 0
+            or settings.AUTH_TOKEN_SWEEP_INTERVAL_SECONDS <= 0
+        ):
+            return
+        self._sweeper = threading.Thread(
+            target=self._run_sweeper, name="token-sweeper", daemon=True
+        )
+        self._sweeper.start()
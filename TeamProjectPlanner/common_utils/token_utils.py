@@ -0,0 +1,114 @@
+import hmac
+import time
+import base64
+import hashlib
+import threading
+from uuid import uuid4
+
+from django.conf import settings
+
+from common_utils import codec_utils
+from common_utils import token_store_utils
+
+
+# Signed tokens are "<payload>.<signature>", both base64url without padding.
+# The payload carries the claims (user id, admin flag, issue and expiry
+# time) and the signature is an HMAC-SHA256 of it keyed with SECRET_KEY, so
+# any worker can verify a token without reading the token store.
+#
+# Revocation: every login and logout stores a "not_before" time (epoch ms)
+# on the user's record in the token store. Tokens issued before it are
+# rejected, which enforces one live token per user and logs out. The
+# cutoffs are mirrored in memory and re-read every
+# AUTH_REVOCATION_REFRESH_SECONDS, so other workers honour a logout within
+# that interval and the worker handling it does so at once.
+
+_cutoffs = {}
+_cutoffs_loaded_at = None
+_cutoffs_lock = threading.Lock()
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(payload):
+    return _b64encode(
+        hmac.new(
+            settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256
+        ).digest()
+    )
+
+
+def is_signed_token(token):
+    return "." in token
+
+
+def issue_signed_token(user, issued_at):
+    """
+    :param issued_at: Epoch ms the token store recorded for this login
+    """
+    claims = {
+        "sub": user["user_id"],
+        "adm": user["is_admin"],
+        "iat": issued_at,
+        "jti": uuid4().hex[:8]
+    }
+    if settings.AUTH_TOKEN_TTL_SECONDS > 0:
+        claims["exp"] = issued_at + settings.AUTH_TOKEN_TTL_SECONDS * 1000
+    payload = _b64encode(codec_utils.dumps_bytes(claims))
+    return payload + "." + _signature(payload)
+
+
+def _cutoffs_stale(now):
+    return (
+        _cutoffs_loaded_at is None
+        or now - _cutoffs_loaded_at >= settings.AUTH_REVOCATION_REFRESH_SECONDS
+    )
+
+
+def _revocation_cutoffs():
+    global _cutoffs, _cutoffs_loaded_at
+    now = time.monotonic()
+    if not _cutoffs_stale(now):
+        return _cutoffs
+    with _cutoffs_lock:
+        if _cutoffs_stale(now):
+            _cutoffs = token_store_utils.get_token_store().cutoffs()
+            _cutoffs_loaded_at = now
+    return _cutoffs
+
+
+def note_revocation(user_id, not_before):
+    """
+    Apply a new cutoff in this process right away instead of at the next
+    refresh.
+    """
+    with _cutoffs_lock:
+        _cutoffs[user_id] = max(_cutoffs.get(user_id, 0), not_before)
+
+
+def verify_signed_token(token):
+    """
+    :return: {"user_id", "is_admin"} of a valid, unexpired and unrevoked
+    token, otherwise None
+    """
+    payload, _, signature = token.partition(".")
+    if not hmac.compare_digest(
+        _signature(payload).encode(), signature.encode()
+    ):
+        return None
+    try:
+        claims = codec_utils.loads(_b64decode(payload))
+    except ValueError:
+        return None
+
+    if "exp" in claims and claims["exp"] <= token_store_utils.now_ms():
+        return None
+    if claims["iat"] < _revocation_cutoffs().get(claims["sub"], 0):
+        return None
+    return {"user_id": claims["sub"], "is_admin": claims["adm"]}
@@ -0,0 +1,376 @@
+import bisect
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from common_utils import storage_utils
+
+
+logger = logging.getLogger(__name__)
+
+# In-memory type-ahead index over user names and display names, one per
+# process. Every name, display name and display name word is a term in a
+# prefix trie, and every name and display name is split into trigrams for
+# substring matches. Results are ranked exact match first, then prefix
+# matches (shortest term first), then substring matches (earliest and in
+# the shortest text first).
+#
+# The user manager updates the index of its own process on every create and
+# update. A background thread builds the index when the server starts and
+# re-syncs it with the users collection every USER_SEARCH_REFRESH_SECONDS
+# so changes made by other workers show up.
+
+_index = None
+# Set once the first sync finished, and once it succeeded
+_index_synced = threading.Event()
+_index_ready = threading.Event()
+_index_lock = threading.Lock()
+
+# Users applied per hold of the index lock while syncing, so searches and
+# updates wait for a batch and not for a whole (re)build
+_SYNC_BATCH_SIZE = 100
+
+
+def _terms(name, display_name):
+    terms = {name, display_name}
+    terms.update(display_name.split())
+    terms.discard("")
+    return terms
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _TrieNode:
+    # A radix trie: every edge carries a label of one or more characters,
+    # so chains of single children collapse into one node
+    __slots__ = ("label", "children", "term", "ids", "best", "complete")
+
+    def __init__(self, label, complete=True):
+        self.label = label
+        self.children = None
+        # the term ending at this node and the users having it
+        self.term = None
+        self.ids = None
+        # the best (len(term), term, user_id) entries of the subtree, one
+        # per user (its shortest term), sorted and at most
+        # USER_SEARCH_MAX_RESULTS long
+        self.best = None
+        # False when `best` may miss entries of the subtree, which happens
+        # when one leaves a full list or the node was bulk loaded; `best` is
+        # then rebuilt on the next search reaching the node
+        self.complete = complete
+
+
+class UserSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._root = _TrieNode("")
+        self._trigrams = {}
+        # user_id -> (name, display_name) as indexed, lower cased
+        self._users = {}
+
+    def add(self, user):
+        """
+        Index a new or changed user record.
+        """
+        with self._lock:
+            self._set_user(
+                user["user_id"], user["name"], user.get("display_name", "")
+            )
+
+    def sync(self, users):
+        """
+        Bring the index in line with `users`, the whole collection.
+        """
+        with self._lock:
+            indexed = dict(self._users)
+        # Filling an empty index skips ranking, which is then done lazily
+        # per prefix as searches come in
+        bulk = not indexed
+        current = {}
+        for user in users:
+            current[user["user_id"]] = (
+                user["name"].lower(), user.get("display_name", "").lower()
+            )
+        changes = [
+            (user_id, None) for user_id in indexed if user_id not in current
+        ]
+        changes.extend(
+            (user_id, texts) for user_id, texts in current.items()
+            if indexed.get(user_id) != texts
+        )
+        for start in range(0, len(changes), _SYNC_BATCH_SIZE):
+            with self._lock:
+                for user_id, texts in changes[start:start + _SYNC_BATCH_SIZE]:
+                    # Leave users changed by add() since the copy above,
+                    # `users` may have been read before that change
+                    if self._users.get(user_id) != indexed.get(user_id):
+                        continue
+                    if texts is None:
+                        self._remove_user(user_id)
+                    else:
+                        self._set_user(user_id, *texts, bulk)
+
+    def _set_user(self, user_id, name, display_name, bulk=False):
+        indexed = (name.lower(), display_name.lower())
+        if self._users.get(user_id) == indexed:
+            return
+        self._remove_user(user_id)
+        self._users[user_id] = indexed
+        for term in _terms(*indexed):
+            self._insert_term(term, user_id, bulk)
+        for trigram in _trigrams(indexed[0]) | _trigrams(indexed[1]):
+            self._trigrams.setdefault(trigram, {})[user_id] = None
+
+    def _remove_user(self, user_id):
+        indexed = self._users.pop(user_id, None)
+        if indexed is None:
+            return
+        # All of the user's terms go at once, so its single entry in each
+        # `best` list is dropped even when it came from another term
+        for term in _terms(*indexed):
+            self._remove_term(term, user_id)
+        for trigram in _trigrams(indexed[0]) | _trigrams(indexed[1]):
+            postings = self._trigrams[trigram]
+            postings.pop(user_id, None)
+            if not postings:
+                del self._trigrams[trigram]
+
+    def _insert_term(self, term, user_id, bulk):
+        node = self._root
+        path = [node]
+        position = 0
+        while position < len(term):
+            if node.children is None:
+                node.children = {}
+            child = node.children.get(term[position])
+            if child is None:
+                child = _TrieNode(term[position:], complete=not bulk)
+                node.children[term[position]] = child
+            label = child.label
+            common = 0
+            longest = min(len(label), len(term) - position)
+            while (
+                common < longest and label[common] == term[position + common]
+            ):
+                common += 1
+            if common < len(label):
+                # Split the edge; the new node has the same subtree so far
+                middle = _TrieNode(label[:common], child.complete)
+                middle.children = {label[common]: child}
+                middle.best = list(child.best) if child.best else None
+                child.label = label[common:]
+                node.children[term[position]] = middle
+                child = middle
+            node = child
+            path.append(node)
+            position += common
+        if node.ids is None:
+            node.term = term
+            node.ids = {}
+        node.ids[user_id] = None
+
+        if bulk:
+            for node in path:
+                node.complete = False
+            return
+        entry = (len(term), term, user_id)
+        best_size = settings.USER_SEARCH_MAX_RESULTS
+        for node in path:
+            if node.best is None:
+                node.best = [entry]
+                continue
+            current = next(
+                (best for best in node.best if best[2] == user_id), None
+            )
+            if current is not None:
+                # Another term of the user already ranks it here
+                if entry < current:
+                    node.best.remove(current)
+                    bisect.insort(node.best, entry)
+            elif len(node.best) < best_size:
+                bisect.insort(node.best, entry)
+            elif entry < node.best[-1]:
+                bisect.insort(node.best, entry)
+                node.best.pop()
+
+    def _remove_term(self, term, user_id):
+        entry = (len(term), term, user_id)
+        best_size = settings.USER_SEARCH_MAX_RESULTS
+        path = [self._root]
+        position = 0
+        while position < len(term):
+            node = path[-1].children[term[position]]
+            path.append(node)
+            position += len(node.label)
+        terminal = path[-1]
+        del terminal.ids[user_id]
+        if not terminal.ids:
+            terminal.term = terminal.ids = None
+        for node in path:
+            if not node.best:
+                continue
+            position = bisect.bisect_left(node.best, entry)
+            if position < len(node.best) and node.best[position] == entry:
+                # A full list may have left out entries of the subtree
+                if len(node.best) == best_size:
+                    node.complete = False
+                del node.best[position]
+
+        # Drop nodes left without users or children, then fold a remaining
+        # user-less node with a single child into that child
+        for depth in range(len(path) - 1, 0, -1):
+            node = path[depth]
+            parent = path[depth - 1]
+            if node.ids or node.children:
+                if not node.ids and len(node.children) == 1:
+                    (child,) = node.children.values()
+                    child.label = node.label + child.label
+                    parent.children[node.label[0]] = child
+                break
+            del parent.children[node.label[0]]
+            if not parent.children:
+                parent.children = None
+
+    def _best_of(self, node):
+        if not node.complete:
+            # user_id -> the user's best entry in the subtree
+            entries = {}
+            stack = [node]
+            while stack:
+                current = stack.pop()
+                if current.children:
+                    stack.extend(current.children.values())
+                if current.ids:
+                    for user_id in current.ids:
+                        entry = (len(current.term), current.term, user_id)
+                        if (
+                            user_id not in entries
+                            or entry < entries[user_id]
+                        ):
+                            entries[user_id] = entry
+            node.best = heapq.nsmallest(
+                settings.USER_SEARCH_MAX_RESULTS, entries.values()
+            )
+            node.complete = True
+        return node.best or []
+
+    def _find_node(self, query):
+        """
+        :return: (node whose subtree holds the terms starting with `query`
+        or None, whether the query ends exactly at that node)
+        """
+        node = self._root
+        position = 0
+        while position < len(query):
+            child = None
+            if node.children:
+                child = node.children.get(query[position])
+            if child is None:
+                return None, False
+            rest = query[position:position + len(child.label)]
+            if not child.label.startswith(rest):
+                return None, False
+            if len(rest) < len(child.label):
+                return child, False
+            node = child
+            position += len(child.label)
+        return node, True
+
+    def search(self, query, limit):
+        """
+        :return: Up to `limit` user ids, best match first
+        """
+        query = query.lower()
+        with self._lock:
+            found = {}
+            node, exact = self._find_node(query)
+            if node is not None:
+                if exact and node.ids:
+                    found.update(dict.fromkeys(sorted(node.ids)))
+                for _, _, user_id in self._best_of(node):
+                    found.setdefault(user_id, None)
+            if len(found) < limit and len(query) >= 3:
+                for user_id in self._substring_matches(
+                    query, limit - len(found), found
+                ):
+                    found[user_id] = None
+        return list(found)[:limit]
+
+    def _substring_matches(self, query, limit, exclude):
+        postings = []
+        for trigram in _trigrams(query):
+            if trigram not in self._trigrams:
+                return []
+            postings.append(self._trigrams[trigram])
+        postings.sort(key=len)
+        ranked = []
+        for user_id in postings[0]:
+            if user_id in exclude or not all(
+                user_id in other for other in postings[1:]
+            ):
+                continue
+            for text in self._users[user_id]:
+                position = text.find(query)
+                if position != -1:
+                    ranked.append((position, len(text), text, user_id))
+                    break
+        return [entry[-1] for entry in heapq.nsmallest(limit, ranked)]
+
+
+def _run_indexer(index):
+    # Stops once tests or a reload install another index
+    while _index is index:
+        try:
+            index.sync(storage_utils.get_storage().all("users"))
+            if _index is index:
+                _index_ready.set()
+        except Exception:
+            logger.exception("Syncing the user search index failed")
+        if _index is index:
+            _index_synced.set()
+        time.sleep(settings.USER_SEARCH_REFRESH_SECONDS)
+
+
+def start_indexer():
+    """
+    Build this process's index and keep it in sync in a background thread.
+    Called when the server starts, so no request waits for the build.
+    """
+    global _index
+    if _index is not None:
+        return
+    with _index_lock:
+        if _index is None:
+            _index = UserSearchIndex()
+            threading.Thread(
+                target=_run_indexer, args=(_index,), name="user-search",
+                daemon=True
+            ).start()
+
+
+def get_user_index():
+    """
+    Process-wide index. Waits up to USER_SEARCH_BUILD_WAIT_SECONDS for the
+    first build; raises if it is still running or failed.
+    """
+    start_indexer()
+    _index_synced.wait(settings.USER_SEARCH_BUILD_WAIT_SECONDS)
+    if not _index_ready.is_set():
+        raise Exception(
+            settings.RESPONSE_MSG_CONSTANTS_DICT['SEARCH_UNAVAILABLE']
+        )
+    return _index
+
+
+def index_user(user):
+    """
+    Reflect a created or updated user in this process's index at once.
+    """
+    if _index is not None:
+        _index.add(user)
@@ -0,0 +1,208 @@
+import os
+from uuid import uuid4
+
+from common_utils import codec_utils
+
+
+# Every collection is a snapshot file (the plain JSON list the app always
+# used) plus an append-only "<file>.log" holding one compact JSON mutation
+# per line:
+#   {"op": "put", "record": {...}}  -> insert or replace by primary key
+#   {"op": "del", "key": "<id>"}    -> delete by primary key
+#
+# A log starts with a header naming its generation and the signature of the
+# snapshot it applies to:
+#   {"op": "gen", "id": "<generation>", "snapshot": [mtime, size, inode]}
+# Compaction writes a new snapshot and then replaces the log with a new
+# generation, it never truncates a log in place, so an offset into a log is
+# only meaningful together with its generation. Logs written before the
+# header existed have none (generation None).
+PUT_OP = "put"
+DELETE_OP = "del"
+GENERATION_OP = "gen"
+
+
+def log_path(path):
+    return path + ".log"
+
+
+def file_signature(stat_result):
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+
+def log_generation(header):
+    return header["id"] if header else None
+
+
+def log_applies_to(header, snapshot_signature):
+    """
+    Whether a log with `header` was started for the snapshot with
+    `snapshot_signature`. Logs without a header cannot tell and are assumed
+    to.
+    """
+    if header is None:
+        return True
+    expected = header["snapshot"]
+    return (
+        tuple(expected) if expected is not None else None
+    ) == snapshot_signature
+
+
+def encode_op(op):
+    return codec_utils.dumps(op) + "\n"
+
+
+def read_snapshot(path, key_field):
+    """
+    :return: (records, signature of the file read or None when there is
+    none)
+    """
+    try:
+        json_file = open(path, "rb")
+    except FileNotFoundError:
+        return {}, None
+    with json_file:
+        signature = file_signature(os.fstat(json_file.fileno()))
+        records = codec_utils.loads(json_file.read())
+    return {record[key_field]: record for record in records}, signature
+
+
+def _read_header(log_file):
+    line = log_file.readline()
+    if line.endswith(b"\n"):
+        try:
+            op = codec_utils.loads(line)
+        except ValueError:
+            op = None
+        if isinstance(op, dict) and op.get("op") == GENERATION_OP:
+            return op, len(line)
+    return None, 0
+
+
+def read_log(path, offset=0, generation=None):
+    """
+    Read log records starting at byte `offset`, which only applies while
+    the log is still of `generation`; a log of any other generation is read
+    from its start.
+
+    :return: (header, ops, good_offset) where header is None for a log
+    without one and good_offset is the end of the last complete record.
+    Anything after it is a torn tail left by a crashed writer and is not
+    part of the collection.
+    """
+    header = None
+    ops = []
+    good_offset = offset
+    try:
+        with open(log_path(path), "rb") as log_file:
+            header, header_size = _read_header(log_file)
+            if not offset or log_generation(header) != generation:
+                offset = good_offset = header_size
+            log_file.seek(offset)
+            for line in log_file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    ops.append(codec_utils.loads(line))
+                except ValueError:
+                    break
+                good_offset += len(line)
+    except FileNotFoundError:
+        pass
+    return header, ops, good_offset
+
+
+def apply_ops(records, ops, key_field):
+    for op in ops:
+        if op["op"] == PUT_OP:
+            record = op["record"]
+            records[record[key_field]] = record
+        elif op["op"] == DELETE_OP:
+            records.pop(op["key"], None)
+    return records
+
+
+def diff_ops(records, data, key_field):
+    """
+    Turn a full replacement list into the put/del records needed to move
+    `records` (key -> record) to `data`.
+    """
+    ops = []
+    seen_keys = set()
+    for record in data:
+        key = record[key_field]
+        seen_keys.add(key)
+        if records.get(key) != record:
+            ops.append({"op": PUT_OP, "record": dict(record)})
+    for key in records:
+        if key not in seen_keys:
+            ops.append({"op": DELETE_OP, "key": key})
+    return ops
+
+
+def append_log(path, ops, sync=True):
+    """
+    Append `ops` in a single write. With sync=False the caller must make
+    them durable later with sync_log() (group commit).
+    """
+    payload = "".join(encode_op(op) for op in ops).encode()
+    with open(log_path(path), "ab") as log_file:
+        log_file.write(payload)
+        log_file.flush()
+        if sync:
+            os.fsync(log_file.fileno())
+
+
+def sync_log(path):
+    try:
+        with open(log_path(path), "ab") as log_file:
+            os.fsync(log_file.fileno())
+    except FileNotFoundError:
+        pass
+
+
+def truncate_log(path, offset):
+    try:
+        with open(log_path(path), "r+b") as log_file:
+            log_file.truncate(offset)
+            log_file.flush()
+            os.fsync(log_file.fileno())
+    except FileNotFoundError:
+        pass
+
+
+def write_snapshot(path, records):
+    """
+    :return: Signature of the new snapshot
+    """
+    # Publish the new snapshot atomically so a crash mid-write leaves the old
+    # snapshot (and the log that still applies on top of it) intact
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as json_file:
+        json_file.write(codec_utils.dumps_bytes(list(records)))
+        json_file.flush()
+        os.fsync(json_file.fileno())
+        signature = file_signature(os.fstat(json_file.fileno()))
+    os.replace(tmp_path, path)
+    return signature
+
+
+def start_log(path, snapshot_signature):
+    """
+    Replace the log of `path` with an empty one of a new generation, applying
+    to the snapshot with `snapshot_signature`.
+
+    :return: The new header
+    """
+    header = {
+        "op": GENERATION_OP,
+        "id": uuid4().hex,
+        "snapshot": snapshot_signature
+    }
+    tmp_path = log_path(path) + ".tmp"
+    with open(tmp_path, "wb") as log_file:
+        log_file.write(encode_op(header).encode())
+        log_file.flush()
+        os.fsync(log_file.fileno())
+    os.replace(tmp_path, log_path(path))
+    return header
@@ -11,8 +11,13 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from common_utils import user_search_utils
+
 os.environ.setdefault(
     'DJANGO_SETTINGS_MODULE', 'project_planner_tool.settings'
 )
 
 application = get_asgi_application()
+
+# Build the user search index before the first search needs it
+user_search_utils.start_indexer()
@@ -35,7 +35,8 @@ class ProjectBoardBase:
 
         Constraint:
           * Set the board status to CLOSED and record the end_time date:time
-          * You can only close boards with all tasks marked as COMPLETE
+          * You can only close boards with all tasks marked as COMPLETE,
+            checked against the board's task counters (stats_utils)
         """
         pass
 
@@ -62,6 +63,33 @@ class ProjectBoardBase:
         """
         pass
 
+    # add many tasks to a board at once
+    def bulk_add_tasks(self, request: str) -> str:
+        """
+        :param request: A json string with the board and its new tasks, each
+        with the fields of add_task
+        {
+            "board_id" : "<board_id>",
+            "tasks" : [
+                {
+                    "title" : "<title>",
+                    "description" : "<description>",
+                    "user_id" : "<assigned user id>",
+                    "creation_time" : "<date:time when task was created>"
+                }
+            ]
+        }
+        :return: A json string with the response, ids in request order
+        {"ids" : ["<task_id>"]}
+
+        Constraint:
+         * the add_task constraints apply to every task, and titles must
+           also be unique within the batch
+         * either every task is created or, when any is invalid, none is
+           and the errors are reported per task
+        """
+        pass
+
     # update the status of a task
     def update_task_status(self, request: str):
         """
@@ -73,6 +101,44 @@ class ProjectBoardBase:
         """
         pass
 
+    # list the tasks of a board
+    def list_tasks(self, request: str) -> str:
+        """
+        :param request: A json string with the board and optional filters
+        {
+          "board_id" : "<board_id>",
+          "status" : "OPEN | IN_PROGRESS | COMPLETE",
+          "user_id" : "<assigned user id>",
+          "created_from" : "<earliest creation time>",
+          "created_to" : "<latest creation time>",
+          "order" : "creation_time | -creation_time",
+          "limit" : <page size>,
+          "cursor" : "<next_cursor of the previous page>"
+        }
+
+        :return:
+        {
+          "results" : [
+            {
+              "id" : "<task_id>",
+              "title" : "<title>",
+              "description" : "<description>",
+              "user_id" : "<assigned user id>",
+              "status" : "<status>",
+              "creation_time" : "<creation time>"
+            }
+          ],
+          "next_cursor" : "<cursor of the next page or null>"
+        }
+
+        Constraint:
+          * Only members of the board's team (or an admin) can list tasks
+          * Tasks are read in creation time order from the board's sorted
+            order, so a page costs O(page size) plus the tasks skipped by the
+            status and user filters
+        """
+        pass
+
     # list all open boards for a team
     def list_boards(self, request: str) -> str:
         """
@@ -0,0 +1,128 @@
+class StorageBase:
+    """
+    Base interface for the persistence backends used by the managers.
+
+    Data is organised in collections ("users", "teams", "boards", "tasks",
+    "tokens", "stats") of JSON-like records, each identified by its primary
+    key (user_id, team_id, board_id, task_id, user_id and stat_id
+    respectively). Every record returned is a private copy which the caller
+    may modify and put back inside a transaction.
+
+    "stats" holds counters derived from the other collections. Each stats
+    record has a single owner: the transaction holding the lock its
+    counters are derived under (see stats_utils). A transaction reads stats
+    as last committed, not through its own staged writes.
+    """
+
+    COLLECTIONS = ("tokens", "users", "teams", "boards", "tasks", "stats")
+
+    # fetch a record by primary key
+    def get(self, collection: str, key: str) -> dict:
+        """
+        :return: The record, or None when no record has that key
+        """
+        pass
+
+    # fetch the records matching every field == value filter
+    def find(self, collection: str, **filters) -> list:
+        """
+        :param filters: field=value pairs, e.g. find("tasks", board_id=...).
+        A list field matches when it contains the value, e.g.
+        find("teams", members=user_id)
+
+        Lookups on user_id, team_id, board_id, task_id, the user name, the
+        team members and the token are served by an index.
+        """
+        pass
+
+    # check whether any record matches every field == value filter
+    def exists(self, collection: str, **filters) -> bool:
+        """
+        :param filters: As in find(). With the primary key and an indexed
+        field, e.g. exists("teams", team_id=..., members=user_id), this is
+        a membership check that reads no record
+        """
+        pass
+
+    # fetch every record of a collection
+    def all(self, collection: str) -> list:
+        pass
+
+    # fetch records page by page in primary key order
+    def page(
+        self, collection: str, after: str = None, limit: int = 100,
+        board_id: str = None, **filters
+    ) -> tuple:
+        """
+        :param after: Primary key the page starts after, None for the first
+        page
+        :param board_id: Required for "tasks", which are paged per board,
+        unless a user_id filter pages through one user's tasks instead
+        :param filters: Optional field=value pairs as in find(); the page
+        then holds only matching records
+        :return: (records, key to pass as `after` for the next page, or None
+        on the last page). An unfiltered page costs O(limit), not
+        O(collection size); one filtered on an indexed field costs O(number
+        of matching records)
+        """
+        pass
+
+    # fetch records page by page in the order of a field
+    def page_sorted(
+        self, collection: str, field: str, after: list = None,
+        limit: int = 100, board_id: str = None, start: str = None,
+        end: str = None, descending: bool = False, **filters
+    ) -> tuple:
+        """
+        Like page(), ordered by (field value, primary key) instead. Records
+        without a string value for the field are left out.
+
+        :param field: A sorted field, "creation_time" of "tasks"
+        :param after: [value, key] the page starts after, None for the first
+        page
+        :param board_id: Required for "tasks", which are sorted per board
+        :param start: Smallest value included, None for no bound
+        :param end: Largest value included, None for no bound
+        :param descending: Largest values first
+        :return: (records, [value, key] to pass as `after` for the next
+        page, or None on the last page). Costs O(limit) plus the records
+        skipped by `filters`
+        """
+        pass
+
+    # consistent reads across collections
+    def snapshot(self, *collections: str, board_id: str = None):
+        """
+        :param collections: Collections to read as of one point in time,
+        e.g. for an export. Without any, each collection read inside the
+        block keeps the version it was first read at (repeatable reads).
+        :param board_id: Limits "tasks" to one board
+        :return: A context manager; reads inside it never wait for writers
+        """
+        pass
+
+    # group writes on a set of collections
+    def transaction(self, *collections: str, board_id: str = None):
+        """
+        :param collections: The collections the transaction writes to
+        :param board_id: Required when writing "tasks", which are stored per
+        board
+        :return: A context manager yielding a transaction with the read
+        methods above plus put(collection, record) and
+        delete(collection, key). Writes are committed together when the
+        block exits without an exception.
+        """
+        pass
+
+    # run work(txn) in a transaction, optionally optimistic
+    def run_in_transaction(
+        self, work, *collections: str, board_id: str = None,
+        optimistic: bool = False
+    ):
+        """
+        :param work: Callable receiving the transaction, its return value is
+        passed through
+        :param optimistic: Read without taking write locks and re-run `work`
+        if another writer committed in between
+        """
+        pass
@@ -24,18 +24,26 @@ class TeamBase:
         """
         pass
 
-    # list all teams
-    def list_teams(self) -> str:
+    # list all teams, a page at a time
+    def list_teams(self, request: str) -> str:
         """
-        :return: A json list with the response.
-        [
-          {
-            "name" : "<team_name>",
-            "description" : "<some description>",
-            "creation_time" : "<some date:time format>",
-            "admin": "<id of a user>"
-          }
-        ]
+        :param request: A json string with the optional paging parameters
+        {
+          "cursor" : "<next_cursor of the previous page>",
+          "limit" : <max teams per page>
+        }
+        :return: A json string with the response, teams ordered by id
+        {
+          "results" : [
+            {
+              "name" : "<team_name>",
+              "description" : "<some description>",
+              "creation_time" : "<some date:time format>",
+              "admin": "<id of a user>"
+            }
+          ],
+          "next_cursor" : "<cursor of the next page, null on the last one>"
+        }
         """
         pass
 
@@ -59,6 +67,38 @@ class TeamBase:
         """
         pass
 
+    # board and task counters of a team
+    def team_stats(self, request: str) -> str:
+        """
+        :param request: A json string with the team identifier
+        {
+          "id" : "<team_id>"
+        }
+
+        :return: A json string with the team's counters
+        {
+          "team_id" : "<team_id>",
+          "boards" : {"<board status>" : <count>},
+          "tasks" : {"<task status>" : <count>},
+          "assignees" : {"<user_id>" : {"<task status>" : <count>}},
+          "board_stats" : [
+            {
+              "board_id" : "<board_id>",
+              "name" : "<board_name>",
+              "status" : "<board status>",
+              "tasks" : {"<task status>" : <count>},
+              "assignees" : {"<user_id>" : {"<task status>" : <count>}}
+            }
+          ]
+        }
+
+        Constraint:
+            * only team members or an admin
+            * counters are kept up to date by the board and task writes,
+              nothing is counted on read
+        """
+        pass
+
     # update team
     def update_team(self, request: str) -> str:
         """
@@ -113,6 +153,35 @@ class TeamBase:
         """
         pass
 
+    # add and remove users across many teams at once
+    def update_memberships(self, request: str) -> str:
+        """
+        :param request: A json string with the operations, applied in order
+        {
+          "operations" : [
+            {
+              "op" : "<add | remove>",
+              "id" : "<team_id>",
+              "users" : ["user_id 1", "user_id2"]
+            }
+          ]
+        }
+
+        :return: A json string with the teams whose members changed
+        {
+          "message" : "Team memberships updated",
+          "updated_teams" : ["<team_id>"]
+        }
+
+        Constraint:
+        * All or nothing: any invalid operation (unknown team or user,
+          removing a user who is not a member) fails the whole batch, with
+          the errors reported per operation
+        * Cap the operations per call to
+          TEAM_MEMBERSHIP_BATCH_MAX_OPERATIONS
+        """
+        pass
+
     # list users of a team
     def list_team_users(self, request: str):
         """
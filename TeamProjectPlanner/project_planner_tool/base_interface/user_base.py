@@ -20,17 +20,70 @@ class UserBase:
         """
         pass
 
-    # list all users
-    def list_users(self) -> str:
+    # create many users at once
+    def bulk_create_users(self, request: str) -> str:
         """
-        :return: A json list with the response
-        [
-          {
-            "name" : "<user_name>",
-            "display_name" : "<display name>",
-            "creation_time" : "<some date:time format>"
-          }
-        ]
+        :param request: A json string with the users, each with the fields
+        of create_user
+        {
+          "users" : [
+            {
+              "name" : "<user_name>",
+              "display_name" : "<display name>"
+            }
+          ]
+        }
+        :return: A json string with the response, ids in request order
+        {"ids" : ["<user_id>"]}
+
+        Constraint:
+            * the create_user constraints apply to every user, and names
+              must also be unique within the batch
+            * either every user is created or, when any is invalid, none
+              is and the errors are reported per user
+        """
+        pass
+
+    # list all users, a page at a time
+    def list_users(self, request: str) -> str:
+        """
+        :param request: A json string with the optional paging parameters
+        {
+          "cursor" : "<next_cursor of the previous page>",
+          "limit" : <max users per page>
+        }
+        :return: A json string with the response, users ordered by id
+        {
+          "results" : [
+            {
+              "name" : "<user_name>",
+              "display_name" : "<display name>",
+              "creation_time" : "<some date:time format>"
+            }
+          ],
+          "next_cursor" : "<cursor of the next page, null on the last one>"
+        }
+        """
+        pass
+
+    # type-ahead search over user names and display names
+    def search_users(self, request: str) -> str:
+        """
+        :param request: A json string with the search text
+        {
+          "q" : "<prefix or part of a name or display name>",
+          "limit" : <max users returned>
+        }
+        :return: A json string with the response, best match first
+        {
+          "results" : [
+            {
+              "user_id" : "<user_id>",
+              "name" : "<user_name>",
+              "display_name" : "<display name>"
+            }
+          ]
+        }
         """
         pass
 
@@ -91,3 +144,41 @@ class UserBase:
         ]
         """
         pass
+
+    # list the tasks assigned to a user
+    def list_user_tasks(self, request: str) -> str:
+        """
+        :param request:
+        {
+          "id" : "<user_id>",
+          "status" : "<OPEN | IN_PROGRESS | COMPLETE>",  # optional
+          "limit" : <page size>,                          # optional
+          "cursor" : "<next_cursor of the previous page>" # optional
+        }
+
+        :return: A json string with one page of the user's tasks, in task id
+        order, grouped by board and then by status.
+        {
+          "results": [
+            {
+              "board_id" : "<board_id>",
+              "board_name" : "<board_name>",
+              "tasks" : {
+                "<status>" : [
+                  {
+                    "id" : "<task_id>",
+                    "title" : "<task_title>",
+                    "description" : "<description>",
+                    "creation_time" : "<some date:time format>"
+                  }
+                ]
+              }
+            }
+          ],
+          "next_cursor" : "<cursor or null on the last page>"
+        }
+
+        Constraint:
+            * only the user themselves or an admin
+        """
+        pass
@@ -0,0 +1,15 @@
+from common_utils import storage_utils
+
+
+class StorageSnapshotMiddleware:
+    """
+    Serve every request from one storage snapshot, so all reads made while
+    handling it see the same version of each collection.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with storage_utils.get_storage().snapshot():
+            return self.get_response(request)
@@ -48,6 +48,21 @@ INSTALLED_APPS = [
     'app_boards',
 ]
 
+# Every API view authenticates "Authorization: Token <token>" once per
+# request into request.user and requires a valid token unless it overrides
+# permission_classes; auth failures are answered as 403 {"error": ...}
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'common_utils.api_auth_utils.PlannerTokenAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'common_utils.api_auth_utils.IsPlannerUser',
+    ],
+    'EXCEPTION_HANDLER': (
+        'common_utils.response_utils.api_exception_handler'
+    ),
+}
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -56,6 +71,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'project_planner_tool.middleware.StorageSnapshotMiddleware',
 ]
 
 ROOT_URLCONF = 'project_planner_tool.urls'
@@ -94,7 +110,81 @@ TOKEN_FILE = "db/auth_tokens.json"
 USER_FILE = "db/users.json"
 TEAM_FILE = "db/teams.json"
 BOARD_FILE = "db/boards.json"
+# NOTE: tasks are sharded into one file per board under TASK_SHARD_DIR and
+# TASK_MANIFEST_FILE maps every task_id to its board and assigned user.
+# TASK_FILE is only read to migrate tasks stored before sharding
 TASK_FILE = "db/tasks.json"
+TASK_SHARD_DIR = "db/tasks"
+TASK_MANIFEST_FILE = "db/tasks/manifest.json"
+# NOTE: board and task counters per team, board and assignee (see
+# common_utils/stats_utils.py)
+STATS_FILE = "db/stats.json"
+
+# Primary key of every JSON collection. Mutations are appended to
+# "<file>.log" and folded back into the file by a background compaction
+# once the log holds JSON_STORE_COMPACTION_THRESHOLD records
+JSON_STORE_PRIMARY_KEYS = {
+    TOKEN_FILE: "user_id",
+    USER_FILE: "user_id",
+    TEAM_FILE: "team_id",
+    BOARD_FILE: "board_id",
+    TASK_FILE: "task_id",
+    # every shard and the manifest in the directory
+    TASK_SHARD_DIR: "task_id",
+    STATS_FILE: "stat_id",
+}
+JSON_STORE_COMPACTION_THRESHOLD = 1000
+# Reads take no lock and are retried when a concurrent write changes the
+# collection mid-read; after this many attempts they wait on a shared lock
+JSON_STORE_LOCK_FREE_READ_ATTEMPTS = 3
+# Group commit: when > 0, writes landing within this many milliseconds of
+# each other share one fsync of the log instead of one each. 0 disables it
+JSON_STORE_GROUP_COMMIT_WINDOW_MS = 0
+# Fields with an in-memory secondary index per JSON collection, kept up to
+# date on every write. A list field indexes each item (team members)
+JSON_STORE_INDEXED_FIELDS = {
+    TOKEN_FILE: ["token"],
+    USER_FILE: ["name", "is_admin"],
+    TEAM_FILE: ["team_name", "members"],
+    BOARD_FILE: ["team_id"],
+    TASK_SHARD_DIR: ["user_id"],
+    TASK_MANIFEST_FILE: ["board_id", "user_id"],
+}
+# String fields each JSON collection keeps its records sorted by, so they
+# can be paged through in that order (task shards: newest or oldest first)
+JSON_STORE_SORTED_FIELDS = {
+    TASK_SHARD_DIR: ["creation_time"],
+}
+
+# Persistence backend used by the managers: "json" keeps the collections in
+# the files above, "sqlite" in a single local SQLite database
+STORAGE_BACKEND = "json"
+SQLITE_DB_FILE = "db/planner.sqlite3"
+# Attempts of an optimistic transaction before it falls back to locking
+STORAGE_TRANSACTION_RETRIES = 3
+
+# Per-process cache of token -> user used to authenticate requests. Entries
+# live for at most the TTL (0 disables the cache), and the whole cache is
+# dropped if it reaches the size cap
+AUTH_TOKEN_CACHE_TTL_SECONDS = 60
+AUTH_TOKEN_CACHE_MAX_ENTRIES = 10000
+
+# "opaque": random tokens looked up in TOKEN_FILE on every request.
+# "signed": self-contained tokens HMAC-signed with SECRET_KEY, verified
+# without any lookup. Both kinds are accepted whichever one is issued
+AUTH_TOKEN_FORMAT = "opaque"
+# Tokens of either format expire this long after login (0: never). Expired
+# records are dropped from TOKEN_FILE by a background sweeper every
+# AUTH_TOKEN_SWEEP_INTERVAL_SECONDS, deleting at most
+# AUTH_TOKEN_SWEEP_BATCH_SIZE per locked write
+AUTH_TOKEN_TTL_SECONDS = 24 * 60 * 60
+AUTH_TOKEN_SWEEP_INTERVAL_SECONDS = 5 * 60
+AUTH_TOKEN_SWEEP_BATCH_SIZE = 500
+# How often each process re-reads the logout/login revocation cutoffs of
+# signed tokens
+AUTH_REVOCATION_REFRESH_SECONDS = 5
+# Most tokens checked by one call to the admin-only introspection endpoint
+AUTH_INTROSPECT_MAX_TOKENS = 1000
 
 
 # Password validation
@@ -184,7 +274,35 @@ RESPONSE_MSG_CONSTANTS_DICT = {
     'ASSIGNED_USER_NOT_IN_TEAM': 'Assigned user is not in the boards team',
     'TASK_NOT_FOUND': 'Task not found',
     'ID_PARAM_MISSING': 'Missing required parameter: id',
-    'USER_PARAM_MISSING': 'Missing required parameter: users'
+    'USER_PARAM_MISSING': 'Missing required parameter: users',
+    'INVALID_CURSOR': 'Invalid cursor',
+    'SEARCH_UNAVAILABLE': 'User search is not available yet, try again',
+    'NOT_TEAM_MEMBER': 'User {} is not a member of this team'
 }
 
 EXPORT_DIR = "out"
+
+# Records per page of the list endpoints ("limit" query parameter), which
+# page through the collection by id
+LIST_PAGE_DEFAULT_SIZE = 100
+LIST_PAGE_MAX_SIZE = 1000
+
+# Most users created by one call to the bulk user import endpoint
+USER_BULK_CREATE_MAX_USERS = 5000
+
+# Most tasks created by one call to the bulk task creation endpoint
+TASK_BULK_CREATE_MAX_TASKS = 5000
+
+# Batch membership endpoint: most add/remove operations per call and most
+# users per operation
+TEAM_MEMBERSHIP_BATCH_MAX_OPERATIONS = 500
+TEAM_MEMBERSHIP_BATCH_MAX_USERS = 1000
+
+# Type-ahead user search: results per query ("limit" query parameter), how
+# often each process's background indexer re-syncs its in-memory index with
+# the users collection to pick up changes made by other processes, and how
+# long a search waits for the first build before failing
+USER_SEARCH_DEFAULT_RESULTS = 10
+USER_SEARCH_MAX_RESULTS = 50
+USER_SEARCH_REFRESH_SECONDS = 30
+USER_SEARCH_BUILD_WAIT_SECONDS = 5
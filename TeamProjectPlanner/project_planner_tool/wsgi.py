@@ -11,6 +11,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from common_utils import user_search_utils
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_planner_tool.settings')
 
 application = get_wsgi_application()
+
+# Build the user search index before the first search needs it
+user_search_utils.start_indexer()